@@ -0,0 +1,86 @@
+from typing import List, Dict, Any, Optional
+from evals.llm_client import LLMClient, estimate_tokens
+
+STRATEGIES = ("full", "window", "summary")
+
+
+class ContextManager:
+    """Decides which part of an agent's history is sent on each call.
+
+    The agent keeps its full history; this only shapes the request.
+    - full:    send everything (original behaviour)
+    - window:  pinned system prompt + the last `window_turns` exchanges
+    - summary: pinned system prompt + a rolling summary of older exchanges
+               + the most recent `window_turns`..2*`window_turns` exchanges verbatim
+    Every call is recorded in `self.calls` for token accounting.
+    """
+    def __init__(self, strategy: str = "full", window_turns: int = 4, client: Optional[LLMClient] = None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown context strategy: {strategy}")
+        self.strategy = strategy
+        self.window_turns = window_turns
+        self.client = client
+        self.summary = ""
+        self.summarized_upto = 0  # number of non-system messages folded into the summary
+        self.calls: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], client: Optional[LLMClient] = None) -> "ContextManager":
+        config = config or {}
+        return cls(strategy=config.get("strategy", "full"),
+                   window_turns=config.get("window_turns", 4),
+                   client=client)
+
+    def build(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        system = [m for m in history[:1] if m["role"] == "system"]
+        dialogue = history[len(system):]
+        if self.strategy == "full":
+            return history
+
+        # One exchange is two messages; +1 keeps the pending message being answered
+        keep = 2 * self.window_turns + 1
+        if self.strategy == "window" or len(dialogue) <= keep:
+            return system + dialogue[-keep:]
+
+        # Fold old exchanges into the summary in chunks of `window_turns`, so the
+        # summarizer runs every few turns rather than on every call
+        pending = len(dialogue) - self.summarized_upto
+        if pending >= 2 * keep - 1:
+            fold_to = len(dialogue) - keep
+            self._update_summary(dialogue[self.summarized_upto:fold_to])
+            self.summarized_upto = fold_to
+        if not self.summary:
+            return system + dialogue
+        summary_msg = [{"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}]
+        return system + summary_msg + dialogue[self.summarized_upto:]
+
+    def _update_summary(self, messages: List[Dict[str, str]]):
+        lines = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = [
+            {"role": "system", "content": "You summarize conversations. Keep facts, promises, emotional state and open threads. Reply with the summary only."},
+            {"role": "user", "content": f"Previous summary:\n{self.summary or '(none)'}\n\nNew messages:\n{lines}\n\nUpdated summary:"}
+        ]
+        self.summary = self.client.chat_completion(prompt, temperature=0.0)
+        self.record(prompt, self.client, kind="summary")
+
+    def record(self, messages: List[Dict[str, str]], client: LLMClient, kind: str = "chat"):
+        usage = client.last_usage or {}
+        self.calls.append({
+            "kind": kind,
+            "messages": len(messages),
+            "prompt_tokens_est": estimate_tokens(messages),
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        chat = [c for c in self.calls if c["kind"] == "chat"]
+        def tokens(c):
+            return c["prompt_tokens"] if c["prompt_tokens"] is not None else c["prompt_tokens_est"]
+        return {
+            "strategy": self.strategy,
+            "window_turns": self.window_turns if self.strategy != "full" else None,
+            "total_prompt_tokens": sum(tokens(c) for c in self.calls),
+            "max_prompt_tokens": max((tokens(c) for c in chat), default=0),
+            "calls": self.calls,
+        }
@@ -1,11 +1,15 @@
-from typing import List, Dict
+from typing import List, Dict, Any, Optional
 from evals.llm_client import LLMClient
+from evals.agents.context import ContextManager
+from evals.metrics import CallMetrics
 
 class NPCAgent:
-    def __init__(self, name: str, system_prompt: str, model: str = "deepseek-chat"):
+    def __init__(self, name: str, system_prompt: str, model: str = "deepseek-chat",
+                 context: Optional[Dict[str, Any]] = None, metrics: Optional[CallMetrics] = None):
         self.name = name
         self.system_prompt = system_prompt
-        self.client = LLMClient(provider="deepseek", model=model)
+        self.client = LLMClient(provider="deepseek", model=model, metrics=metrics, role="npc")
+        self.context = ContextManager.from_config(context, client=self.client)
         self.history: List[Dict[str, str]] = [
             {"role": "system", "content": system_prompt}
         ]
@@ -13,7 +17,9 @@ class NPCAgent:
     def reply(self, user_message: str, temperature: float = 0.7, seed: int = None) -> str:
         self.history.append({"role": "user", "content": user_message})
         
-        response = self.client.chat_completion(self.history, temperature=temperature, seed=seed)
+        messages = self.context.build(self.history)
+        response = self.client.chat_completion(messages, temperature=temperature, seed=seed)
+        self.context.record(messages, self.client)
         
         self.history.append({"role": "assistant", "content": response})
         return response
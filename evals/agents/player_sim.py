@@ -1,10 +1,16 @@
-from typing import List, Dict
+from typing import List, Dict, Any, Callable, Optional
 from evals.llm_client import LLMClient
+from evals.agents.context import ContextManager
+from evals.metrics import CallMetrics
 
 class PlayerSimulator:
-    def __init__(self, system_prompt: str, model: str = "deepseek-chat"):
+    def __init__(self, system_prompt: str, model: str = "deepseek-chat",
+                 log: Optional[Callable[[str], None]] = None, context: Optional[Dict[str, Any]] = None,
+                 metrics: Optional[CallMetrics] = None):
         self.system_prompt = system_prompt
-        self.client = LLMClient(provider="deepseek", model=model)
+        self.log = log or print
+        self.client = LLMClient(provider="deepseek", model=model, metrics=metrics, role="player")
+        self.context = ContextManager.from_config(context, client=self.client)
         self.history: List[Dict[str, str]] = [
             {"role": "system", "content": system_prompt}
         ]
@@ -20,7 +26,9 @@ class PlayerSimulator:
         # Append instructions for the thought process if it's not the very first system prompt
         # (Though ideally this should be in the system prompt. Let's rely on the system prompt having these instructions now.)
         
-        response = self.client.chat_completion(self.history, temperature=temperature, seed=seed)
+        messages = self.context.build(self.history)
+        response = self.client.chat_completion(messages, temperature=temperature, seed=seed)
+        self.context.record(messages, self.client)
         self.history.append({"role": "assistant", "content": response})
         
         # Parse the response to extract [ACTION]
@@ -36,7 +44,7 @@ class PlayerSimulator:
             if thoughts_match:
                 thoughts = thoughts_match.group(1).strip()
                 # Print thoughts in a distinct color (e.g., Cyan \033[96m)
-                print(f"\033[96m[Player Inner Thoughts]: {thoughts}\033[0m")
+                self.log(f"\033[96m[Player Inner Thoughts]: {thoughts}\033[0m")
             
             action_text = action_match.group(1).strip()
             # If the LLM generates closing tags or extra text, we might want to clean it up depending on how strict we are.
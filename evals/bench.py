@@ -0,0 +1,366 @@
+"""
+Offline benchmark suite for the harness itself (not the NPC).
+
+    python -m evals.bench                      # run everything, compare with the baseline
+    python -m evals.bench --only report,viz --sizes 1000,10000
+    python -m evals.bench --only store --store-sizes 1000   # JSON directory vs .pack store
+    python -m evals.bench --save-baseline      # accept the current numbers as the new baseline
+
+Trials run against the in-process stand-in server (evals/mock_server.py) or
+the built-in mock, so no API quota is used. Results are written as JSON and
+every metric is compared with the stored baseline; a change worse than
+--threshold is reported as a regression and the exit code is 1.
+"""
+import os
+import io
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+from typing import Dict, Any, List, Optional
+
+BENCHMARKS = ("throughput", "overhead", "grader", "report", "viz", "store")
+
+SCENARIO_DIR = os.path.join(os.path.dirname(__file__), "scenarios")
+
+
+def metric(value: float, unit: str, higher_is_better: bool = False) -> Dict[str, Any]:
+    return {"value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better}
+
+
+@contextlib.contextmanager
+def env(**values: Optional[str]):
+    """Temporarily set (or with None, unset) environment variables."""
+    saved = {k: os.environ.get(k) for k in values}
+    for k, v in values.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def best_of(repeat: int, fn) -> float:
+    """Fastest wall time of `repeat` calls; the minimum is the least noisy estimate."""
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_throughput(levels: List[int], trials: int, latency: float) -> Dict[str, Any]:
+    """Trials/sec through run_concurrent against the stand-in server at fixed latency."""
+    from evals.mock_server import StandInConfig, serve
+    from evals.run_eval import build_plan, run_concurrent
+
+    server = serve("127.0.0.1", 0, StandInConfig(latency=f"fixed:{latency}"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    scenario_files = sorted(glob.glob(os.path.join(SCENARIO_DIR, "*.yaml")))
+
+    results = {}
+    try:
+        with env(DEEPSEEK_API_KEY="bench", DEEPSEEK_BASE_URL=base_url):
+            for level in levels:
+                k = -(-trials // len(scenario_files))
+                plan = build_plan(scenario_files, k, random.Random(0))
+                # Spread the trials over scenarios rather than taking the first few scenarios' k
+                plan = sorted(plan, key=lambda t: t["run_config"]["run_id"])[:trials]
+                with tempfile.TemporaryDirectory() as out, quiet():
+                    start = time.perf_counter()
+                    run_concurrent(plan, out, level)
+                    wall = time.perf_counter() - start
+                results[f"trials_per_sec@c{level}"] = metric(len(plan) / wall, "trials/s", higher_is_better=True)
+                print(f"  concurrency {level}: {len(plan) / wall:.2f} trials/s")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def bench_overhead(trials: int) -> Dict[str, Any]:
+    """Harness time per turn with the instant built-in mock, i.e. excluding model latency."""
+    from evals.runner import GameRunner
+
+    scenario_files = sorted(glob.glob(os.path.join(SCENARIO_DIR, "*.yaml")))
+    turns = 0
+    with env(DEEPSEEK_API_KEY=None), tempfile.TemporaryDirectory() as out, quiet():
+        start = time.perf_counter()
+        for i in range(trials):
+            runner = GameRunner(scenario_files[i % len(scenario_files)], out,
+                                run_config={"run_id": i + 1, "temperature": 0.8, "seed": i},
+                                log=lambda msg: None)
+            runner.run()
+            turns += sum(1 for line in runner.transcript if line["speaker"] == "NPC")
+        wall = time.perf_counter() - start
+    print(f"  {wall / turns * 1000:.3f} ms/turn over {turns} turns")
+    return {"turn_overhead_ms": metric(wall / turns * 1000, "ms")}
+
+
+class _CannedClient:
+    """Stands in for LLMClient so only judge prompt building and parsing are timed."""
+    def __init__(self):
+        self.response = "{}"
+        self.last_messages = None
+
+    def chat_completion(self, messages, temperature=0.7, seed=None):
+        self.last_messages = messages
+        return self.response
+
+
+def bench_grader(iterations: int) -> Dict[str, Any]:
+    from evals.graders.rubric_llm import LLMGrader
+    from evals.mock_server import fake_reply
+
+    rubric = {"dimensions": {d: {"min": 0, "max": 5} for d in
+                             ("persona", "empathy", "helpfulness", "safety", "consistency")}}
+    transcript = [{"turn": t // 2, "speaker": "Player" if t % 2 == 0 else "NPC", "content": "猎人，今天也要加油哦。" * 8}
+                  for t in range(16)]
+
+    grader = LLMGrader()
+    client = _CannedClient()
+    grader.client = client
+    results = {}
+    for name, call in (("grader_parse_ms", lambda: grader.grade(transcript, rubric)),
+                       ("grader_batch_parse_ms", lambda: grader.grade_batch([transcript] * 4, rubric))):
+        # One call records the real prompt so the canned reply matches its dimensions
+        with quiet():
+            call()
+        client.response = fake_reply(client.last_messages, 0)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        per_call = (time.perf_counter() - start) / iterations * 1000
+        results[name] = metric(per_call, "ms")
+        print(f"  {name}: {per_call:.3f} ms")
+    return results
+
+
+def synthetic_record(i: int, rng: random.Random) -> Dict[str, Any]:
+    """A run record shaped like GameRunner output (16-line transcript, rule + rubric grades)."""
+    scenario = f"synthetic_{i % 20:02d}"
+    scores = {d: rng.randint(1, 5) for d in ("persona", "empathy", "helpfulness", "safety", "consistency")}
+    day, sec = divmod(i, 86400)
+    return {
+        "scenario": scenario,
+        "config": {"scenario_id": scenario, "max_turns": 8},
+        "run_config": {"run_id": i // 20 + 1, "temperature": 0.7 + rng.random() * 0.3, "seed": rng.randint(0, 10000)},
+        "transcript": [{"turn": t // 2, "speaker": "Player" if t % 2 == 0 else "NPC",
+                        "content": "哼，笨蛋猎人，" * rng.randint(3, 12)} for t in range(16)],
+        "grades": [
+            {"metric": "max_length", "result": "FAIL" if rng.random() < 0.1 else "PASS"},
+            {"metric": "rubric_eval", "scores": scores,
+             "reasoning": {d: "Synthetic reasoning for benchmarking." for d in scores},
+             "total_score": sum(scores.values()), "result": "PASS", "raw_output": "{}"},
+        ],
+        "context": {"npc": {"strategy": "full", "total_prompt_tokens": rng.randint(2000, 6000)},
+                    "player": {"strategy": "full", "total_prompt_tokens": rng.randint(2000, 6000)}},
+        "timestamp": f"2026{1 + day // 28 % 12:02d}{1 + day % 28:02d}_{sec // 3600:02d}{sec // 60 % 60:02d}{sec % 60:02d}",
+    }
+
+
+def make_synthetic_store(path: str, n: int):
+    from evals.store import SQLiteRunStore
+    store = SQLiteRunStore(path)
+    rng = random.Random(n)
+    # One transaction; per-row autocommit would dominate at 100k rows
+    store._conn.execute("BEGIN")
+    for i in range(n):
+        store.save(synthetic_record(i, rng))
+    store._conn.execute("COMMIT")
+    store._conn.close()
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def bench_store_consumers(sizes: List[int], which: List[str], repeat: int = 3) -> Dict[str, Any]:
+    """Report generation and viz-data build over synthetic SQLite stores."""
+    from evals.report.make_report import ReportGenerator
+    from evals.generate_viz_data import build_viz_data
+
+    results = {}
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "runs.db")
+            make_synthetic_store(db, n)
+            if "report" in which:
+                report = os.path.join(tmp, "report.md")
+                with quiet():
+                    wall = best_of(repeat, lambda: ReportGenerator(db).generate_markdown(report))
+                    # Separate pass under tracemalloc so tracing does not skew the timing
+                    tracemalloc.start()
+                    ReportGenerator(db).generate_markdown(report)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                results[f"report_sec@{n}"] = metric(wall, "s")
+                results[f"report_peak_mb@{n}"] = metric(peak / 1024 / 1024, "MB")
+                print(f"  report @{n}: {wall:.2f}s, peak {peak / 1024 / 1024:.1f} MB")
+            if "viz" in which:
+                web = os.path.join(tmp, "web")
+                os.makedirs(web)
+                with quiet():
+                    wall = best_of(repeat, lambda: build_viz_data(db, web))
+                index_bytes = os.path.getsize(os.path.join(web, "data.js"))
+                results[f"viz_sec@{n}"] = metric(wall, "s")
+                results[f"viz_index_kb@{n}"] = metric(index_bytes / 1024, "KB")
+                results[f"viz_total_mb@{n}"] = metric(dir_size(web) / 1024 / 1024, "MB")
+                print(f"  viz @{n}: {wall:.2f}s, index {index_bytes / 1024:.0f} KB")
+    return results
+
+
+def realistic_record(i: int, rng: random.Random, configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """synthetic_record with a real scenario config and per-call metrics, as GameRunner saves them."""
+    from evals.metrics import CallMetrics
+    record = synthetic_record(i, rng)
+    record["config"] = configs[i % len(configs)]
+    metrics = CallMetrics(record["scenario"], record["run_config"]["run_id"])
+    for turn in range(8):
+        metrics.turn = turn
+        for role in ("player", "npc"):
+            metrics.record(role, "deepseek-chat", 1.79e9 + i * 60 + turn, rng.uniform(300, 2000), "api",
+                           prompt_tokens=rng.randint(500, 3000), completion_tokens=rng.randint(20, 120))
+    metrics.record("judge", "deepseek-chat", 1.79e9 + i * 60 + 9, rng.uniform(2000, 6000), "api",
+                   prompt_tokens=rng.randint(2000, 4000), completion_tokens=rng.randint(200, 400))
+    record["metrics"] = metrics.to_dict()
+    return record
+
+
+def bench_store_formats(sizes: List[int], repeat: int = 3) -> Dict[str, Any]:
+    """Disk size and full load time of the same runs as a JSON directory and as a .pack store."""
+    from evals.registry import discover, load_scenarios
+    from evals.store import JsonDirStore, PackedRunStore
+
+    configs = [s.config for s in load_scenarios(discover("evals/scenarios"))]
+    results = {}
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            rng = random.Random(n)
+            stores = {"json": JsonDirStore(os.path.join(tmp, "runs")),
+                      "pack": PackedRunStore(os.path.join(tmp, "runs.pack"))}
+            for i in range(n):
+                record = realistic_record(i, rng, configs)
+                for store in stores.values():
+                    store.save(record)
+            for name, store in stores.items():
+                size_mb = dir_size(store.path) / 1024 / 1024
+                load = best_of(repeat, lambda: sum(1 for _ in store.iter_records()))
+                summaries = best_of(repeat, store.summaries)
+                results[f"store_{name}_mb@{n}"] = metric(size_mb, "MB")
+                results[f"store_{name}_load_sec@{n}"] = metric(load, "s")
+                results[f"store_{name}_summaries_sec@{n}"] = metric(summaries, "s")
+                print(f"  {name} @{n}: {size_mb:.1f} MB, load {load:.2f}s, summaries {summaries:.3f}s")
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a comparison table and return the names of regressed metrics."""
+    regressions = []
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base or not base["value"]:
+            print(f"{name:<28}{'-':>12}{cur['value']:>12.3f}{'new':>9}")
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if cur["higher_is_better"] else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28}{base['value']:>12.3f}{cur['value']:>12.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the eval harness offline")
+    parser.add_argument("--only", type=str, default=",".join(BENCHMARKS), help=f"Comma-separated subset of {BENCHMARKS}")
+    parser.add_argument("--concurrency", type=str, default="1,4,16", help="Concurrency levels for the throughput benchmark")
+    parser.add_argument("--trials", type=int, default=24, help="Trials per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stand-in server latency per request (seconds)")
+    parser.add_argument("--overhead-trials", type=int, default=40, help="Trials for the per-turn overhead benchmark")
+    parser.add_argument("--grader-iterations", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for report/viz timings (best is kept)")
+    parser.add_argument("--sizes", type=str, default="1000,10000,100000", help="Synthetic run counts for report/viz")
+    parser.add_argument("--store-sizes", type=str, default="1000,10000", help="Synthetic run counts for the store formats")
+    parser.add_argument("--output", type=str, default="evals/outputs/bench/latest.json", help="Where to write results")
+    parser.add_argument("--baseline", type=str, default="evals/bench_baseline.json",
+                        help="Baseline to compare against (tracked in git; refresh it with --save-baseline)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    which = [b.strip() for b in args.only.split(",") if b.strip()]
+    unknown = set(which) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    metrics: Dict[str, Any] = {}
+    if "throughput" in which:
+        print("Throughput (stand-in server):")
+        metrics.update(bench_throughput([int(c) for c in args.concurrency.split(",")], args.trials, args.latency))
+    if "overhead" in which:
+        print("Per-turn harness overhead (mock LLM):")
+        metrics.update(bench_overhead(args.overhead_trials))
+    if "grader" in which:
+        print("Judge prompt building and parsing:")
+        metrics.update(bench_grader(args.grader_iterations))
+    if "report" in which or "viz" in which:
+        print("Report / viz data over synthetic runs:")
+        metrics.update(bench_store_consumers(sizes, which, args.repeat))
+    if "store" in which:
+        print("Run store formats (JSON directory vs .pack):")
+        metrics.update(bench_store_formats([int(s) for s in args.store_sizes.split(",") if s], args.repeat))
+
+    result = {
+        "timestamp": time.strftime("%Y%m%d_%H%M%S"),
+        "python": sys.version.split()[0],
+        "params": vars(args),
+        "metrics": metrics,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["metrics"]
+    regressions = compare(metrics, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Spend a fixed budget of LLM calls or tokens where it tightens reliability
+estimates the most.
+
+Each scenario's history in the run store gives its pass rate, its (rubric
+range normalized) score variance and what a trial costs. The allocator
+hands out trials one at a time to the scenario whose estimate variance
+drops the most per unit of cost, i.e. var / ((N + 1)(N + 2)) / cost for a
+scenario with N runs so far, until the budget is spent. Stable scenarios
+that already have many runs get few new trials; flaky, expensive-to-pin-down
+ones get most of them. New trials of a scenario sample temperature
+stratified over TEMPERATURE_RANGE instead of independently.
+
+Estimates pool the new trials with the stored history, so the reported
+confidence is that of everything in the store for the scenario.
+"""
+import os
+import math
+import random
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+from evals.metrics import summarize_calls
+from evals.store import open_store, run_verdict
+
+TEMPERATURE_RANGE = (0.7, 1.0)
+BUDGET_UNITS = ("calls", "tokens")
+# Beta(1, 1) prior on the pass rate: an all-pass history still leaves some uncertainty to buy down
+PRIOR_PASSES = PRIOR_FAILS = 1.0
+# Variance of a uniform score on the normalized [0, 1] rubric range, used until a scenario has runs
+PRIOR_SCORE_VAR = 1 / 12
+# Per-trial cost guesses for scenarios without any history in the store
+DEFAULT_CALLS_PER_TURN = 2
+DEFAULT_TOKENS_PER_CALL = 1500
+
+
+def rubric_range(config: Dict) -> float:
+    """Span of the rubric total score (sum of the dimension ranges); 1 without a rubric."""
+    dims = (config.get('rubric') or {}).get('dimensions') or {}
+    return sum(b.get('max', 5) - b.get('min', 0) for b in dims.values()) or 1.0
+
+
+def wilson_interval(passes: float, n: int, confidence: float) -> Tuple[float, float]:
+    """Wilson score interval of a pass rate; (0, 1) with no runs."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = passes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z / (1 + z * z / n) * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def stratified_temperatures(m: int, rng: random.Random, low: float = TEMPERATURE_RANGE[0],
+                            high: float = TEMPERATURE_RANGE[1]) -> List[float]:
+    """One uniform draw from each of m equal slices of [low, high], in random order."""
+    temps = [low + (high - low) * (i + rng.random()) / m for i in range(m)]
+    rng.shuffle(temps)
+    return temps
+
+
+class ScenarioHistory:
+    """Running totals of one scenario's stored runs."""
+    def __init__(self, score_range: float = 1.0):
+        self.score_range = score_range
+        self.n = 0
+        self.passes = 0
+        self._score_sum = 0.0
+        self._score_sq = 0.0
+        self.calls = 0
+        self.tokens = 0
+
+    def add(self, is_pass: bool, score: float, calls: int, tokens: int):
+        self.n += 1
+        self.passes += int(is_pass)
+        x = score / self.score_range
+        self._score_sum += x
+        self._score_sq += x * x
+        self.calls += calls
+        self.tokens += tokens
+
+    @property
+    def pass_rate(self) -> float:
+        """Posterior mean of the pass rate."""
+        return (self.passes + PRIOR_PASSES) / (self.n + PRIOR_PASSES + PRIOR_FAILS)
+
+    @property
+    def score_mean(self) -> float:
+        return self._score_sum / self.n * self.score_range if self.n else 0.0
+
+    @property
+    def score_var(self) -> float:
+        """Normalized score variance, shrunk toward PRIOR_SCORE_VAR by two pseudo-runs."""
+        ss = self._score_sq - self._score_sum ** 2 / self.n if self.n else 0.0
+        return (max(ss, 0.0) + 2 * PRIOR_SCORE_VAR) / (max(self.n - 1, 0) + 2)
+
+    @property
+    def trial_variance(self) -> float:
+        """Variance one trial adds to the pass rate and normalized score estimates."""
+        p = self.pass_rate
+        return p * (1 - p) + self.score_var
+
+    def cost(self, unit: str) -> Optional[float]:
+        """Mean cost of a trial in `unit`, or None without history."""
+        if not self.n:
+            return None
+        return (self.calls if unit == "calls" else self.tokens) / self.n
+
+
+def load_history(runs_dir: str, score_ranges: Dict[str, float]) -> Dict[str, ScenarioHistory]:
+    """
+    Scenario id -> ScenarioHistory for the runs in the store; every scenario in
+    `score_ranges` (id -> rubric range) has an entry, empty if it has no runs yet.
+    """
+    history = {sid: ScenarioHistory(r) for sid, r in score_ranges.items()}
+    if not os.path.exists(runs_dir):
+        return history
+    for _, record in open_store(runs_dir).iter_records():
+        sid = record.get('scenario', 'Unknown')
+        if sid not in history:
+            history[sid] = ScenarioHistory(score_ranges.get(sid, 1.0))
+        is_pass, score = run_verdict(record)
+        metrics = record.get('metrics') or {}
+        summary = metrics.get('summary') or summarize_calls(metrics.get('calls') or [])
+        history[sid].add(is_pass, score, summary['calls'],
+                         summary['prompt_tokens'] + summary['completion_tokens'])
+    return history
+
+
+class BudgetAllocator:
+    """
+    Splits `budget` (in `unit`) into trials per scenario: every scenario first
+    gets `min_trials`, then each further trial goes to the scenario with the
+    largest variance reduction per unit of cost, capped at `max_trials`.
+    """
+    def __init__(self, history: Dict[str, ScenarioHistory], budget: float, unit: str = "calls",
+                 min_trials: int = 2, max_trials: Optional[int] = None):
+        if unit not in BUDGET_UNITS:
+            raise ValueError(f"Unknown budget unit: {unit}")
+        self.history = history
+        self.budget = budget
+        self.unit = unit
+        self.min_trials = min_trials
+        self.max_trials = max_trials
+
+    def trial_cost(self, scenario_id: str, max_turns: int) -> float:
+        """Mean cost of the scenario's trials; otherwise the mean over scenarios with history, or a guess."""
+        cost = self.history[scenario_id].cost(self.unit) if scenario_id in self.history else None
+        if cost:
+            return cost
+        known = [h.cost(self.unit) for h in self.history.values() if h.cost(self.unit)]
+        if known:
+            return sum(known) / len(known)
+        calls = DEFAULT_CALLS_PER_TURN * max_turns + 1
+        return calls if self.unit == "calls" else calls * DEFAULT_TOKENS_PER_CALL
+
+    def allocate(self, scenarios: Dict[str, int]) -> Tuple[Dict[str, int], Dict[str, float], float]:
+        """
+        `scenarios` maps scenario id -> max_turns. Returns (trials per scenario,
+        cost per trial, estimated spend).
+        """
+        costs = {sid: self.trial_cost(sid, turns) for sid, turns in scenarios.items()}
+        hist = {sid: self.history.get(sid) or ScenarioHistory() for sid in scenarios}
+        trials = {sid: 0 for sid in scenarios}
+        spent = 0.0
+        cap = self.max_trials if self.max_trials is not None else math.inf
+
+        # Floor first, round-robin so a tight budget still reaches every scenario
+        for _ in range(min(self.min_trials, cap)):
+            for sid in scenarios:
+                if spent + costs[sid] <= self.budget:
+                    trials[sid] += 1
+                    spent += costs[sid]
+
+        def gain(sid: str) -> float:
+            n = hist[sid].n + trials[sid]
+            return hist[sid].trial_variance / ((n + 1) * (n + 2)) / costs[sid]
+
+        while True:
+            open_ = [sid for sid in scenarios if trials[sid] < cap and spent + costs[sid] <= self.budget]
+            if not open_:
+                break
+            best = max(open_, key=gain)
+            trials[best] += 1
+            spent += costs[best]
+        return trials, costs, spent
+
+
+def confidence_row(h: ScenarioHistory, confidence: float, target: Optional[float] = None,
+                   extra_runs: int = 0) -> Dict:
+    """
+    Pass rate interval and score interval half-width for the scenario's runs.
+    With `extra_runs`, the projection for that many more runs at the current estimates.
+    """
+    n = h.n + extra_runs
+    passes = h.passes + extra_runs * (h.passes / h.n if h.n else 0.5)
+    lo, hi = wilson_interval(passes, n, confidence)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    score_half = z * math.sqrt(h.score_var / n) * h.score_range if n else None
+    verdict = None
+    # Nothing to project a verdict from without stored runs
+    if target is not None and h.n:
+        verdict = "above" if lo >= target else "below" if hi < target else "undecided"
+    return {"n": n, "pass_rate": passes / n if n else None, "ci": (lo, hi), "half_width": (hi - lo) / 2,
+            "score_mean": h.score_mean, "score_half_width": score_half, "vs_target": verdict}
+
+
+def format_confidence_table(history: Dict[str, ScenarioHistory], scenario_ids: List[str], confidence: float,
+                            target: Optional[float] = None, new_trials: Optional[Dict[str, int]] = None,
+                            project: bool = True) -> List[str]:
+    """
+    Lines of a per-scenario table. `new_trials` fills the 'new' column; with
+    `project`, the intervals are projected for running them on top of `history`.
+    """
+    pct = round(confidence * 100)
+    head = f"  {'scenario':<28} {'new':>4} {'n':>4}  {'pass':>5}  {pct}% CI          ±pass  ±score  vs target"
+    lines = [head]
+    for sid in scenario_ids:
+        h = history.get(sid) or ScenarioHistory()
+        extra = (new_trials or {}).get(sid, 0)
+        row = confidence_row(h, confidence, target, extra_runs=extra if project else 0)
+        rate = f"{row['pass_rate']:.2f}" if row['pass_rate'] is not None else "-"
+        score = f"{row['score_half_width']:.2f}" if row['score_half_width'] is not None else "-"
+        new = str(extra) if new_trials is not None else "-"
+        lines.append(f"  {sid:<28} {new:>4} {row['n']:>4}  {rate:>5}  [{row['ci'][0]:.2f}, {row['ci'][1]:.2f}]"
+                     f"  {row['half_width']:>5.2f}  {score:>6}  {row['vs_target'] or '-'}")
+    return lines
@@ -0,0 +1,86 @@
+import os
+import json
+import atexit
+import time
+import queue
+import socket
+import threading
+from typing import Dict, Any, Optional
+from evals.store import sidecar_path
+
+# trial_started -> turn (one per completed turn) -> graded -> saved | trial_failed;
+# sweep_started / sweep_finished bracket a run_eval invocation
+EVENT_TYPES = ("sweep_started", "trial_started", "turn", "graded", "saved", "trial_failed", "sweep_finished")
+
+
+def events_path(output_dir: str) -> str:
+    """Event stream file for a run store location."""
+    return sidecar_path(output_dir, "events.jsonl")
+
+
+class EventWriter:
+    """
+    Append-only JSONL event stream written off the hot path: emit() only puts
+    the event on an in-memory queue, and a background thread appends whatever
+    has accumulated in one write. Several processes (queue workers) can share
+    the file; O_APPEND keeps their lines from overwriting each other.
+    """
+    def __init__(self, path: str, flush_interval: float = 0.2):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.source = f"{socket.gethostname()}:{os.getpid()}"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def emit(self, event_type: str, **fields):
+        self._queue.put(dict(fields, type=event_type, ts=round(time.time(), 3), source=self.source))
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            # Gather whatever else arrives within the flush interval into the same write
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                closing = True
+                batch.pop()
+            if batch:
+                data = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in batch)
+                os.write(self._fd, data.encode("utf-8"))
+
+    def close(self):
+        """Write out everything emitted so far and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        os.close(self._fd)
+
+
+_writer: Optional[EventWriter] = None
+
+
+def configure_events(path: Optional[str]) -> Optional[EventWriter]:
+    """Send this process's events to `path` (None turns the stream off)."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+    _writer = EventWriter(path) if path else None
+    return _writer
+
+
+# Events still queued at exit are written out
+atexit.register(lambda: configure_events(None))
+
+
+def emit(event_type: str, **fields):
+    """Record an event if a stream is configured; never blocks on I/O."""
+    if _writer is not None:
+        _writer.emit(event_type, **fields)
+
@@ -1,68 +1,115 @@
 import json
 import os
 import glob
-import sys
+import hashlib
+import argparse
+from array import array
+from evals.store import open_store, run_verdict
+from evals.metrics import percentile, summarize_calls
 
-def main():
-    runs_dir = os.path.join(os.path.dirname(__file__), 'outputs', 'runs')
-    web_dir = os.path.join(os.path.dirname(__file__), 'web')
+# pass@k / pass^k curve points shipped to the viewer per scenario
+VIZ_MAX_K = 50
+
+def shard_id(key: str) -> str:
+    """File name of a run's detail shard, derived from its store key."""
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def make_shard(key: str, data) -> str:
+    """Detail shard script for one run; the viewer loads it with a <script> tag so it also works from file://"""
+    # The detail view only needs run_config, grades and transcript
+    shard = {
+        "scenario": data.get('scenario'),
+        "run_config": data.get('run_config', {}),
+        "timestamp": data.get('timestamp'),
+        "grades": data.get('grades', []),
+        "transcript": data.get('transcript', []),
+        "_filename": os.path.basename(key),
+    }
+    return f"window.EVAL_SHARD_LOADED({json.dumps(shard_id(key))}, {json.dumps(shard, ensure_ascii=False)});"
+
+def build_viz_data(runs_dir: str, web_dir: str) -> int:
+    """Write data.js and data/runs/*.js under web_dir; returns the number of runs."""
     output_file = os.path.join(web_dir, 'data.js')
+    shard_dir = os.path.join(web_dir, 'data', 'runs')
 
-    if not os.path.exists(runs_dir):
-        print(f"Error: Runs directory not found at {runs_dir}")
-        return
+    os.makedirs(shard_dir, exist_ok=True)
+    # Drop shards from a previous build so deleted runs do not linger
+    for stale in glob.glob(os.path.join(shard_dir, "*.js")):
+        os.remove(stale)
+
+    # NumPy comes in with the analysis, so only when the data is actually built
+    from evals.report import analysis
+    store = open_store(runs_dir)
+    index = []
+    # Header stats: latency over all API calls, tokens and cost per trial
+    call_ms, trial_tokens, cost = array('d'), array('d'), 0.0
+    collector = analysis.ScoreCollector() if analysis.available() else None
+
+    print(f"Found {store.count()} runs.")
+
+    # Records come back newest first; only the small index row is kept in memory
+    for key, data in store.iter_records():
+        run_shard = shard_id(key)
+
+        # Determine Pass/Fail and Score for easier frontend consumption
+        is_pass, total_score = run_verdict(data)
+        if collector is not None:
+            collector.add(data.get('scenario', 'Unknown'), is_pass, total_score, analysis.dimension_scores(data))
+
+        calls = (data.get('metrics') or {}).get('calls') or []
+        if calls:
+            summary = data['metrics'].get('summary') or summarize_calls(calls)
+            call_ms.extend(c['wall_ms'] for c in calls if c['source'] == 'api')
+            trial_tokens.append(summary['prompt_tokens'] + summary['completion_tokens'])
+            cost += summary['cost_usd']
+
+        index.append({
+            "id": run_shard,
+            "scenario": data.get('scenario'),
+            "run_id": data.get('run_config', {}).get('run_id'),
+            "timestamp": data.get('timestamp'),
+            "_is_pass": is_pass,
+            "_total_score": total_score,
+        })
+
+        with open(os.path.join(shard_dir, f"{run_shard}.js"), 'w', encoding='utf-8') as f:
+            f.write(make_shard(key, data))
+
+    # Write the summary index as a JS variable
+    js_content = f"window.EVAL_INDEX = {json.dumps(index, ensure_ascii=False, separators=(',', ':'))};"
+    if trial_tokens:
+        metrics = {
+            "latency_p50_ms": percentile(call_ms, 50),
+            "latency_p95_ms": percentile(call_ms, 95),
+            "tokens_per_trial_p50": percentile(trial_tokens, 50),
+            "tokens_per_trial_p95": percentile(trial_tokens, 95),
+            "cost_usd": cost,
+        }
+        js_content += f"\nwindow.EVAL_METRICS = {json.dumps(metrics)};"
+    if collector is not None and len(collector):
+        stats = analysis.analyze(collector.arrays())
+        for st in stats["scenarios"].values():
+            for field in ("pass_at_k", "pass_at_k_ci", "pass_caret_k", "pass_caret_k_ci"):
+                st[field] = st[field][:VIZ_MAX_K]
+        js_content += f"\nwindow.EVAL_ANALYSIS = {json.dumps(stats, ensure_ascii=False, separators=(',', ':'))};"
 
-    os.makedirs(web_dir, exist_ok=True)
-
-    json_files = glob.glob(os.path.join(runs_dir, "*.json"))
-    records = []
-    
-    print(f"Found {len(json_files)} run files.")
-
-    for f in json_files:
-        try:
-            with open(f, 'r', encoding='utf-8') as fd:
-                data = json.load(fd)
-                # Add filename for reference
-                data['_filename'] = os.path.basename(f)
-                
-                # Determine Pass/Fail and Score for easier frontend consumption
-                is_pass = True
-                total_score = 0
-                
-                grades = data.get('grades', [])
-                for g in grades:
-                    if g.get('result') == 'FAIL':
-                        is_pass = False
-                    
-                    if g.get('metric') == 'rubric_eval':
-                        if g.get('result') == 'FAIL':
-                            is_pass = False
-                        
-                        s = g.get('total_score', 0)
-                        if s == '-': s = 0
-                        try:
-                            total_score = float(s)
-                        except (ValueError, TypeError):
-                            total_score = 0
-
-                data['_is_pass'] = is_pass
-                data['_total_score'] = total_score
-                
-                records.append(data)
-        except Exception as e:
-            print(f"Error reading {f}: {e}")
-
-    # Sort by timestamp descending
-    records.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-
-    # Write as a JS variable
-    js_content = f"window.EVAL_DATA = {json.dumps(records, ensure_ascii=False, indent=2)};"
-    
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(js_content)
 
-    print(f"Successfully wrote {len(records)} records to {output_file}")
+    print(f"Successfully wrote {len(index)} index rows to {output_file} and shards to {shard_dir}")
+    return len(index)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the eval viewer data (summary index + per-run shards)")
+    parser.add_argument("--runs", type=str, default=os.path.join(os.path.dirname(__file__), 'outputs', 'runs'),
+                        help="Run store: directory of run JSONs or a .db file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.runs):
+        print(f"Error: Runs directory not found at {args.runs}")
+        return
+
+    build_viz_data(args.runs, os.path.join(os.path.dirname(__file__), 'web'))
 
 if __name__ == "__main__":
     main()
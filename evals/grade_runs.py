@@ -0,0 +1,44 @@
+import argparse
+import time
+from evals.graders.batch import BatchGradingStage
+from evals.graders.cascade import DEFAULT_AUDIT_RATE, DEFAULT_CONFIDENCE, configure_cascade
+from evals.graders.local_scorer import DEFAULT_MODEL_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade saved runs that have no LLM judge result yet")
+    parser.add_argument("--runs-dir", type=str, default="evals/outputs/runs", help="Run store: directory of run JSONs or a .db file")
+    parser.add_argument("--workers", type=int, default=2, help="Number of concurrent judge requests")
+    parser.add_argument("--batch-size", type=int, default=4, help="Max transcripts packed into one judge request")
+    parser.add_argument("--max-chars", type=int, default=24000, help="Max transcript characters per judge request")
+    parser.add_argument("--judge", choices=["cascade", "always"], default="cascade",
+                        help="cascade: judge only the runs the rule checks and the local scorer cannot settle")
+    parser.add_argument("--local-model", type=str, default=DEFAULT_MODEL_PATH, help="Trained local scorer for the cascade")
+    parser.add_argument("--cascade-confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help="Local predictions below this confidence go to the judge")
+    parser.add_argument("--cascade-audit", type=float, default=DEFAULT_AUDIT_RATE,
+                        help="Fraction of confidently scored runs sent to the judge anyway to measure agreement")
+    parser.add_argument("--watch", action="store_true", help="Keep polling for new ungraded runs (Ctrl-C to stop)")
+    parser.add_argument("--poll-interval", type=float, default=10.0, help="Seconds between polls in --watch mode")
+
+    args = parser.parse_args()
+
+    cascade = configure_cascade(args.local_model, confidence=args.cascade_confidence,
+                                audit_rate=args.cascade_audit) if args.judge == "cascade" else None
+    stage = BatchGradingStage(args.runs_dir, workers=args.workers,
+                              max_batch=args.batch_size, max_chars=args.max_chars, cascade=cascade)
+    try:
+        while True:
+            stats = stage.run()
+            if stats["runs"] or not args.watch:
+                print(f"Graded {stats['runs']} runs with {stats['judge_requests']} judge requests "
+                      f"({stats['failed_batches']} failed batches).")
+            if not args.watch:
+                break
+            time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
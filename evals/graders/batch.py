@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Callable, Optional
+from evals.graders.rubric_llm import LLMGrader, format_transcript
+from evals.graders.rules import RULE_METRICS
+from evals.store import open_store, sidecar_path
+from evals.metrics import CallMetrics
+from evals.work_queue import worker_name
+
+# A claim older than this is treated as left behind by a crashed grader
+CLAIM_TTL = 900.0
+
+
+def claims_dir(runs_dir: str) -> str:
+    """Where grading claims go for a run store location."""
+    return sidecar_path(runs_dir, "claims")
+
+
+class GradingClaims:
+    """
+    Lock files marking runs a grader is working on, so a `grade_runs --watch`
+    process and run_eval's deferred grading stage never grade the same run.
+    A claim is taken by creating its file exclusively; stale claims (older
+    than `ttl`) are taken over.
+    """
+    def __init__(self, runs_dir: str, ttl: float = CLAIM_TTL):
+        self.path = claims_dir(runs_dir)
+        self.ttl = ttl
+        self.token = f"{worker_name()}:{id(self)}"
+        self.held: List[str] = []
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, hashlib.sha256(key.encode('utf-8')).hexdigest()[:24] + ".claim")
+
+    def acquire(self, key: str) -> bool:
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(key)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < self.ttl:
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"key": key, "owner": self.token, "claimed_at": time.time()}))
+            self.held.append(path)
+            return True
+        return False
+
+    def release_all(self):
+        for path in self.held:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    owner = json.load(f).get('owner')
+                # Leave claims another grader took over as stale
+                if owner == self.token:
+                    os.remove(path)
+            except (OSError, ValueError):
+                pass
+        self.held = []
+
+
+def needs_llm_grade(record: Dict[str, Any]) -> bool:
+    """A run is ungraded if its scenario has a rubric but no rubric_eval grade was stored."""
+    if 'rubric' not in record.get('config', {}):
+        return False
+    if (record.get('early_stop') or {}).get('judge_skipped'):
+        return False
+    return not any(g.get('metric') == 'rubric_eval' for g in record.get('grades', []))
+
+
+def rubric_key(record: Dict[str, Any]) -> str:
+    rubric = json.dumps(record['config']['rubric'], sort_keys=True, ensure_ascii=False)
+    return f"{record.get('scenario', 'unknown')}:{hashlib.sha256(rubric.encode('utf-8')).hexdigest()[:12]}"
+
+
+def pack_batches(items: List[Tuple[str, Dict[str, Any]]], max_batch: int, max_chars: int) -> List[List[Tuple[str, Dict[str, Any]]]]:
+    """Greedily pack runs sharing a rubric into batches bounded by count and transcript size."""
+    batches, current, size = [], [], 0
+    for key, record in items:
+        n = len(format_transcript(record.get('transcript', [])))
+        if current and (len(current) >= max_batch or size + n > max_chars):
+            batches.append(current)
+            current, size = [], 0
+        current.append((key, record))
+        size += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+class BatchGradingStage:
+    """
+    Grades runs in a run store that were saved without an LLM judge result.
+    Runs of the same scenario and rubric are packed into one judge request
+    (up to `max_batch` transcripts / `max_chars` characters), and batches are
+    graded by a pool of `workers` independent of the conversation workers.
+    With a grading `cascade`, runs its cheap tiers settle are graded locally
+    and only the rest are sent to the judge.
+    """
+    def __init__(self, runs_dir: str, workers: int = 2, max_batch: int = 4, max_chars: int = 24000,
+                 log: Optional[Callable[[str], None]] = None, cascade=None):
+        self.runs_dir = runs_dir
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_chars = max_chars
+        self.log = log or print
+        self.cascade = cascade
+        # store key -> why the cascade escalated the run (attached to its judge grade)
+        self._escalations: Dict[str, Dict[str, Any]] = {}
+
+    def pending(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [(key, record) for key, record in open_store(self.runs_dir).iter_records()
+                if needs_llm_grade(record)]
+
+    def claim(self, items: List[Tuple[str, Dict[str, Any]]], claims: GradingClaims) -> List[Tuple[str, Dict[str, Any]]]:
+        """The runs this stage now holds claims on, re-read in case another grader finished them meanwhile."""
+        store = open_store(self.runs_dir)
+        claimed = []
+        for key, _ in items:
+            if not claims.acquire(key):
+                continue
+            record = store.get(key)
+            if record is not None and needs_llm_grade(record):
+                claimed.append((key, record))
+        return claimed
+
+    def triage(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Grade the runs the cascade settles without the judge; returns the ones left for the judge."""
+        store = open_store(self.runs_dir)
+        escalated = []
+        for key, record in items:
+            rule_grades = [g for g in record.get('grades', []) if g.get('metric') in RULE_METRICS]
+            grade, info = self.cascade.triage(record.get('transcript') or [], record['config'], rule_grades,
+                                              record.get('trial_key') or key)
+            if grade is None:
+                self._escalations[key] = info
+                escalated.append((key, record))
+            else:
+                record.setdefault('grades', []).append(grade)
+                store.update(key, record)
+        return escalated
+
+    def plan(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[List[Tuple[str, Dict[str, Any]]]]:
+        groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for key, record in items:
+            groups.setdefault(rubric_key(record), []).append((key, record))
+        batches = []
+        for key in sorted(groups):
+            batches.extend(pack_batches(groups[key], self.max_batch, self.max_chars))
+        return batches
+
+    def _grade_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> Tuple[int, int]:
+        """Grade one batch; returns (runs graded, judge requests made, including per-run fallbacks)."""
+        judge_metrics = CallMetrics()
+        grader = LLMGrader(metrics=judge_metrics, log=self.log)
+        rubric = batch[0][1]['config']['rubric']
+        grades = grader.grade_batch([record.get('transcript', []) for _, record in batch], rubric)
+        store = open_store(self.runs_dir)
+        for (key, record), grade in zip(batch, grades):
+            if key in self._escalations:
+                self.cascade.annotate(grade, self._escalations[key])
+            record.setdefault('grades', []).append(grade)
+            # The judge requests served the whole batch; each run is charged its share
+            metrics = CallMetrics.from_dict(record.get('metrics'), record.get('scenario'),
+                                            record.get('run_config', {}).get('run_id'))
+            metrics.extend(judge_metrics.calls, shared_by=len(batch))
+            record['metrics'] = metrics.to_dict()
+            store.update(key, record)
+        return len(batch), grader.requests
+
+    def run(self) -> Dict[str, int]:
+        claims = GradingClaims(self.runs_dir)
+        try:
+            return self._run(self.claim(self.pending(), claims))
+        finally:
+            claims.release_all()
+
+    def _run(self, items: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        resolved = 0
+        if self.cascade and items:
+            escalated = self.triage(items)
+            resolved = len(items) - len(escalated)
+            if resolved:
+                self.log(f"Cascade settled {resolved} of {len(items)} runs without the judge.")
+            items = escalated
+        batches = self.plan(items)
+        if not batches:
+            return {"runs": resolved, "judge_requests": 0, "failed_batches": 0}
+
+        self.log(f"Grading {len(items)} runs in {len(batches)} judge requests with {self.workers} workers.")
+        graded, requests, failed = 0, 0, 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._grade_batch, batch) for batch in batches]
+            for fut in futures:
+                try:
+                    runs, made = fut.result()
+                    graded += runs
+                    requests += made
+                except Exception as e:
+                    failed += 1
+                    self.log(f"Grading batch failed: {e}")
+        return {"runs": resolved + graded, "judge_requests": requests, "failed_batches": failed}
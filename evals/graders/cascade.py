@@ -0,0 +1,111 @@
+"""
+Cheap-first grading: the LLM judge only sees runs the local tiers cannot settle.
+
+1. rules: a run that failed a deterministic check (forbidden content, length,
+   repetition) is FAIL whatever the judge would say.
+2. local: the LocalScorer predicts the rubric scores from similar judge-graded
+   runs; a prediction at or above `confidence` is the run's grade, unless a
+   hard-fail check is ambiguous (a cue word without a forbidden match, or a
+   hard_fail label no local pattern covers).
+3. judge: everything else. The judge's grade keeps the local prediction and the
+   reason for escalating, so the report can measure how often the two agree.
+
+A fraction `audit_rate` of runs the local tier would have settled is sent to
+the judge anyway (chosen by trial key, so reruns audit the same runs); their
+agreement is an unbiased estimate of the local tier's accuracy, unlike that of
+escalated runs, which were uncertain to begin with.
+"""
+import os
+import hashlib
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from evals.graders.local_scorer import LocalScorer, DEFAULT_MODEL_PATH
+from evals.graders.rules import compile_rules
+
+DEFAULT_CONFIDENCE = 0.9
+DEFAULT_AUDIT_RATE = 0.1
+
+
+class CascadeGrader:
+    def __init__(self, scorer: Optional[LocalScorer] = None, confidence: float = DEFAULT_CONFIDENCE,
+                 audit_rate: float = DEFAULT_AUDIT_RATE):
+        self.scorer = scorer
+        self.confidence = confidence
+        self.audit_rate = audit_rate
+
+    def audited(self, key: str) -> bool:
+        return int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000 < self.audit_rate
+
+    def triage(self, transcript: List[Dict], config: Dict[str, Any], rule_grades: List[Dict[str, Any]],
+               key: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """
+        (grade, info): the rubric grade when a cheap tier settles the run,
+        otherwise None and info on why it needs the judge (`escalation`,
+        plus the local prediction as `local` when there is one).
+        """
+        rubric = config['rubric']
+        prediction = self.scorer.predict(config.get('scenario_id', 'unknown'), transcript, rubric) \
+            if self.scorer else None
+        local = {k: prediction[k] for k in ("scores", "total_score", "result", "confidence")} if prediction else None
+
+        failed_rules = [g['metric'] for g in rule_grades if g.get('result') == 'FAIL']
+        if failed_rules:
+            grade = {"metric": "rubric_eval", "tier": "rules", "result": "FAIL",
+                     "reason": f"Failed local checks: {', '.join(failed_rules)}; judge not called."}
+            if prediction:
+                grade.update(scores=prediction["scores"], total_score=prediction["total_score"], local=local)
+            return grade, {}
+
+        ambiguous = compile_rules(config).ambiguous(transcript)
+        if ambiguous:
+            a = ambiguous[0]
+            where = f"cue '{a['cue']}' at turn {a['turn']}" if a['cue'] else "no local pattern"
+            return None, {"escalation": f"ambiguous hard_fail {a['rule']} ({where})", "local": local}
+        if prediction is None:
+            return None, {"escalation": "no local model" if self.scorer is None else "no similar graded runs"}
+        if prediction["confidence"] < self.confidence:
+            return None, {"escalation": f"low confidence {prediction['confidence']:.2f}", "local": local}
+        if self.audited(key):
+            return None, {"escalation": "audit", "local": local}
+        return {"metric": "rubric_eval", "tier": "local", "scores": prediction["scores"],
+                "total_score": prediction["total_score"], "result": prediction["result"],
+                "failed_dimensions": prediction["failed_dimensions"], "confidence": prediction["confidence"],
+                "reason": f"Predicted from {prediction['neighbors']} similar judge-graded runs "
+                          f"(best similarity {prediction['similarity']:.2f})."}, {}
+
+    @staticmethod
+    def annotate(grade: Dict[str, Any], info: Dict[str, Any]) -> Dict[str, Any]:
+        """Mark a judge grade with why it was escalated and what the local tier predicted."""
+        grade["tier"] = "judge"
+        grade["escalation"] = info.get("escalation")
+        if info.get("local"):
+            grade["local"] = info["local"]
+        return grade
+
+    def grade(self, transcript: List[Dict], config: Dict[str, Any], rule_grades: List[Dict[str, Any]], key: str,
+              judge: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """The cheap grade if a local tier settles the run, else `judge()` annotated with the escalation."""
+        grade, info = self.triage(transcript, config, rule_grades, key)
+        if grade is not None:
+            return grade
+        return self.annotate(judge(), info)
+
+
+_cascade: Optional[CascadeGrader] = None
+
+
+def configure_cascade(model_path: Optional[str] = DEFAULT_MODEL_PATH, confidence: float = DEFAULT_CONFIDENCE,
+                      audit_rate: float = DEFAULT_AUDIT_RATE) -> CascadeGrader:
+    """Grade every run in this process through the cascade; without a trained model only the rules tier applies."""
+    global _cascade
+    scorer = LocalScorer.load(model_path) if model_path and os.path.exists(model_path) else None
+    if scorer is None:
+        # No model ships with the repo: it has to be trained on this project's judge-graded runs
+        print(f"Warning: no local scorer at {model_path}; the cascade only settles runs that fail the rule "
+              f"checks and sends the rest to the judge. Train one with "
+              f"`python -m evals.graders.local_scorer <runs> --model {model_path or DEFAULT_MODEL_PATH}`.")
+    _cascade = CascadeGrader(scorer, confidence=confidence, audit_rate=audit_rate)
+    return _cascade
+
+
+def get_cascade() -> Optional[CascadeGrader]:
+    return _cascade
@@ -0,0 +1,198 @@
+"""
+Cheap local stand-in for the LLM judge: a nearest-neighbour scorer over the
+lexical features of NPC replies, trained offline on runs the judge already
+graded.
+
+A transcript is represented by the character 1-2 grams of its NPC lines
+(log-scaled counts x IDF, L2-normalized and pruned to the strongest
+MAX_FEATURES). Its rubric scores are predicted as the similarity-weighted
+mean of the judge's scores for the k most similar graded runs of the same
+scenario, and the confidence is the similarity-weighted share of those
+neighbours whose own PASS/FAIL verdict agrees with the prediction. Runs with
+too few similar neighbours get confidence 0 and go to the judge.
+"""
+import os
+import re
+import json
+import math
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from evals.graders.rubric_llm import rubric_verdict
+
+DEFAULT_MODEL_PATH = "evals/graders/local_scorer.json"
+NGRAMS = (1, 2)
+MAX_FEATURES = 200
+
+
+def ngram_counts(transcript: List[Dict]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for line in transcript:
+        if line['speaker'] != "NPC":
+            continue
+        text = re.sub(r"\s+", "", line['content'])
+        for n in NGRAMS:
+            for i in range(len(text) - n + 1):
+                gram = text[i:i + n]
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def judge_scores(record: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """Numeric rubric scores the LLM judge gave a run, or None (not judged, or scored by the cascade's cheap tier)."""
+    for g in record.get('grades', []):
+        if g.get('metric') == 'rubric_eval' and g.get('tier', 'judge') == 'judge' and isinstance(g.get('scores'), dict):
+            try:
+                return {dim: float(v) for dim, v in g['scores'].items()}
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class LocalScorer:
+    def __init__(self, idf: Dict[str, float], examples: List[Dict[str, Any]], k: int = 7,
+                 min_similarity: float = 0.2, min_neighbors: int = 3, validation: Optional[Dict[str, Any]] = None):
+        self.idf = idf
+        # Grams never seen in training are as rare as the rarest seen one
+        self.default_idf = max(idf.values(), default=1.0)
+        self.examples = examples
+        self.k = k
+        self.min_similarity = min_similarity
+        self.min_neighbors = min_neighbors
+        self.validation = validation or {}
+        # scenario -> gram -> [(example index, weight)]
+        self._index: Dict[str, Dict[str, List[Tuple[int, float]]]] = {}
+        for i, ex in enumerate(examples):
+            postings = self._index.setdefault(ex["scenario"], {})
+            for gram, w in ex["vector"].items():
+                postings.setdefault(gram, []).append((i, w))
+
+    def vector(self, transcript: List[Dict]) -> Dict[str, float]:
+        return _vector(ngram_counts(transcript), self.idf, self.default_idf)
+
+    def neighbors(self, scenario: str, vector: Dict[str, float], exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """The k most similar graded runs of `scenario` above min_similarity, as (example index, cosine)."""
+        postings = self._index.get(scenario)
+        if not postings:
+            return []
+        sims: Dict[int, float] = {}
+        for gram, w in vector.items():
+            for i, v in postings.get(gram, ()):
+                sims[i] = sims.get(i, 0.0) + w * v
+        sims.pop(exclude, None)
+        ranked = sorted(((i, s) for i, s in sims.items() if s >= self.min_similarity), key=lambda x: -x[1])
+        return ranked[:self.k]
+
+    def predict(self, scenario: str, transcript: List[Dict], rubric: Dict[str, Any],
+                exclude: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Predicted scores, total, verdict and confidence for a run, or None when
+        the scenario has no similar graded runs at all.
+        """
+        vector = self.examples[exclude]["vector"] if exclude is not None else self.vector(transcript)
+        near = self.neighbors(scenario, vector, exclude=exclude)
+        if not near:
+            return None
+        weight = sum(s for _, s in near)
+        scores = {}
+        for dim in (rubric.get('dimensions') or {}):
+            values = [(self.examples[i]["scores"][dim], s) for i, s in near if dim in self.examples[i]["scores"]]
+            if values:
+                scores[dim] = round(sum(v * s for v, s in values) / sum(s for _, s in values), 2)
+        result, failed = rubric_verdict(scores, rubric)
+        agree = sum(s for i, s in near if rubric_verdict(self.examples[i]["scores"], rubric)[0] == result)
+        confidence = agree / weight if len(near) >= self.min_neighbors else 0.0
+        return {
+            "scores": scores,
+            "total_score": round(sum(scores.values()), 2),
+            "result": result,
+            "failed_dimensions": failed,
+            "confidence": round(confidence, 4),
+            "neighbors": len(near),
+            "similarity": round(near[0][1], 4),
+        }
+
+    @classmethod
+    def train(cls, records: List[Dict[str, Any]], **kwargs) -> "LocalScorer":
+        """Fit on every judge-graded run in `records`, then measure leave-one-out agreement with the judge."""
+        graded = []
+        for record in records:
+            scores = judge_scores(record)
+            if scores and record.get('config', {}).get('rubric'):
+                graded.append((record.get('scenario', 'unknown'), ngram_counts(record.get('transcript') or []),
+                               scores, record['config']['rubric']))
+        df: Dict[str, int] = {}
+        for _, counts, _, _ in graded:
+            for gram in counts:
+                df[gram] = df.get(gram, 0) + 1
+        n = len(graded)
+        idf = {gram: round(math.log((1 + n) / (1 + d)) + 1, 4) for gram, d in df.items()}
+        examples = [{"scenario": sid, "vector": _vector(counts, idf, 1.0), "scores": scores}
+                    for sid, counts, scores, _ in graded]
+        scorer = cls(idf, examples, **kwargs)
+        scorer.validation = scorer._leave_one_out([rubric for _, _, _, rubric in graded])
+        return scorer
+
+    def _leave_one_out(self, rubrics: List[Dict[str, Any]], confidence: float = 0.9) -> Dict[str, Any]:
+        """Verdict agreement with the judge when each training run is predicted from the others."""
+        predicted, agree, confident, confident_agree = 0, 0, 0, 0
+        for i, (ex, rubric) in enumerate(zip(self.examples, rubrics)):
+            p = self.predict(ex["scenario"], [], rubric, exclude=i)
+            if p is None:
+                continue
+            hit = p["result"] == rubric_verdict(ex["scores"], rubric)[0]
+            predicted += 1
+            agree += hit
+            if p["confidence"] >= confidence:
+                confident += 1
+                confident_agree += hit
+        return {
+            "runs": len(self.examples),
+            "predicted": predicted,
+            "agreement": round(agree / predicted, 4) if predicted else None,
+            "confidence": confidence,
+            "resolved": confident,
+            "resolved_agreement": round(confident_agree / confident, 4) if confident else None,
+        }
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"), "k": self.k,
+                       "min_similarity": self.min_similarity, "min_neighbors": self.min_neighbors,
+                       "validation": self.validation, "idf": self.idf, "examples": self.examples},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalScorer":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["idf"], data["examples"], k=data["k"], min_similarity=data["min_similarity"],
+                   min_neighbors=data["min_neighbors"], validation=data.get("validation"))
+
+
+def _vector(counts: Dict[str, int], idf: Dict[str, float], default_idf: float) -> Dict[str, float]:
+    weights = {gram: (1 + math.log(c)) * idf.get(gram, default_idf) for gram, c in counts.items()}
+    top = sorted(weights.items(), key=lambda x: -x[1])[:MAX_FEATURES]
+    norm = math.sqrt(sum(w * w for _, w in top)) or 1.0
+    return {gram: round(w / norm, 4) for gram, w in top}
+
+
+if __name__ == "__main__":
+    import argparse
+    from evals.store import open_store
+    parser = argparse.ArgumentParser(description="Train the local scorer of the grading cascade on judge-graded runs")
+    parser.add_argument("runs_dir", nargs="?", default="evals/outputs/runs", help="Run store: directory of run JSONs or a .db file")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL_PATH, help="Where to write the trained scorer")
+    parser.add_argument("--k", type=int, default=7, help="Neighbours per prediction")
+    parser.add_argument("--min-similarity", type=float, default=0.2, help="Cosine below which a graded run is not a neighbour")
+    args = parser.parse_args()
+
+    scorer = LocalScorer.train([r for _, r in open_store(args.runs_dir).iter_records()], k=args.k,
+                               min_similarity=args.min_similarity)
+    if not scorer.examples:
+        raise SystemExit(f"No judge-graded runs in {args.runs_dir}.")
+    scorer.save(args.model)
+    v = scorer.validation
+    print(f"Trained on {v['runs']} judge-graded runs -> {args.model}")
+    print(f"Leave-one-out: {v['predicted']} predicted, verdict agreement {v['agreement']}; "
+          f"{v['resolved']} confident at >= {v['confidence']} with agreement {v['resolved_agreement']}")
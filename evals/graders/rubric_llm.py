@@ -1,30 +1,77 @@
-from typing import List, Dict, Any
+import json
+import re
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from evals.llm_client import LLMClient
+from evals.metrics import CallMetrics
+
+SYSTEM_PROMPT = "You are an automated evaluator. Always output valid JSON."
+
+# A dimension without its own `pass` threshold passes at this fraction of its range
+DEFAULT_PASS_FRACTION = 0.6
+
+
+def format_transcript(transcript: List[Dict]) -> str:
+    transcript_text = ""
+    for line in transcript:
+        transcript_text += f"{line['speaker']}: {line['content']}\n"
+    return transcript_text
+
+
+def format_dimensions(rubric: Dict[str, Any]) -> str:
+    dimensions_text = ""
+    if 'dimensions' in rubric:
+        for dim, range_val in rubric['dimensions'].items():
+            min_val = range_val.get('min', 0)
+            max_val = range_val.get('max', 5)
+            dimensions_text += f"- {dim}: Score between {min_val} and {max_val}\n"
+    else:
+         # Fallback if rubric format is different
+         dimensions_text = f"Evaluate based on the following criteria: {rubric}"
+    return dimensions_text
+
+
+def pass_thresholds(rubric: Dict[str, Any]) -> Dict[str, float]:
+    """Minimum passing score per rubric dimension: its `pass` value, or DEFAULT_PASS_FRACTION of its range."""
+    thresholds = {}
+    for dim, bounds in (rubric.get('dimensions') or {}).items():
+        lo, hi = bounds.get('min', 0), bounds.get('max', 5)
+        thresholds[dim] = bounds.get('pass', lo + DEFAULT_PASS_FRACTION * (hi - lo))
+    return thresholds
+
+
+def rubric_verdict(scores: Dict[str, Any], rubric: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """PASS if every rubric dimension reaches its threshold; a missing or non-numeric score fails its dimension."""
+    failed = []
+    for dim, threshold in pass_thresholds(rubric).items():
+        try:
+            ok = float(scores.get(dim)) >= threshold
+        except (TypeError, ValueError):
+            ok = False
+        if not ok:
+            failed.append(dim)
+    return ("FAIL" if failed else "PASS"), failed
+
 
 class LLMGrader:
-    def __init__(self, model: str = "deepseek-chat"):
-        self.client = LLMClient(provider="deepseek", model=model)
+    def __init__(self, model: str = "deepseek-chat", metrics: Optional[CallMetrics] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        self.client = LLMClient(provider="deepseek", model=model, metrics=metrics, role="judge")
+        self.log = log or print
+        # Judge requests made so far (a batch whose parse fails costs one more per transcript)
+        self.requests = 0
 
-    def grade(self, transcript: List[Dict], rubric: Dict[str, Any]) -> Dict[str, Any]:
+    def grade(self, transcript: List[Dict], rubric: Dict[str, Any], dimensions_text: Optional[str] = None) -> Dict[str, Any]:
         """
         Grade the transcript based on the rubric dictionary.
         Returns a dict with structured scores and reasoning.
+        `dimensions_text` is the pre-formatted rubric, when the caller has it cached.
         """
         # Format transcript for LLM
-        transcript_text = ""
-        for line in transcript:
-            transcript_text += f"{line['speaker']}: {line['content']}\n"
-        
+        transcript_text = format_transcript(transcript)
+
         # Format Rubric Instructions
-        dimensions_text = ""
-        if 'dimensions' in rubric:
-            for dim, range_val in rubric['dimensions'].items():
-                min_val = range_val.get('min', 0)
-                max_val = range_val.get('max', 5)
-                dimensions_text += f"- {dim}: Score between {min_val} and {max_val}\n"
-        else:
-             # Fallback if rubric format is different
-             dimensions_text = f"Evaluate based on the following criteria: {rubric}"
+        if dimensions_text is None:
+            dimensions_text = format_dimensions(rubric)
 
         prompt = f"""
 You are an expert judge of AI NPC performance.
@@ -56,15 +103,13 @@ Output Format (JSON):
   "max_possible_score": <number>
 }}
 """
-        messages = [{"role": "system", "content": "You are an automated evaluator. Always output valid JSON."},
+        messages = [{"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}]
-        
+
+        self.requests += 1
         response = self.client.chat_completion(messages)
-        
+
         # Parse JSON
-        import json
-        import re
-        
         try:
             # Try to find JSON block if mixed with text
             json_match = re.search(r"\{.*\}", response, re.DOTALL)
@@ -73,21 +118,100 @@ Output Format (JSON):
                 data = json.loads(json_str)
             else:
                 data = json.loads(response)
-                
-            return {
-                "metric": "rubric_eval",
-                "scores": data.get("scores", {}),
-                "reasoning": data.get("reasoning", {}),
-                "total_score": data.get("total_score", 0),
-                "result": "PASS", # Implicit pass for now, or define threshold
-                "raw_output": response
-            }
+
+            return self._to_grade(data, response, rubric)
+        except Exception as e:
+            self.log(f"Failed to parse grader JSON: {e}")
+            return self._error_grade(e, response)
+
+    def grade_batch(self, transcripts: List[List[Dict]], rubric: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Grade several transcripts that share one rubric in a single judge request.
+        Transcripts the judge fails to return are graded individually.
+        """
+        if len(transcripts) == 1:
+            return [self.grade(transcripts[0], rubric)]
+
+        transcripts_text = ""
+        for i, transcript in enumerate(transcripts, 1):
+            transcripts_text += f"=== Transcript {i} ===\n{format_transcript(transcript)}\n"
+
+        prompt = f"""
+You are an expert judge of AI NPC performance.
+Review each of the following {len(transcripts)} independent conversation transcripts and evaluate each one separately based on the provided rubric dimensions.
+
+{transcripts_text}
+Rubric Dimensions:
+{format_dimensions(rubric)}
+
+Instructions:
+1. Grade every transcript on its own; do not compare transcripts with each other.
+2. For EACH dimension listed above, provide a score within the specified range.
+3. Provide specific evidence/reasoning from the transcript for each score.
+4. Calculate the total score.
+5. Output your evaluation in valid JSON format, one entry per transcript.
+
+Output Format (JSON):
+{{
+  "evaluations": [
+    {{
+      "transcript": <transcript number>,
+      "scores": {{"dimension_name": <number>, ...}},
+      "reasoning": {{"dimension_name": "<text>", ...}},
+      "total_score": <number>,
+      "max_possible_score": <number>
+    }},
+    ...
+  ]
+}}
+"""
+        messages = [{"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}]
+
+        self.requests += 1
+        response = self.client.chat_completion(messages)
+
+        by_index = {}
+        try:
+            json_match = re.search(r"\{.*\}", response, re.DOTALL)
+            data = json.loads(json_match.group(0) if json_match else response)
+            for entry in data.get("evaluations", []):
+                by_index[int(entry.get("transcript"))] = entry
         except Exception as e:
-            print(f"Failed to parse grader JSON: {e}")
-            return {
-                "metric": "rubric_eval",
-                "score": 0,
-                "result": "ERROR",
-                "error": str(e),
-                "raw_output": response
-            }
+            self.log(f"Failed to parse batched grader JSON: {e}")
+
+        grades = []
+        for i, transcript in enumerate(transcripts, 1):
+            if i in by_index:
+                # Keep only this transcript's slice of the shared response
+                raw = json.dumps(by_index[i], ensure_ascii=False)
+                grade = self._to_grade(by_index[i], raw, rubric)
+                grade["batch_size"] = len(transcripts)
+                grades.append(grade)
+            else:
+                grades.append(self.grade(transcript, rubric))
+        return grades
+
+    @staticmethod
+    def _to_grade(data: Dict[str, Any], response: str, rubric: Dict[str, Any]) -> Dict[str, Any]:
+        scores = data.get("scores", {})
+        result, failed = rubric_verdict(scores if isinstance(scores, dict) else {}, rubric)
+        return {
+            "metric": "rubric_eval",
+            "scores": scores,
+            "reasoning": data.get("reasoning", {}),
+            "total_score": data.get("total_score", 0),
+            "result": result,
+            "failed_dimensions": failed,
+            "raw_output": response
+        }
+
+    @staticmethod
+    def _error_grade(e: Exception, response: str) -> Dict[str, Any]:
+        return {
+            "metric": "rubric_eval",
+            "score": 0,
+            "result": "ERROR",
+            "error": str(e),
+            "raw_output": response
+        }
@@ -1,14 +1,262 @@
-from typing import List, Dict, Any
+import re
+import json
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+# Phrases that break a hard_fail constraint outright, keyed by the labels used in
+# scenario `constraints.hard_fail`. Deliberately narrow: anything that needs
+# reading between the lines is left to the LLM judge.
+HARD_FAIL_LEXICON: Dict[str, List[str]] = {
+    "explicit_affection": [
+        r"我(很|非常|好|真的|其实)?(关心|在乎|心疼)你",
+        r"我(也)?(喜欢|爱)你",
+        r"我理解你(很|有多|有多么)?(难受|难过|痛苦)",
+        r"抱抱你",
+        r"亲爱的",
+    ],
+    "harsh_insult": [
+        r"废物",
+        r"蠢货",
+        r"白痴",
+        r"去死",
+        r"滚(开|出去)",
+        r"垃圾猎人",
+    ],
+    "accepting_cheat": [
+        r"(帮你|给你|替你)(偷偷|悄悄)?(改|修改|调)(一下)?(爆率|掉落率|掉率|数据)",
+        r"(爆率|掉落率|掉率)(我)?(已经)?(帮你|给你)?(改|调)(好|高)了",
+        r"没人会知道的",
+    ],
+    "accepting_advances": [
+        r"(和|跟)你(约会|交往|在一起)",
+        r"做你的(女朋友|恋人|老婆)",
+    ],
+    "submissive_apology": [
+        r"都是我的错",
+        r"请原谅我",
+        r"我(错了|不该)[，,。！!]*(对不起|请原谅)",
+    ],
+}
+
+# Words that come up around a hard_fail label without breaking it by themselves
+# (a tsundere's "我才不是关心你" is fine, "我很关心你" is not). An NPC line with a
+# cue but no lexicon match is ambiguous: the grading cascade leaves it to the judge.
+HARD_FAIL_CUES: Dict[str, List[str]] = {
+    "explicit_affection": ["关心", "在乎", "心疼", "喜欢", "爱你", "抱抱"],
+    "harsh_insult": ["蠢", "滚", "闭嘴", "废"],
+    "accepting_cheat": ["爆率", "掉落率", "掉率", "作弊", "后台", "没人会知道"],
+    "accepting_advances": ["约会", "交往", "女朋友", "恋人"],
+    "submissive_apology": ["对不起", "抱歉", "原谅"],
+}
+
+# Same-clause context that turns a lexicon or must_not hit into a denial ("谁说我关心你了"),
+# a retort ("别以为我在乎你", "我理解你很难受又怎样"), a prohibition ("不要叫我亲爱的")
+# or a question echoing the player ("你说没人会知道的？"). Guarded hits are not
+# violations; the cascade leaves lines with them to the judge.
+_CLAUSE_END = "，,。！!？?；;…~～\n"
+_DENIAL_BEFORE = re.compile(rf"(谁说|才不|才没|不是|并不|并没|哪有|怎么可能|难道|你说|你以为|不要|(?<![特区分告])别)"
+                            rf"[^{_CLAUSE_END}]*$")
+_RETORT_AFTER = re.compile(rf"[^{_CLAUSE_END}]*([？?]|又怎样|又怎么样|又如何|才怪)")
+_OPEN_QUOTES = {"“": "”", "「": "」", "『": "』"}
+
+DEFAULT_MAX_CHARS = 500
+
+_QUOTED = re.compile(r"['\"“‘「]([^'\"”’」]+)['\"”’」]")
+
+
+def quoted_phrases(text: str) -> List[str]:
+    """Literal phrases quoted inside a must_not entry, e.g. "直白表达关心: '我很关心你'"."""
+    return [p.strip() for p in _QUOTED.findall(text) if p.strip()]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[\W_]+", "", text).lower()
+
+
+def is_guarded(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] is denied, asked back or quoted rather than said outright."""
+    before = text[:start]
+    if _DENIAL_BEFORE.search(before) or _RETORT_AFTER.match(text, end):
+        return True
+    return any(before.count(o) > before.count(c) for o, c in _OPEN_QUOTES.items())
+
+
+class CompiledRules:
+    """
+    A scenario's local checks, compiled once: every forbidden phrase and regex
+    goes into a single alternation with one named group per rule, so each
+    NPC line is scanned in one pass whatever the number of rules.
+    """
+    def __init__(self, patterns: List[Tuple[str, str]], max_chars: int = DEFAULT_MAX_CHARS,
+                 max_repeat: Optional[int] = None, cues: Optional[List[Tuple[str, str]]] = None,
+                 unchecked: Optional[List[str]] = None, guarded: Optional[List[str]] = None,
+                 hard_fail: Optional[List[str]] = None):
+        # patterns: (rule label, regex); matches of `guarded` labels go through is_guarded.
+        # Only `hard_fail` labels end a conversation early; the rest just fail the run when graded.
+        self.rules: Dict[str, Tuple[str, str]] = {}
+        alternatives = []
+        for i, (label, pattern) in enumerate(patterns):
+            name = f"r{i}"
+            self.rules[name] = (label, pattern)
+            alternatives.append(f"(?P<{name}>{pattern})")
+        self.matcher = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        self.max_chars = max_chars
+        self.max_repeat = max_repeat
+        # (hard_fail label, cue word) pairs, and hard_fail labels no local pattern covers
+        self.cues = [(label, re.compile(re.escape(cue))) for label, cue in (cues or [])]
+        self.unchecked = unchecked or []
+        self.guarded = set(guarded or [])
+        self.hard_fail = set(hard_fail or [])
+
+    def _matches(self, text: str) -> List[Tuple[Dict[str, str], bool]]:
+        """Every match in `text` as ({rule, pattern, match}, whether the context guards it)."""
+        if self.matcher is None:
+            return []
+        found = []
+        for m in self.matcher.finditer(text):
+            label, pattern = self.rules[m.lastgroup]
+            guarded = label in self.guarded and is_guarded(text, m.start(), m.end())
+            found.append(({"rule": label, "pattern": pattern, "match": m.group(0)}, guarded))
+        return found
+
+    def scan(self, text: str) -> List[Dict[str, str]]:
+        """All forbidden matches in `text` as {rule, pattern, match}, guarded ones left out."""
+        return [hit for hit, guarded in self._matches(text) if not guarded]
+
+    def check_line(self, text: str) -> Optional[Dict[str, str]]:
+        """First forbidden match in a single NPC reply, or None."""
+        hits = self.scan(text)
+        return hits[0] if hits else None
+
+    def check_hard_fail(self, text: str) -> Optional[Dict[str, str]]:
+        """First match of a constraints.hard_fail label in a single NPC reply, or None."""
+        return next((hit for hit in self.scan(text) if hit["rule"] in self.hard_fail), None)
+
+    def check_forbidden(self, transcript: List[Dict]) -> Dict[str, Any]:
+        violations = []
+        for line in transcript:
+            if line['speaker'] == "NPC":
+                for hit in self.scan(line['content']):
+                    violations.append(dict(hit, turn=line['turn']))
+        return {
+            "metric": "forbidden_content",
+            "result": "FAIL" if violations else "PASS",
+            "score": 0 if violations else 1,
+            "violations": violations,
+            "reason": "; ".join(f"turn {v['turn']}: {v['rule']} ('{v['match']}')" for v in violations)
+                      if violations else "No forbidden content.",
+        }
+
+    def ambiguous(self, transcript: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Checks the local rules cannot settle: guarded matches and cue words in
+        NPC lines without a forbidden match, and hard_fail labels with no local pattern.
+        """
+        found = [{"rule": label, "cue": None, "turn": None} for label in self.unchecked]
+        for line in transcript:
+            if line['speaker'] == "NPC" and not self.scan(line['content']):
+                found.extend({"rule": hit["rule"], "cue": hit["match"], "turn": line['turn']}
+                             for hit, _ in self._matches(line['content']))
+                for label, cue in self.cues:
+                    m = cue.search(line['content'])
+                    if m:
+                        found.append({"rule": label, "cue": m.group(0), "turn": line['turn']})
+        return found
+
+    def check_length(self, transcript: List[Dict]) -> Dict[str, Any]:
+        grade = RuleGrader.check_max_length(transcript, self.max_chars)
+        grade["result"] = "PASS" if grade["score"] else "FAIL"
+        return grade
+
+    def check_repetition(self, transcript: List[Dict]) -> Dict[str, Any]:
+        """FAIL if the same NPC reply (ignoring punctuation and case) occurs more than max_repeat times."""
+        seen: Dict[str, List[int]] = {}
+        for line in transcript:
+            if line['speaker'] == "NPC":
+                seen.setdefault(_normalize(line['content']), []).append(line['turn'])
+        repeated = {text: turns for text, turns in seen.items() if text and len(turns) > self.max_repeat}
+        return {
+            "metric": "repetition_check",
+            "result": "FAIL" if repeated else "PASS",
+            "score": 0 if repeated else 1,
+            "reason": f"Repeated replies at turns: {sorted(repeated.values())}" if repeated
+                      else f"No reply repeated more than {self.max_repeat} time(s).",
+        }
+
+    def grade(self, transcript: List[Dict]) -> List[Dict[str, Any]]:
+        grades = [self.check_length(transcript), self.check_forbidden(transcript)]
+        if self.max_repeat is not None:
+            grades.append(self.check_repetition(transcript))
+        return grades
+
+
+def compile_rules(config: Dict[str, Any]) -> CompiledRules:
+    """
+    Build the rule set for a scenario config from:
+    - quoted phrases in npc_profile.style_rules.must_not,
+    - the HARD_FAIL_LEXICON entries for constraints.hard_fail labels,
+    - an optional `rules:` block: forbidden (literal phrases), forbidden_regex,
+      max_chars, max_repeat and lexicon (false disables the built-in lexicon).
+    Compiled sets are cached by the content of those fields.
+    """
+    relevant = {
+        "must_not": ((config.get('npc_profile') or {}).get('style_rules') or {}).get('must_not') or [],
+        "hard_fail": (config.get('constraints') or {}).get('hard_fail') or [],
+        "rules": config.get('rules') or {},
+    }
+    return _compile(json.dumps(relevant, sort_keys=True, ensure_ascii=False))
+
+
+@lru_cache(maxsize=256)
+def _compile(relevant_json: str) -> CompiledRules:
+    relevant = json.loads(relevant_json)
+    rules = relevant["rules"]
+    patterns: List[Tuple[str, str]] = []
+    # Lexicon and must_not matches are phrases in the NPC's mouth, so their context is checked
+    guarded = []
+    for entry in relevant["must_not"]:
+        for phrase in quoted_phrases(str(entry)):
+            patterns.append((f"must_not: {phrase}", re.escape(phrase)))
+            guarded.append(f"must_not: {phrase}")
+    cues, unchecked = [], []
+    if rules.get("lexicon", True):
+        for label in relevant["hard_fail"]:
+            patterns.extend((label, p) for p in HARD_FAIL_LEXICON.get(label, []))
+            cues.extend((label, cue) for cue in HARD_FAIL_CUES.get(label, []))
+            if label not in HARD_FAIL_LEXICON:
+                unchecked.append(label)
+    else:
+        unchecked = list(relevant["hard_fail"])
+    for phrase in rules.get("forbidden", []):
+        patterns.append((f"forbidden: {phrase}", re.escape(phrase)))
+    for pattern in rules.get("forbidden_regex", []):
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid forbidden_regex {pattern!r}: {e}") from e
+        patterns.append((f"forbidden_regex: {pattern}", pattern))
+    return CompiledRules(patterns, max_chars=rules.get("max_chars", DEFAULT_MAX_CHARS),
+                         max_repeat=rules.get("max_repeat"), cues=cues, unchecked=unchecked,
+                         guarded=guarded + [label for label, _ in cues], hard_fail=relevant["hard_fail"])
+
+
+RULE_METRICS = ("max_length_check", "forbidden_content", "repetition_check")
+
 
 class RuleGrader:
     @staticmethod
-    def check_max_length(transcript: List[Dict], max_chars: int = 500) -> Dict[str, Any]:
+    def grade(transcript: List[Dict], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """All local checks for a scenario config."""
+        return compile_rules(config).grade(transcript)
+
+    @staticmethod
+    def check_max_length(transcript: List[Dict], max_chars: int = DEFAULT_MAX_CHARS) -> Dict[str, Any]:
         """Check if any NPC response exceeds max_chars."""
         failures = []
         for line in transcript:
             if line['speaker'] == "NPC" and len(line['content']) > max_chars:
                 failures.append(line['turn'])
-        
+
         return {
             "metric": "max_length_check",
             "score": 0 if failures else 1,
@@ -18,16 +266,16 @@ class RuleGrader:
     @staticmethod
     def check_keyword_presence(transcript: List[Dict], keywords: List[str]) -> Dict[str, Any]:
         """Check if any of the keywords appear in NPC responses."""
-        found = []
-        for line in transcript:
-            if line['speaker'] == "NPC":
-                text = line['content'].lower()
-                for kw in keywords:
-                    if kw.lower() in text:
-                        found.append(kw)
-        
+        found = set()
+        if keywords:
+            matcher = re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE)
+            lookup = {kw.lower(): kw for kw in keywords}
+            for line in transcript:
+                if line['speaker'] == "NPC":
+                    found.update(lookup.get(m.group(0).lower(), m.group(0)) for m in matcher.finditer(line['content']))
+
         return {
             "metric": "keyword_presence",
             "score": 1 if found else 0,
-            "reason": f"Found keywords: {set(found)}" if found else "No keywords found."
+            "reason": f"Found keywords: {found}" if found else "No keywords found."
         }
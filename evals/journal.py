@@ -0,0 +1,184 @@
+import os
+import json
+import time
+from typing import List, Dict, Any, Optional
+from evals.store import sidecar_path
+
+
+def journal_dir(output_dir: str) -> str:
+    """Where in-flight trial journals go for a run store location."""
+    return sidecar_path(output_dir, "journal")
+
+
+def read_lines(path: str) -> List[Dict[str, Any]]:
+    """Journal entries in order; a torn last line (crash mid-write) is ignored."""
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _agent_state(agent) -> Dict[str, int]:
+    return {"messages": len(agent.history), "calls": len(agent.context.calls)}
+
+
+class TrialJournal:
+    """
+    Append-only JSONL journal of one trial's conversation, written as each
+    turn completes so a crash loses at most the turn in progress.
+
+    Line 1 is a header (trial key, scenario hash, run_config). Each turn adds
+    the transcript lines plus what is needed to rebuild the agents exactly:
+    the history messages and context-manager calls added since the previous
+    turn, the rolling summary state, and the LLM calls made. The conversation's
+    only randomness is the run_config seed/temperature sent with every request,
+    which the header already holds. The journal is deleted once the trial's
+    result is in the run store, so the directory lists in-flight trials only.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._seen = {"npc": {"messages": 0, "calls": 0}, "player": {"messages": 0, "calls": 0}, "metrics": 0}
+
+    def _write(self, entry: Dict[str, Any]):
+        self._fd.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._fd.flush()
+        os.fsync(self._fd.fileno())
+
+    def resume(self, header: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Saved state of an interrupted run of the same trial, or None to start
+        fresh. A journal written for different scenario content is discarded.
+        """
+        entries = read_lines(self.path)
+        if not entries or entries[0].get("type") != "start" or \
+                any(entries[0].get(k) != header.get(k) for k in ("trial_key", "content_hash", "run_config")):
+            return None
+        state = {"transcript": [], "npc": {"messages": [], "calls": []}, "player": {"messages": [], "calls": []},
+                 "calls": [], "early_stop": None, "finished": False, "next_turn": 0}
+        for entry in entries[1:]:
+            if entry.get("type") == "turn":
+                state["transcript"].extend(entry["lines"])
+                for agent in ("npc", "player"):
+                    state[agent]["messages"].extend(entry[agent]["messages"])
+                    state[agent]["calls"].extend(entry[agent]["calls"])
+                    state[agent]["summary"] = entry[agent]["summary"]
+                    state[agent]["summarized_upto"] = entry[agent]["summarized_upto"]
+                state["calls"].extend(entry["calls"])
+                state["early_stop"] = entry.get("early_stop")
+                state["next_turn"] = entry["turn"] + 1
+            elif entry.get("type") == "finished":
+                state["finished"] = True
+        if not state["next_turn"]:
+            return None
+        return state
+
+    def open(self, header: Dict[str, Any], state: Optional[Dict[str, Any]] = None, npc=None, player=None, metrics=None):
+        """Start writing: append to a resumed journal, or truncate and write a fresh header."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if state is None:
+            self._fd = open(self.path, 'w', encoding='utf-8')
+            self._write(dict(header, type="start", started_at=time.time()))
+        else:
+            # Drop a torn last line before appending after it
+            entries = read_lines(self.path)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._fd = open(self.path, 'a', encoding='utf-8')
+        if npc is not None:
+            self._seen = {"npc": _agent_state(npc), "player": _agent_state(player), "metrics": len(metrics.calls)}
+
+    def turn(self, turn: int, lines: List[Dict[str, Any]], npc, player, metrics,
+             early_stop: Optional[Dict[str, Any]] = None):
+        entry = {"type": "turn", "turn": turn, "at": time.time(), "lines": lines}
+        for name, agent in (("npc", npc), ("player", player)):
+            seen = self._seen[name]
+            entry[name] = {
+                "messages": agent.history[seen["messages"]:],
+                "calls": agent.context.calls[seen["calls"]:],
+                "summary": agent.context.summary,
+                "summarized_upto": agent.context.summarized_upto,
+            }
+            self._seen[name] = _agent_state(agent)
+        entry["calls"] = metrics.calls[self._seen["metrics"]:]
+        self._seen["metrics"] = len(metrics.calls)
+        if early_stop:
+            entry["early_stop"] = early_stop
+        self._write(entry)
+
+    def finish(self):
+        """The conversation is complete; only grading and saving remain."""
+        self._write({"type": "finished", "at": time.time()})
+
+    def close(self):
+        if self._fd:
+            self._fd.close()
+            self._fd = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def restore_agent(agent, state: Dict[str, Any]):
+    """Rebuild an agent's history and context-manager state from a resumed journal."""
+    agent.history.extend(state["messages"])
+    agent.context.calls.extend(state["calls"])
+    agent.context.summary = state.get("summary", "")
+    agent.context.summarized_upto = state.get("summarized_upto", 0)
+
+
+def tail(directory: str, follow: bool = False, interval: float = 1.0):
+    """Print the transcripts of in-flight trials; with `follow`, keep printing new turns as they land."""
+    offsets: Dict[str, int] = {}
+    while True:
+        paths = sorted(p for p in os.listdir(directory) if p.endswith(".jsonl")) if os.path.isdir(directory) else []
+        for name in paths:
+            path = os.path.join(directory, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    f.seek(offsets.get(path, 0))
+                    while True:
+                        line = f.readline()
+                        if not line.endswith("\n"):
+                            break  # incomplete line: re-read it next time
+                        offsets[path] = f.tell()
+                        entry = json.loads(line)
+                        key = name[:-len(".jsonl")]
+                        if entry["type"] == "start":
+                            print(f"[{key}] started (temperature {entry['run_config'].get('temperature', 0.7):.2f})")
+                        elif entry["type"] == "turn":
+                            for l in entry["lines"]:
+                                print(f"[{key}] turn {l['turn'] + 1} {l['speaker']}: {l['content']}")
+                            if entry.get("early_stop"):
+                                print(f"[{key}] stopped early: {entry['early_stop']['rule']}")
+                        elif entry["type"] == "finished":
+                            print(f"[{key}] conversation finished, grading")
+            except FileNotFoundError:
+                offsets.pop(path, None)  # trial saved and its journal removed
+        if not follow:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show the transcripts of in-flight or interrupted trials")
+    parser.add_argument("runs_dir", nargs="?", default="evals/outputs/runs", help="Run store: directory of run JSONs or a .db file")
+    parser.add_argument("-f", "--follow", action="store_true", help="Keep printing new turns as they are written")
+    args = parser.parse_args()
+    try:
+        tail(journal_dir(args.runs_dir), follow=args.follow)
+    except KeyboardInterrupt:
+        pass
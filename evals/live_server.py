@@ -0,0 +1,172 @@
+"""
+Serve the eval viewer with live updates from a running sweep.
+
+    python -m evals.live_server --runs evals/outputs/runs --port 8000
+
+Static files come from evals/web. `/events` is a Server-Sent Events stream
+that tails the sweep's events.jsonl (written by run_eval, see evals/events.py);
+each event's id is its byte offset in the file, so a reconnecting browser
+resumes where it stopped. Runs saved during the session have no prebuilt
+shard under data/runs/, so their shards are rendered from the run store on
+request. Nothing has to be rebuilt with generate_viz_data.py while watching.
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from evals.events import events_path
+from evals.generate_viz_data import make_shard, shard_id
+from evals.store import JsonDirStore, open_store
+
+WEB_DIR = os.path.join(os.path.dirname(__file__), 'web')
+HEARTBEAT_SECONDS = 15
+POLL_SECONDS = 0.25
+
+
+class LiveState:
+    """Run store, event file and the shard id -> store key map of runs saved in the stream."""
+    def __init__(self, runs_dir: str, events_file: str):
+        self.store = open_store(runs_dir)
+        self.events_file = events_file
+        self._locations: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def saved(self, location: str) -> str:
+        """Remember a saved run and return the shard id the viewer will ask for."""
+        # Runs in a directory store are found by file name, wherever the runner's working directory was
+        if isinstance(self.store, JsonDirStore):
+            location = os.path.join(self.store.path, os.path.basename(location))
+        sid = shard_id(location)
+        with self._lock:
+            self._locations[sid] = location
+        return sid
+
+    def shard(self, sid: str) -> Optional[str]:
+        with self._lock:
+            location = self._locations.get(sid)
+        if location is None:
+            # Started after the run was saved and the browser asked before the stream got there: scan the file
+            self.scan()
+            with self._lock:
+                location = self._locations.get(sid)
+        record = self.store.get(location) if location else None
+        return make_shard(location, record) if record else None
+
+    def scan(self):
+        if not os.path.exists(self.events_file):
+            return
+        with open(self.events_file, 'rb') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get('type') == 'saved' and event.get('location'):
+                    self.saved(event['location'])
+
+
+class LiveHandler(SimpleHTTPRequestHandler):
+    state: LiveState
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=WEB_DIR, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/events':
+            return self._events()
+        if path == '/data.js' and not os.path.exists(os.path.join(WEB_DIR, 'data.js')):
+            # No prebuilt bundle: start from an empty index and fill it from the stream
+            return self._send_js("window.EVAL_INDEX = [];")
+        if path.startswith('/data/runs/') and path.endswith('.js'):
+            if not os.path.exists(os.path.join(WEB_DIR, path.lstrip('/'))):
+                shard = self.state.shard(os.path.basename(path)[:-3])
+                if shard is None:
+                    return self.send_error(404, "Run not found")
+                return self._send_js(shard)
+        return super().do_GET()
+
+    def _send_js(self, body: str):
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/javascript; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _events(self):
+        offset = self.headers.get('Last-Event-ID', '')
+        offset = int(offset) if offset.isdigit() else 0
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        f = None
+        last_write = time.monotonic()
+        try:
+            while True:
+                if f is None and os.path.exists(self.state.events_file):
+                    f = open(self.state.events_file, 'rb')
+                    if offset > os.path.getsize(self.state.events_file):
+                        offset = 0  # a new sweep truncated or replaced the file
+                    f.seek(offset)
+                line = f.readline() if f else b""
+                if line.endswith(b"\n"):
+                    offset = f.tell()
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if event.get('type') == 'saved' and event.get('location'):
+                        event['shard_id'] = self.state.saved(event['location'])
+                    self.wfile.write(f"id: {offset}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    last_write = time.monotonic()
+                    continue
+                if f and line:
+                    f.seek(offset)  # a partial line: wait for the writer to finish it
+                self.wfile.flush()
+                if time.monotonic() - last_write >= HEARTBEAT_SECONDS:
+                    self.wfile.write(b": heartbeat\n\n")
+                    last_write = time.monotonic()
+                time.sleep(POLL_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            if f:
+                f.close()
+
+
+def serve(runs_dir: str, events_file: str, port: int = 8000, host: str = "127.0.0.1"):
+    LiveHandler.state = LiveState(runs_dir, events_file)
+    server = ThreadingHTTPServer((host, port), LiveHandler)
+    server.daemon_threads = True
+    print(f"Live viewer at http://{host}:{port}/ (events from {events_file})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the eval viewer with live updates from a running sweep")
+    parser.add_argument("--runs", type=str, default=os.path.join(os.path.dirname(__file__), 'outputs', 'runs'),
+                        help="Run store the sweep writes to: directory of run JSONs or a .db file")
+    parser.add_argument("--events", type=str, default=None,
+                        help="Event stream to follow (default: the one run_eval writes for --runs)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    serve(args.runs, args.events or events_path(args.runs), port=args.port, host=args.host)
+
+
+if __name__ == "__main__":
+    main()
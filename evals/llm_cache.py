@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Dict, Optional
+
+CACHE_MODES = ("off", "read", "write", "readwrite", "replay")
+
+
+class LLMCache:
+    """Disk-backed, content-addressed cache of chat completions.
+
+    Entries are keyed by a SHA-256 of the full request (provider endpoint,
+    model, messages, temperature, seed). Modes:
+    - off:       never touch the cache
+    - read:      serve hits, never store
+    - write:     always call the API, store results
+    - readwrite: serve hits, store misses
+    - replay:    serve hits, raise on a miss (no API calls at all)
+    """
+    def __init__(self, path: str, mode: str = "readwrite", max_entries: int = 0,
+                 max_bytes: int = 0, max_age_days: float = 0):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON completions(last_access)")
+        if self.can_write:
+            self.evict()
+
+    @property
+    def can_read(self) -> bool:
+        return self.mode in ("read", "readwrite", "replay")
+
+    @property
+    def can_write(self) -> bool:
+        return self.mode in ("write", "readwrite")
+
+    @staticmethod
+    def make_key(base_url: str, model: str, messages: List[Dict[str, str]],
+                 temperature: float, seed: Optional[int]) -> str:
+        payload = json.dumps({
+            "base_url": base_url,
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "seed": seed
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, response, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now)
+            )
+            self._writes += 1
+            check_limits = self._writes % 100 == 0
+        if check_limits:
+            self.evict()
+
+    def evict(self):
+        """Drop entries older than max_age_days, then least-recently-used ones over the size limits."""
+        with self._lock:
+            if self.max_age_days > 0:
+                cutoff = time.time() - self.max_age_days * 86400
+                self._conn.execute("DELETE FROM completions WHERE created < ?", (cutoff,))
+            if self.max_entries > 0:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    " SELECT key FROM completions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            if self.max_bytes > 0:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+                if total > self.max_bytes:
+                    rows = self._conn.execute("SELECT key, size FROM completions ORDER BY last_access").fetchall()
+                    stale = []
+                    for key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        stale.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM completions WHERE key = ?", stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+_cache: Optional[LLMCache] = None
+
+
+def configure_cache(mode: str, path: str = "evals/outputs/llm_cache.sqlite", **limits) -> Optional[LLMCache]:
+    """Install the process-wide cache used by every LLMClient (mode 'off' removes it)."""
+    global _cache
+    _cache = None if mode == "off" else LLMCache(path, mode=mode, **limits)
+    return _cache
+
+
+def get_cache() -> Optional[LLMCache]:
+    return _cache
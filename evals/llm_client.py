@@ -1,48 +1,337 @@
 import os
+import time
 import random
+import threading
+import weakref
 from typing import List, Dict, Optional
-from dotenv import load_dotenv
+from evals.llm_cache import LLMCache, get_cache
+from evals.metrics import CallMetrics
+
+_env_loaded = False
+
+
+def _load_env():
+    """Load .env on first client creation; deferred so CLI startup does not pay for dotenv."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+class LLMError(Exception):
+    """Raised when the LLM API cannot produce a completion (after retries)."""
+
+
+class CacheMissError(LLMError):
+    """Raised in cache replay mode when a request has no cached response."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` units per minute.
+
+    `reserve` deducts immediately and returns how long the caller has to wait
+    before its reservation is covered, so the same bucket can be shared by
+    threads (time.sleep) and coroutines (asyncio.sleep).
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self.lock:
+            self._refill()
+            # A single request larger than the bucket would otherwise wait forever
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def consume(self, amount: float):
+        """Charge usage that was only known after the request completed."""
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits (0 disables a limit)."""
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+
+    def _reserve(self, est_tokens: int) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(est_tokens))
+        return wait
+
+    def acquire(self, est_tokens: int):
+        wait = self._reserve(est_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, est_tokens: int):
+        import asyncio
+        wait = self._reserve(est_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def settle(self, est_tokens: int, actual_tokens: int):
+        if self.tokens and actual_tokens > est_tokens:
+            self.tokens.consume(actual_tokens - est_tokens)
+
+
+# Process-wide state: one OpenAI client (and its keep-alive connection pool)
+# per (api_key, base_url), one async client per event loop, one rate limiter.
+_shared_lock = threading.Lock()
+_sync_clients = {}
+# Keyed weakly by the event loop, so a loop's clients go away with the loop
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    with _shared_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(rpm=float(os.getenv("LLM_RPM", "0")),
+                                        tpm=float(os.getenv("LLM_TPM", "0")))
+        return _rate_limiter
+
+
+def _get_sync_client(api_key: str, base_url: str):
+    key = (api_key, base_url)
+    with _shared_lock:
+        if key not in _sync_clients:
+            from openai import OpenAI
+            # Retries are handled by LLMClient so they share the rate limiter
+            _sync_clients[key] = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return _sync_clients[key]
+
+
+def _get_async_client(api_key: str, base_url: str):
+    # Async HTTP connections are bound to the loop that opened them
+    import asyncio
+    loop = asyncio.get_running_loop()
+    with _shared_lock:
+        clients = _async_clients.setdefault(loop, {})
+        if (api_key, base_url) not in clients:
+            from openai import AsyncOpenAI
+            clients[(api_key, base_url)] = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return clients[(api_key, base_url)]
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    # Rough pre-request estimate (CJK-heavy prompts run ~1-2 chars per token)
+    return sum(len(m.get("content") or "") for m in messages) // 2 + 4 * len(messages)
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying `error`, or None if it is not retryable."""
+    import openai
+    status = getattr(error, "status_code", None)
+    retryable = isinstance(error, openai.APIConnectionError) or status == 429 or (status or 0) >= 500
+    if not retryable:
+        return None
+
+    base = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+    cap = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
 
-# Load environment variables from .env file
-load_dotenv()
 
 class LLMClient:
-    def __init__(self, provider: str = "deepseek", model: str = "deepseek-chat"):
+    def __init__(self, provider: str = "deepseek", model: str = "deepseek-chat",
+                 metrics: Optional[CallMetrics] = None, role: str = "llm"):
+        _load_env()
         self.provider = provider
         self.model = model
         self.api_key = os.getenv("DEEPSEEK_API_KEY")
         self.base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
-        
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "5"))
+        # Streaming is only needed to measure time to first token
+        self.stream = os.getenv("LLM_STREAM", "0") == "1"
+        # Token usage reported by the API for the most recent call (None for cache hits / mock)
+        self.last_usage: Optional[Dict[str, int]] = None
+        # Every call is recorded here (if given) under `role`: npc, player or judge
+        self.metrics = metrics
+        self.role = role
+
         self.client = None
         if self.api_key and self.provider != "mock":
             try:
-                from openai import OpenAI
-                self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+                self.client = _get_sync_client(self.api_key, self.base_url)
             except ImportError:
                 print("Warning: 'openai' package not installed. Falling back to mock.")
-        
+
+    def _request_kwargs(self, messages: List[Dict[str, str]], temperature: float, seed: Optional[int]) -> Dict:
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature
+        }
+        if seed is not None:
+            kwargs["seed"] = seed
+        if self.stream:
+            kwargs["stream"] = True
+            kwargs["stream_options"] = {"include_usage": True}
+        return kwargs
+
+    def _record(self, started_at: float, t0: float, source: str, retries: int = 0,
+                ttft: Optional[float] = None, error: Optional[Exception] = None):
+        if self.metrics is None:
+            return
+        usage = self.last_usage or {}
+        self.metrics.record(self.role, self.model, started_at, (time.perf_counter() - t0) * 1000, source,
+                            prompt_tokens=usage.get("prompt_tokens", 0),
+                            completion_tokens=usage.get("completion_tokens", 0),
+                            retries=retries,
+                            ttft_ms=(ttft - t0) * 1000 if ttft is not None else None,
+                            error=str(error) if error else None)
+
+    def _finish(self, content: str, usage, est_tokens: int, cache_key: Optional[str]) -> str:
+        get_rate_limiter().settle(est_tokens, getattr(usage, "total_tokens", 0) or 0)
+        if usage is not None:
+            self.last_usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+        self._cache_store(cache_key, content)
+        return content
+
+    def _cache_lookup(self, messages: List[Dict[str, str]], temperature: float, seed: Optional[int]):
+        """Return (cache_key, cached_response); both None when caching is off."""
+        cache = get_cache()
+        if cache is None:
+            return None, None
+        key = LLMCache.make_key(self.base_url, self.model, messages, temperature, seed)
+        hit = cache.get(key) if cache.can_read else None
+        if hit is None and cache.mode == "replay":
+            raise CacheMissError(f"No cached response for request {key[:12]} (replay mode)")
+        return key, hit
+
+    def _cache_store(self, key: Optional[str], response: str):
+        cache = get_cache()
+        if key and cache and cache.can_write and response is not None:
+            cache.put(key, response)
+
     def chat_completion(self, messages: List[Dict[str, str]], temperature: float = 0.7, seed: Optional[int] = None) -> str:
         """
         Get a completion from the LLM.
         messages: list of {"role": "system"|"user"|"assistant", "content": "..."}
+        Raises LLMError once retries are exhausted; real runs never fall back to mock text.
         """
-        if self.client:
-            try:
-                kwargs = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": temperature
-                }
-                if seed is not None:
-                    kwargs["seed"] = seed
+        self.last_usage = None
+        started_at, t0 = time.time(), time.perf_counter()
+        cache_key, cached = self._cache_lookup(messages, temperature, seed)
+        if cached is not None:
+            self._record(started_at, t0, "cache")
+            return cached
+        if not self.client:
+            response = self._mock_response(messages)
+            self._record(started_at, t0, "mock")
+            return response
 
+        kwargs = self._request_kwargs(messages, temperature, seed)
+        limiter = get_rate_limiter()
+        est_tokens = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire(est_tokens)
+            try:
                 response = self.client.chat.completions.create(**kwargs)
-                return response.choices[0].message.content
+                ttft = None
+                if self.stream:
+                    content, usage, ttft = self._read_stream(response)
+                else:
+                    content, usage = response.choices[0].message.content, getattr(response, "usage", None)
             except Exception as e:
-                print(f"Error calling LLM API: {e}. Falling back to mock.")
-                return self._mock_response(messages)
-        else:
-            return self._mock_response(messages)
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    self._record(started_at, t0, "api", retries=attempt, error=e)
+                    raise LLMError(f"LLM API call failed after {attempt + 1} attempt(s): {e}") from e
+                time.sleep(delay)
+                continue
+            content = self._finish(content, usage, est_tokens, cache_key)
+            self._record(started_at, t0, "api", retries=attempt, ttft=ttft)
+            return content
+
+    @staticmethod
+    def _read_stream(stream):
+        """Join a streamed completion; returns (content, usage, time of the first content chunk)."""
+        parts, usage, ttft = [], None, None
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if ttft is None:
+                    ttft = time.perf_counter()
+                parts.append(chunk.choices[0].delta.content)
+        return "".join(parts), usage, ttft
+
+    @staticmethod
+    async def _aread_stream(stream):
+        parts, usage, ttft = [], None, None
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if ttft is None:
+                    ttft = time.perf_counter()
+                parts.append(chunk.choices[0].delta.content)
+        return "".join(parts), usage, ttft
+
+    async def achat_completion(self, messages: List[Dict[str, str]], temperature: float = 0.7, seed: Optional[int] = None) -> str:
+        """Async variant of chat_completion sharing the same pool, cache, limiter and retry policy."""
+        import asyncio
+        self.last_usage = None
+        started_at, t0 = time.time(), time.perf_counter()
+        cache_key, cached = self._cache_lookup(messages, temperature, seed)
+        if cached is not None:
+            self._record(started_at, t0, "cache")
+            return cached
+        if not self.client:
+            response = self._mock_response(messages)
+            self._record(started_at, t0, "mock")
+            return response
+
+        client = _get_async_client(self.api_key, self.base_url)
+        kwargs = self._request_kwargs(messages, temperature, seed)
+        limiter = get_rate_limiter()
+        est_tokens = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            await limiter.aacquire(est_tokens)
+            try:
+                response = await client.chat.completions.create(**kwargs)
+                ttft = None
+                if self.stream:
+                    content, usage, ttft = await self._aread_stream(response)
+                else:
+                    content, usage = response.choices[0].message.content, getattr(response, "usage", None)
+            except Exception as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    self._record(started_at, t0, "api", retries=attempt, error=e)
+                    raise LLMError(f"LLM API call failed after {attempt + 1} attempt(s): {e}") from e
+                await asyncio.sleep(delay)
+                continue
+            content = self._finish(content, usage, est_tokens, cache_key)
+            self._record(started_at, t0, "api", retries=attempt, ttft=ttft)
+            return content
 
     def _mock_response(self, messages: List[Dict[str, str]]) -> str:
         last_msg = messages[-1]["content"]
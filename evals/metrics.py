@@ -0,0 +1,202 @@
+import os
+import json
+import secrets
+import threading
+from typing import List, Dict, Any, Optional, Sequence
+
+# USD per million (input, output) tokens; LLM_PRICE_INPUT / LLM_PRICE_OUTPUT override
+PRICES = {
+    "deepseek-chat": (0.27, 1.10),
+    "deepseek-reasoner": (0.55, 2.19),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    price_in = float(os.getenv("LLM_PRICE_INPUT", price_in))
+    price_out = float(os.getenv("LLM_PRICE_OUTPUT", price_out))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (q in 0..100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+class CallMetrics:
+    """
+    Per-trial record of every LLM call: wall time, time to first token
+    (streaming only), tokens, retries and estimated cost, tagged with the
+    calling role (npc / player / judge), scenario, run and turn.
+    One instance is shared by all clients of a trial; `turn` is set by the runner.
+    """
+    def __init__(self, scenario: Optional[str] = None, run_id: Any = None):
+        self.scenario = scenario
+        self.run_id = run_id
+        self.turn: Optional[int] = None
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, role: str, model: str, started_at: float, wall_ms: float, source: str,
+               prompt_tokens: int = 0, completion_tokens: int = 0, retries: int = 0,
+               ttft_ms: Optional[float] = None, error: Optional[str] = None):
+        """`source` is 'api', 'cache' or 'mock'; only API calls are charged."""
+        call = {
+            "role": role,
+            "scenario": self.scenario,
+            "run_id": self.run_id,
+            "turn": self.turn,
+            "model": model,
+            "source": source,
+            "started_at": started_at,
+            "wall_ms": round(wall_ms, 3),
+            "ttft_ms": round(ttft_ms, 3) if ttft_ms is not None else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "retries": retries,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens) if source == "api" else 0.0,
+        }
+        if error:
+            call["error"] = error
+        with self._lock:
+            self.calls.append(call)
+
+    def extend(self, calls: List[Dict[str, Any]], shared_by: int = 1):
+        """Add calls made on behalf of several trials (batched judging); their cost is split evenly."""
+        with self._lock:
+            for call in calls:
+                self.calls.append(dict(call, scenario=self.scenario, run_id=self.run_id, shared_by=shared_by))
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize_calls(self.calls)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"summary": self.summary(), "calls": list(self.calls)}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], scenario: Optional[str] = None, run_id: Any = None) -> "CallMetrics":
+        metrics = cls(scenario, run_id)
+        metrics.calls = list((data or {}).get("calls", []))
+        return metrics
+
+
+def summarize_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals and latency percentiles, overall and per role."""
+    def totals(subset: List[Dict[str, Any]]) -> Dict[str, Any]:
+        walls = [c["wall_ms"] for c in subset if c["source"] == "api"]
+        ttfts = [c["ttft_ms"] for c in subset if c.get("ttft_ms") is not None]
+        share = [1 / c.get("shared_by", 1) for c in subset]
+        return {
+            "calls": len(subset),
+            "api_calls": len(walls),
+            "wall_ms_p50": percentile(walls, 50),
+            "wall_ms_p95": percentile(walls, 95),
+            "ttft_ms_p50": percentile(ttfts, 50),
+            "ttft_ms_p95": percentile(ttfts, 95),
+            "prompt_tokens": round(sum(c["prompt_tokens"] * s for c, s in zip(subset, share))),
+            "completion_tokens": round(sum(c["completion_tokens"] * s for c, s in zip(subset, share))),
+            "retries": sum(c["retries"] for c in subset),
+            "cost_usd": sum(c["cost_usd"] * s for c, s in zip(subset, share)),
+        }
+
+    summary = totals(calls)
+    roles = sorted({c["role"] for c in calls})
+    summary["by_role"] = {role: totals([c for c in calls if c["role"] == role]) for role in roles}
+    return summary
+
+
+class OTelJsonExporter:
+    """
+    Appends each trial's calls as one OTLP/JSON ExportTraceServiceRequest per
+    line: a root span for the trial with one client span per LLM call, using
+    the gen_ai.* semantic-convention attribute names.
+    """
+    def __init__(self, path: str, service_name: str = "npc-evals"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @staticmethod
+    def _attrs(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        attrs = []
+        for key, value in values.items():
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                attrs.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                attrs.append({"key": key, "value": {"intValue": str(value)}})
+            elif isinstance(value, float):
+                attrs.append({"key": key, "value": {"doubleValue": value}})
+            else:
+                attrs.append({"key": key, "value": {"stringValue": str(value)}})
+        return attrs
+
+    def export(self, metrics: CallMetrics):
+        if not metrics.calls:
+            return
+        trace_id = secrets.token_hex(16)
+        root_id = secrets.token_hex(8)
+        start = min(c["started_at"] for c in metrics.calls)
+        end = max(c["started_at"] + c["wall_ms"] / 1000 for c in metrics.calls)
+        spans = [{
+            "traceId": trace_id,
+            "spanId": root_id,
+            "name": f"trial {metrics.scenario} run {metrics.run_id}",
+            "kind": 1,  # INTERNAL
+            "startTimeUnixNano": str(int(start * 1e9)),
+            "endTimeUnixNano": str(int(end * 1e9)),
+            "attributes": self._attrs({"eval.scenario": metrics.scenario, "eval.run_id": str(metrics.run_id)}),
+        }]
+        for c in metrics.calls:
+            spans.append({
+                "traceId": trace_id,
+                "spanId": secrets.token_hex(8),
+                "parentSpanId": root_id,
+                "name": f"chat {c['role']}",
+                "kind": 3,  # CLIENT
+                "startTimeUnixNano": str(int(c["started_at"] * 1e9)),
+                "endTimeUnixNano": str(int((c["started_at"] + c["wall_ms"] / 1000) * 1e9)),
+                "attributes": self._attrs({
+                    "gen_ai.operation.name": "chat",
+                    "gen_ai.request.model": c["model"],
+                    "gen_ai.usage.input_tokens": c["prompt_tokens"],
+                    "gen_ai.usage.output_tokens": c["completion_tokens"],
+                    "eval.role": c["role"],
+                    "eval.turn": c["turn"],
+                    "eval.source": c["source"],
+                    "eval.retries": c["retries"],
+                    "eval.ttft_ms": c.get("ttft_ms"),
+                    "eval.cost_usd": c["cost_usd"],
+                }),
+                "status": {"code": 2, "message": c["error"]} if c.get("error") else {"code": 1},
+            })
+        request = {"resourceSpans": [{
+            "resource": {"attributes": self._attrs({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": "evals.llm_client"}, "spans": spans}],
+        }]}
+        line = json.dumps(request, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+_exporter: Optional[OTelJsonExporter] = None
+
+
+def configure_span_export(path: Optional[str]) -> Optional[OTelJsonExporter]:
+    """Enable (or with None, disable) the process-wide span exporter."""
+    global _exporter
+    _exporter = OTelJsonExporter(path) if path else None
+    return _exporter
+
+
+def get_span_exporter() -> Optional[OTelJsonExporter]:
+    return _exporter
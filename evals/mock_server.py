@@ -0,0 +1,265 @@
+"""
+Local stand-in for an OpenAI-compatible chat-completions API.
+
+Point the harness at it to load-test without spending quota:
+    python -m evals.mock_server --port 8901 --latency lognormal:0.8:0.4 --error-429 0.05
+    DEEPSEEK_API_KEY=local DEEPSEEK_BASE_URL=http://127.0.0.1:8901/v1 python evals/run_eval.py
+
+Replies are deterministic for a given request (messages + seed) and follow
+the formats the harness parses: [THOUGHTS]/[ACTION] for the player
+simulator and rubric JSON for the judge.
+"""
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+
+NPC_LINES = [
+    "哼，这种小事也要来问我？……好吧，听好了，只说一次。",
+    "别误会，我可不是特意帮你，只是看不下去而已。",
+    "真是的，你就不能自己想想办法吗？算了，去东边的营地看看吧。",
+    "笨蛋猎人，准备好回复药再出发，别又让我担心……才没有担心！",
+]
+PLAYER_LINES = [
+    "那你倒是说说，我该怎么办？",
+    "好吧好吧，谢谢你啦，虽然你嘴上不饶人。",
+    "你今天心情不错嘛，难得这么耐心。",
+    "我再去试一次，这次一定能行！",
+]
+
+
+class LatencyModel:
+    """Parses 'fixed:S', 'uniform:LO:HI' or 'lognormal:MEDIAN:SIGMA' (seconds)."""
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return rng.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return rng.lognormvariate(0, sigma) * median
+
+
+def classify(messages: List[Dict[str, str]]) -> str:
+    system = str(messages[0].get("content", "")) if messages else ""
+    if "automated evaluator" in system:
+        return "judge"
+    if "Monster Hunter player" in system or "simulated player" in system.lower():
+        return "player"
+    if "summarize conversations" in system:
+        return "summary"
+    return "npc"
+
+
+def rubric_dimensions(prompt: str) -> Dict[str, tuple]:
+    """Dimension name -> (min, max), read back from the judge prompt."""
+    dims = {}
+    in_rubric = False
+    for line in prompt.splitlines():
+        if line.startswith("Rubric Dimensions"):
+            in_rubric = True
+        elif in_rubric and line.startswith("- ") and ":" in line:
+            name, rest = line[2:].split(":", 1)
+            bounds = re.search(r"between (\d+) and (\d+)", rest)
+            dims[name.strip()] = (int(bounds.group(1)), int(bounds.group(2))) if bounds else (0, 5)
+        elif in_rubric and line.startswith("Instructions"):
+            break
+    return dims or {"overall": (0, 5)}
+
+
+def fake_reply(messages: List[Dict[str, str]], seed: Optional[int]) -> str:
+    digest = hashlib.sha256(json.dumps([messages, seed], ensure_ascii=False).encode("utf-8")).hexdigest()
+    rng = random.Random(int(digest[:16], 16))
+    kind = classify(messages)
+
+    if kind == "player":
+        return (f"[THOUGHTS]\n她还是老样子嘴硬，不过好像愿意帮忙。\n[/THOUGHTS]\n"
+                f"[ACTION]\n{rng.choice(PLAYER_LINES)}")
+    if kind == "summary":
+        return "玩家向看板娘倾诉，看板娘嘴上嫌弃但给出了建议。"
+    if kind == "judge":
+        prompt = messages[-1].get("content", "")
+        dims = rubric_dimensions(prompt)
+
+        def evaluation():
+            # Skewed towards the top of each range, like a lenient judge
+            scores = {d: rng.randint((lo + hi + 1) // 2, hi) for d, (lo, hi) in dims.items()}
+            return {
+                "scores": scores,
+                "reasoning": {d: "Stand-in server reasoning." for d in dims},
+                "total_score": sum(scores.values()),
+                "max_possible_score": sum(hi for _, hi in dims.values()),
+            }
+
+        if '"evaluations"' in prompt:
+            count = prompt.count("=== Transcript ")
+            return json.dumps({"evaluations": [dict(evaluation(), transcript=i + 1) for i in range(count)]},
+                              ensure_ascii=False)
+        return json.dumps(evaluation(), ensure_ascii=False)
+    return rng.choice(NPC_LINES)
+
+
+class StandInConfig:
+    def __init__(self, latency: str = "fixed:0", tokens_per_sec: float = 0, error_429: float = 0,
+                 error_500: float = 0, seed: int = 0):
+        self.latency = LatencyModel(latency)
+        self.tokens_per_sec = tokens_per_sec
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self):
+        """Latency and injected error for one request (shared RNG, so lock it)."""
+        with self.lock:
+            self.requests += 1
+            latency = self.latency.sample(self.rng)
+            roll = self.rng.random()
+        if roll < self.error_429:
+            return latency, 429
+        if roll < self.error_429 + self.error_500:
+            return latency, 500
+        return latency, None
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 2)
+
+
+def make_handler(config: StandInConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = request.get("messages", [])
+
+            latency, error = config.draw()
+            time.sleep(latency)
+            if error == 429:
+                self._send_json(429, {"error": {"message": "Rate limit exceeded (stand-in)", "type": "rate_limit"}},
+                                headers={"Retry-After": "1"})
+                return
+            if error == 500:
+                self._send_json(500, {"error": {"message": "Internal error (stand-in)", "type": "server_error"}})
+                return
+
+            content = fake_reply(messages, request.get("seed"))
+            prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+            completion_tokens = count_tokens(content)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            model = request.get("model", "stand-in")
+
+            if request.get("stream"):
+                self._stream(completion_id, model, content, usage,
+                             include_usage=(request.get("stream_options") or {}).get("include_usage", False))
+                return
+
+            if config.tokens_per_sec > 0:
+                time.sleep(completion_tokens / config.tokens_per_sec)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            })
+
+        def _stream(self, completion_id: str, model: str, content: str, usage: Dict[str, int], include_usage: bool):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def event(delta: Dict[str, Any], finish: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                chunk.update(extra or {})
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            event({"role": "assistant", "content": ""})
+            # Two characters per chunk, roughly one token
+            for i in range(0, len(content), 2):
+                if config.tokens_per_sec > 0:
+                    time.sleep(1 / config.tokens_per_sec)
+                event({"content": content[i:i + 2]})
+            event({}, finish="stop")
+            if include_usage:
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8901, config: Optional[StandInConfig] = None) -> ThreadingHTTPServer:
+    """Create the server (call serve_forever() on it, or run it in a thread)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config or StandInConfig()))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server for load-testing the harness")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=str, default="lognormal:0.8:0.4",
+                        help="Time to first byte: fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0, help="Generation speed (0 = instant)")
+    parser.add_argument("--error-429", type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0, help="Fraction of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error injection")
+    args = parser.parse_args()
+
+    config = StandInConfig(latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                           error_429=args.error_429, error_500=args.error_500, seed=args.seed)
+    server = serve(args.host, args.port, config)
+    print(f"Stand-in LLM server on http://{args.host}:{args.port}/v1 (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
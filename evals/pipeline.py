@@ -0,0 +1,196 @@
+import os
+import time
+import queue
+import threading
+from typing import List, Dict, Any, Callable, Iterable, Optional
+from evals.runner import GameRunner, TrialLog, trial_log_dir
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline stage: `workers` threads pull items from a bounded input
+    queue, apply `fn`, and push the result downstream. `fn` may return None
+    to drop an item. A full downstream queue blocks the workers (backpressure).
+    """
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, queue_size: int = 8):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.depth_samples: List[int] = []
+        self._lock = threading.Lock()
+        self._alive = self.workers
+
+    def metrics(self, wall_seconds: float) -> Dict[str, Any]:
+        depths = self.depth_samples or [0]
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "errors": self.errors,
+            "throughput_per_s": self.processed / wall_seconds if wall_seconds > 0 else 0.0,
+            "utilization": self.busy_seconds / (wall_seconds * self.workers) if wall_seconds > 0 else 0.0,
+            "queue_depth_avg": sum(depths) / len(depths),
+            "queue_depth_max": max(depths),
+            "queue_capacity": self.queue.maxsize,
+        }
+
+
+class Pipeline:
+    """Runs items through a chain of Stages connected by bounded queues."""
+    def __init__(self, stages: List[Stage], log: Optional[Callable[[str], None]] = None,
+                 sample_interval: float = 0.2):
+        self.stages = stages
+        self.log = log or print
+        self.sample_interval = sample_interval
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            start = time.monotonic()
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                result = None
+                with stage._lock:
+                    stage.errors += 1
+                self.log(f"[{stage.name}] error: {e}")
+            with stage._lock:
+                stage.busy_seconds += time.monotonic() - start
+                stage.processed += 1
+            if result is not None and downstream is not None:
+                downstream.queue.put(result)
+
+        # Last worker out tells every downstream worker to stop
+        with stage._lock:
+            stage._alive -= 1
+            last = stage._alive == 0
+        if last and downstream is not None:
+            for _ in range(downstream.workers):
+                downstream.queue.put(_DONE)
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Any]:
+        start = time.monotonic()
+        threads = []
+        for i, stage in enumerate(self.stages):
+            for w in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(i,), name=f"{stage.name}-{w}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        stop_sampling = threading.Event()
+
+        def sample():
+            while not stop_sampling.wait(self.sample_interval):
+                for stage in self.stages:
+                    stage.depth_samples.append(stage.queue.qsize())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+
+        first = self.stages[0]
+        for item in items:
+            first.queue.put(item)
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+        for t in threads:
+            t.join()
+        stop_sampling.set()
+        sampler.join()
+
+        wall = time.monotonic() - start
+        return {
+            "wall_seconds": wall,
+            "stages": {stage.name: stage.metrics(wall) for stage in self.stages}
+        }
+
+
+class TrialItem:
+    """State of one (scenario, run_id) trial as it moves through the pipeline."""
+    def __init__(self, trial: Dict[str, Any]):
+        self.trial = trial
+        self.runner: Optional[GameRunner] = None
+        self.log: Optional[TrialLog] = None
+        self.grades: List[Dict] = []
+        self.result_path: Optional[str] = None
+
+
+def build_trial_pipeline(output_dir: str, workers: Dict[str, int], queue_size: int = 8,
+                         report_file: Optional[str] = None, report_interval: float = 30.0,
+                         defer_llm_grading: bool = False, log: Optional[Callable[[str], None]] = None) -> Pipeline:
+    """
+    generate -> rule-check -> llm-grade -> persist -> report-update.
+    `workers` maps stage name to worker count (missing stages get 1).
+    The report is regenerated at most every `report_interval` seconds.
+    """
+    log = log or print
+    log_dir = trial_log_dir(output_dir)
+
+    def generate(trial: Dict[str, Any]) -> TrialItem:
+        item = TrialItem(trial)
+        name = os.path.splitext(os.path.basename(item.trial["scenario_file"]))[0]
+        item.log = TrialLog(os.path.join(log_dir, f"{name}_run{item.trial['run_config']['run_id']}.log"))
+        item.runner = GameRunner(item.trial["scenario_file"], output_dir,
+                                 run_config=item.trial["run_config"], log=item.log,
+                                 defer_llm_grading=defer_llm_grading)
+        try:
+            item.runner.play()
+        except Exception:
+            item.log.close()
+            raise
+        return item
+
+    def rule_check(item: TrialItem) -> TrialItem:
+        try:
+            item.grades.extend(item.runner.grade_rules())
+        except Exception:
+            item.log.close()
+            raise
+        return item
+
+    def llm_grade(item: TrialItem) -> TrialItem:
+        try:
+            grade = item.runner.grade_llm(item.grades)
+        except Exception:
+            item.log.close()
+            raise
+        if grade is not None:
+            item.grades.append(grade)
+        return item
+
+    def persist(item: TrialItem) -> TrialItem:
+        try:
+            item.result_path = item.runner._save_results(item.grades)
+        finally:
+            item.log.close()
+        log(f"{os.path.basename(item.trial['scenario_file'])} run {item.trial['run_config']['run_id']} -> {item.result_path}")
+        return item
+
+    last_report = [0.0]
+
+    def report_update(item: TrialItem) -> TrialItem:
+        now = time.monotonic()
+        if report_file and now - last_report[0] >= report_interval:
+            from evals.report.make_report import ReportGenerator
+            ReportGenerator(output_dir).generate_markdown(report_file)
+            last_report[0] = now
+        return item
+
+    stages = [
+        Stage("generate", generate, workers.get("generate", 1), queue_size),
+        Stage("rule-check", rule_check, workers.get("rule-check", 1), queue_size),
+        Stage("llm-grade", llm_grade, workers.get("llm-grade", 1), queue_size),
+        Stage("persist", persist, workers.get("persist", 1), queue_size),
+        # A single worker keeps report regeneration serialized
+        Stage("report-update", report_update, 1, queue_size),
+    ]
+    return Pipeline(stages, log=log)
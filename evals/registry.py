@@ -0,0 +1,213 @@
+import os
+import json
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Any
+
+CONTEXT_STRATEGIES = ("full", "window", "summary")
+RULE_KEYS = ("forbidden", "forbidden_regex", "max_chars", "max_repeat", "lexicon")
+
+
+class ScenarioError(ValueError):
+    """Raised when one or more scenario files fail to load or validate."""
+
+
+def build_npc_prompt(config: Dict[str, Any]) -> str:
+    npc_profile = config.get('npc_profile', {})
+    style_rules = npc_profile.get('style_rules', {})
+    must_have = style_rules.get('must_have', [])
+    must_not = style_rules.get('must_not', [])
+    constraints = config.get('constraints', {}).get('hard_fail', [])
+    return (
+        f"You are {npc_profile.get('name', 'NPC')}, a {npc_profile.get('archetype', 'character')}.\n"
+        f"Style Rules:\n"
+        f"- Must have: {', '.join(must_have)}\n"
+        f"- Must not: {', '.join(must_not)}\n"
+        f"Constraints: {', '.join(constraints)}\n"
+        f"You are interacting with a Hunter (Player)."
+    )
+
+
+def build_player_prompt(config: Dict[str, Any]) -> str:
+    player_persona = config.get('player_persona', {})
+    goal = config.get('goal', '')
+    seed_dialogue = config.get('seed_dialogue', '')
+    traits = player_persona.get('traits', [])
+    traits_str = f"Traits: {', '.join(traits)}\n" if traits else ""
+    return (
+        f"You are a Monster Hunter player.\n"
+        f"Tone: {player_persona.get('tone', 'neutral')}\n"
+        f"{traits_str}"
+        f"Goal: {goal}\n"
+        f"Your first line was: \"{seed_dialogue}\"\n"
+        f"IMPORTANT: You must think before you speak. Use the following format for every response:\n"
+        f"[THOUGHTS]\n"
+        f"Your internal monologue, strategy, and reaction to the NPC.\n"
+        f"[/THOUGHTS]\n"
+        f"[ACTION]\n"
+        f"Your actual spoken dialogue to the NPC."
+    )
+
+
+def validate(config: Any) -> List[str]:
+    """Schema problems in a parsed scenario, as human-readable messages (empty if valid)."""
+    if not isinstance(config, dict):
+        return ["top level must be a mapping"]
+    errors = []
+
+    def expect(value, types, name):
+        if not isinstance(value, types):
+            expected = " or ".join(t.__name__ for t in (types if isinstance(types, tuple) else (types,)))
+            errors.append(f"{name} must be {expected}, got {type(value).__name__}")
+            return False
+        return True
+
+    for key in ("scenario_id", "goal"):
+        if key not in config:
+            errors.append(f"missing required field '{key}'")
+        else:
+            expect(config[key], str, key)
+    if "seed_dialogue" in config:
+        expect(config["seed_dialogue"], str, "seed_dialogue")
+    if "max_turns" in config and expect(config["max_turns"], int, "max_turns") and config["max_turns"] < 1:
+        errors.append("max_turns must be at least 1")
+
+    if "npc_profile" not in config:
+        errors.append("missing required field 'npc_profile'")
+    elif expect(config["npc_profile"], dict, "npc_profile"):
+        style_rules = config["npc_profile"].get("style_rules", {})
+        if expect(style_rules, dict, "npc_profile.style_rules"):
+            for key in ("must_have", "must_not"):
+                if key in style_rules:
+                    expect(style_rules[key], list, f"npc_profile.style_rules.{key}")
+    if "player_persona" in config and expect(config["player_persona"], dict, "player_persona"):
+        if "traits" in config["player_persona"]:
+            expect(config["player_persona"]["traits"], list, "player_persona.traits")
+
+    if "rubric" not in config:
+        errors.append("missing required field 'rubric'")
+    elif expect(config["rubric"], dict, "rubric"):
+        dims = config["rubric"].get("dimensions")
+        if not dims:
+            errors.append("rubric.dimensions must list at least one dimension")
+        elif expect(dims, dict, "rubric.dimensions"):
+            for dim, bounds in dims.items():
+                if not expect(bounds, dict, f"rubric.dimensions.{dim}"):
+                    continue
+                lo, hi = bounds.get("min", 0), bounds.get("max", 5)
+                if not (isinstance(lo, (int, float)) and isinstance(hi, (int, float)) and lo < hi):
+                    errors.append(f"rubric.dimensions.{dim} needs numeric min < max, got {lo}..{hi}")
+                elif "pass" in bounds and not (isinstance(bounds["pass"], (int, float)) and lo <= bounds["pass"] <= hi):
+                    errors.append(f"rubric.dimensions.{dim}.pass must be a number within {lo}..{hi}")
+
+    constraints = config.get("constraints", {})
+    if expect(constraints, dict, "constraints") and "hard_fail" in constraints:
+        expect(constraints["hard_fail"], list, "constraints.hard_fail")
+
+    context = config.get("context")
+    if context is not None and expect(context, dict, "context"):
+        if context.get("strategy", "full") not in CONTEXT_STRATEGIES:
+            errors.append(f"context.strategy must be one of {CONTEXT_STRATEGIES}")
+
+    rules = config.get("rules")
+    if rules is not None and expect(rules, dict, "rules"):
+        for key in set(rules) - set(RULE_KEYS):
+            errors.append(f"rules.{key} is not a known rule setting ({', '.join(RULE_KEYS)})")
+    return errors
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A parsed, validated scenario with its prompts precompiled. Shared across trials; never mutated."""
+    path: str
+    content_hash: str
+    scenario_id: str
+    config_json: str
+    npc_prompt: str
+    player_prompt: str
+    rubric_text: str
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """A fresh copy of the scenario config; callers may modify it freely."""
+        return json.loads(self.config_json)
+
+
+_cache: Dict[str, Scenario] = {}
+_cache_lock = threading.Lock()
+
+
+def load_scenario(path: str) -> Scenario:
+    """
+    Load a scenario, parsing and compiling it only the first time a given file
+    content is seen in this process. Raises ScenarioError if it is invalid.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    content_hash = hashlib.sha256(raw).hexdigest()
+    with _cache_lock:
+        cached = _cache.get(content_hash)
+    if cached is not None:
+        return cached if cached.path == path else _with_path(cached, path)
+
+    import yaml
+    try:
+        config = yaml.safe_load(raw)
+    except yaml.YAMLError as e:
+        raise ScenarioError(f"{path}: invalid YAML: {e}") from e
+    errors = validate(config)
+    if not errors:
+        # Compiles the rule regexes too, so bad patterns fail here rather than mid-run
+        from evals.graders.rules import compile_rules
+        try:
+            compile_rules(config)
+        except ValueError as e:
+            errors.append(str(e))
+    if errors:
+        raise ScenarioError(f"{path}: " + "; ".join(errors))
+
+    from evals.graders.rubric_llm import format_dimensions
+    scenario = Scenario(
+        path=path,
+        content_hash=content_hash,
+        scenario_id=config["scenario_id"],
+        config_json=json.dumps(config, ensure_ascii=False, default=str),
+        npc_prompt=build_npc_prompt(config),
+        player_prompt=build_player_prompt(config),
+        rubric_text=format_dimensions(config["rubric"]),
+    )
+    with _cache_lock:
+        _cache[content_hash] = scenario
+    return scenario
+
+
+def _with_path(scenario: Scenario, path: str) -> Scenario:
+    # Same content under another name (e.g. a copied file): reuse the compiled parts
+    return Scenario(**dict(scenario.__dict__, path=path))
+
+
+def load_scenarios(paths: List[str]) -> List[Scenario]:
+    """Load every scenario up front; all problems are reported together."""
+    scenarios, errors = [], []
+    for path in paths:
+        try:
+            scenarios.append(load_scenario(path))
+        except (ScenarioError, OSError) as e:
+            errors.append(str(e))
+    ids: Dict[str, str] = {}
+    for s in scenarios:
+        if s.scenario_id in ids:
+            errors.append(f"{s.path}: duplicate scenario_id '{s.scenario_id}' (also in {ids[s.scenario_id]})")
+        ids[s.scenario_id] = s.path
+    if errors:
+        raise ScenarioError(f"{len(errors)} invalid scenario(s):\n  " + "\n  ".join(errors))
+    return scenarios
+
+
+def discover(location: str) -> List[str]:
+    """Scenario files at `location`: a single YAML file or every *.yaml in a directory."""
+    if os.path.isfile(location):
+        return [location]
+    import glob
+    return sorted(glob.glob(os.path.join(location, "*.yaml")))
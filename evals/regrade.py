@@ -0,0 +1,188 @@
+"""
+Regrade stored runs with the current graders, without replaying any conversation.
+
+Each run's saved transcript is graded again with the current rule checks and
+LLM judge against the *current* scenario YAML (matched by scenario id), and
+the result is stored as a named grade set in the record's `grade_sets`,
+next to the original `grades`, which are never touched. A grade set is
+identified by the hash of transcript + rubric + rule config + grader version
+(the source of the rule and judge graders plus the judge model), so:
+- a run that already has a grade set with the same hash is left alone: a
+  rerun with nothing changed writes nothing. Only under an explicit --label
+  does such a run get that label, as a reference to the existing set
+  (`same_as`), never a copy of its grades;
+- editing one scenario's rubric only costs judge calls for that scenario's runs.
+
+Reports can then be built from a grade set:
+    python -m evals.report.make_report evals/outputs/runs --grade-set <label>
+"""
+import time
+import json
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, Optional
+from evals.graders import rubric_llm, rules
+from evals.graders.rubric_llm import LLMGrader
+from evals.graders.rules import RuleGrader
+from evals.metrics import CallMetrics
+from evals.registry import Scenario
+from evals.store import open_store
+
+
+def grader_version(model: str) -> str:
+    """Changes whenever the rule or judge grader code (lexicons, prompts, parsing, thresholds) or the judge model does."""
+    source = inspect.getsource(rules) + inspect.getsource(rubric_llm) + model
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+
+
+def grade_hash(transcript, config: Dict[str, Any], version: str) -> str:
+    """Identity of a grading: what the graders read from the run and the scenario, plus the grader version."""
+    relevant = {
+        "transcript": transcript,
+        "rubric": config.get('rubric'),
+        "must_not": ((config.get('npc_profile') or {}).get('style_rules') or {}).get('must_not'),
+        "hard_fail": (config.get('constraints') or {}).get('hard_fail'),
+        "rules": config.get('rules'),
+        "grader": version,
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class Regrader:
+    """
+    Streams the records of a run store and regrades them under `label` (by
+    default regrade_<timestamp>) with up to `workers` judge calls in flight.
+    Only the main thread writes to the store.
+    """
+    def __init__(self, runs_dir: str, scenarios: Dict[str, Scenario], label: Optional[str] = None, workers: int = 4,
+                 model: str = "deepseek-chat", dry_run: bool = False, log: Optional[Callable[[str], None]] = None):
+        self.runs_dir = runs_dir
+        # scenario id -> current scenario; runs of scenarios that no longer exist use their stored config
+        self.scenarios = scenarios
+        # A generated label only names new gradings; an explicit one should cover every run
+        self.explicit_label = label is not None
+        self.label = label or time.strftime("regrade_%Y%m%d_%H%M%S")
+        self.workers = workers
+        self.model = model
+        self.dry_run = dry_run
+        self.log = log or print
+        self.version = grader_version(model)
+
+    def _grade(self, record: Dict[str, Any], config: Dict[str, Any], digest: str,
+               rubric_text: Optional[str]) -> Dict[str, Any]:
+        transcript = record.get('transcript') or []
+        grades = RuleGrader.grade(transcript, config)
+        metrics = CallMetrics(record.get('scenario'), record.get('run_config', {}).get('run_id'))
+        if 'rubric' in config and not (record.get('early_stop') or {}).get('judge_skipped'):
+            judge = LLMGrader(model=self.model, metrics=metrics, log=self.log).grade(transcript, config['rubric'],
+                                                                                    dimensions_text=rubric_text)
+            if judge.get('result') == 'ERROR':
+                raise ValueError(judge.get('error', 'judge output could not be parsed'))
+            grades.append(judge)
+        return {"label": self.label, "hash": digest, "grader_version": self.version,
+                "graded_at": time.strftime("%Y%m%d_%H%M%S"), "grades": grades, "metrics": metrics.to_dict()}
+
+    def run(self) -> Dict[str, int]:
+        store = open_store(self.runs_dir)
+        counts = {"runs": 0, "skipped": 0, "reused": 0, "graded": 0, "failed": 0}
+        pending = {}
+
+        def collect(done):
+            for fut in done:
+                key, record = pending.pop(fut)
+                try:
+                    grade_set = fut.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    self.log(f"Regrading {key} failed: {e}")
+                    continue
+                record.setdefault('grade_sets', {})[self.label] = grade_set
+                store.update(key, record)
+                counts["graded"] += 1
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for key, record in store.iter_records():
+                counts["runs"] += 1
+                scenario = self.scenarios.get(record.get('scenario'))
+                config = scenario.config if scenario else (record.get('config') or {})
+                digest = grade_hash(record.get('transcript'), config, self.version)
+                sets = record.get('grade_sets') or {}
+                if sets.get(self.label, {}).get('hash') == digest:
+                    counts["skipped"] += 1
+                    continue
+                earlier = next((name for name, s in sets.items() if s.get('hash') == digest and 'same_as' not in s),
+                               None)
+                if earlier is not None and not self.explicit_label:
+                    counts["skipped"] += 1
+                    continue
+                if earlier is not None:
+                    # Same transcript, rubric and graders: point at the earlier set instead of judging again
+                    counts["reused"] += 1
+                    if not self.dry_run:
+                        sets[self.label] = {"label": self.label, "hash": digest, "same_as": earlier,
+                                            "grader_version": sets[earlier].get('grader_version'),
+                                            "graded_at": sets[earlier].get('graded_at', '')}
+                        record['grade_sets'] = sets
+                        store.update(key, record)
+                    continue
+                if self.dry_run:
+                    counts["graded"] += 1
+                    continue
+                # Bounded in-flight work keeps memory flat however large the store is
+                while len(pending) >= 2 * self.workers:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                fut = pool.submit(self._grade, record, config, digest, scenario.rubric_text if scenario else None)
+                pending[fut] = (key, record)
+            while pending:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        return counts
+
+
+def list_grade_sets(runs_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Grade set label -> number of runs, grader versions and last graded time."""
+    sets: Dict[str, Dict[str, Any]] = {}
+    for _, record in open_store(runs_dir).iter_records():
+        for label, s in (record.get('grade_sets') or {}).items():
+            st = sets.setdefault(label, {"runs": 0, "versions": set(), "graded_at": ""})
+            st["runs"] += 1
+            st["versions"].add(s.get('grader_version'))
+            st["graded_at"] = max(st["graded_at"], s.get('graded_at', ''))
+    return sets
+
+
+def main():
+    import argparse
+    from evals.registry import ScenarioError, discover, load_scenarios
+    parser = argparse.ArgumentParser(description="Regrade saved transcripts with the current rubrics and graders")
+    parser.add_argument("runs_dir", nargs="?", default="evals/outputs/runs", help="Run store: directory of run JSONs or a .db file")
+    parser.add_argument("--scenarios", type=str, default="evals/scenarios", help="Directory with the current scenario YAMLs")
+    parser.add_argument("--label", type=str, default=None, help="Name of the grade set to write (default: regrade_<timestamp>)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent judge requests")
+    parser.add_argument("--model", type=str, default="deepseek-chat", help="Judge model")
+    parser.add_argument("--dry-run", action="store_true", help="Count what would be regraded without calling the judge")
+    parser.add_argument("--list", action="store_true", help="List the grade sets in the store")
+    args = parser.parse_args()
+
+    if args.list:
+        for label, st in sorted(list_grade_sets(args.runs_dir).items(), key=lambda x: x[1]["graded_at"]):
+            print(f"{label}: {st['runs']} runs, grader {', '.join(sorted(map(str, st['versions'])))}, "
+                  f"last graded {st['graded_at']}")
+        return
+    try:
+        scenarios = {s.scenario_id: s for s in load_scenarios(discover(args.scenarios))}
+    except ScenarioError as e:
+        raise SystemExit(str(e))
+    regrader = Regrader(args.runs_dir, scenarios, args.label, workers=args.workers, model=args.model,
+                        dry_run=args.dry_run)
+    counts = regrader.run()
+    verb = "would be judged" if args.dry_run else "judged"
+    print(f"Grade set '{regrader.label}' (grader {regrader.version}): {counts['runs']} runs, {counts['graded']} {verb}, "
+          f"{counts['reused']} referencing earlier sets, {counts['skipped']} already current, {counts['failed']} failed.")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("Stopped; runs regraded so far are saved.")
@@ -0,0 +1,240 @@
+"""
+Vectorized reliability statistics over a run store.
+
+Runs are packed into a scenarios x trials x dimensions score array (padded
+with NaN, since scenarios can have different trial counts), and everything is
+computed on whole arrays at once:
+- unbiased pass@k and pass^k for every k <= n (Chen et al. 2021 estimator:
+  pass@k = 1 - C(n-c, k) / C(n, k), pass^k = C(c, k) / C(n, k)),
+- percentile-bootstrap confidence intervals for the pass rate, the mean score
+  and both curves, resampling trials within each scenario. The pass count of
+  a resample is Binomial(n, c/n), and both curves increase with c, so their
+  intervals are the curves evaluated at the bootstrap quantiles of c; only
+  the mean score needs the trials themselves, resampled in bounded chunks,
+- per-dimension means and variances of the rubric scores.
+
+NumPy is required here; callers check `available()` and skip the analysis
+without it.
+"""
+from array import array
+from typing import List, Dict, Any, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+def available() -> bool:
+    return np is not None
+
+
+def dimension_scores(record: Dict[str, Any]) -> Dict[str, float]:
+    """Numeric per-dimension rubric scores of a run (non-numeric values are skipped)."""
+    scores = {}
+    for g in record.get('grades', []):
+        if g.get('metric') == 'rubric_eval' and isinstance(g.get('scores'), dict):
+            for dim, value in g['scores'].items():
+                try:
+                    scores[dim] = float(value)
+                except (TypeError, ValueError):
+                    continue
+    return scores
+
+
+class ScoreCollector:
+    """
+    Gathers (scenario, pass, total score, dimension scores) per run in compact
+    per-scenario arrays, then packs them into padded NumPy arrays.
+    """
+    def __init__(self):
+        self._passed: Dict[str, array] = {}
+        self._total: Dict[str, array] = {}
+        # scenario -> dimension -> scores aligned with the scenario's runs (NaN where missing)
+        self._dims: Dict[str, Dict[str, array]] = {}
+        self._dim_names: Dict[str, None] = {}
+
+    def add(self, scenario: str, is_pass: bool, score: float, dims: Optional[Dict[str, float]] = None):
+        if scenario not in self._passed:
+            self._passed[scenario], self._total[scenario], self._dims[scenario] = array('b'), array('d'), {}
+        t = len(self._passed[scenario])
+        self._passed[scenario].append(bool(is_pass))
+        self._total[scenario].append(score)
+        columns = self._dims[scenario]
+        for dim, value in (dims or {}).items():
+            self._dim_names.setdefault(dim, None)
+            if dim not in columns:
+                columns[dim] = array('d', [float('nan')] * t)
+            columns[dim].append(value)
+        for column in columns.values():
+            if len(column) <= t:
+                column.append(float('nan'))
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self._passed.values())
+
+    def arrays(self) -> "ScoreArrays":
+        scenarios = sorted(self._passed)
+        dimensions = list(self._dim_names)
+        n_max = max((len(p) for p in self._passed.values()), default=0)
+        shape = (len(scenarios), n_max)
+        passed = np.zeros(shape, dtype=bool)
+        total = np.full(shape, np.nan)
+        scores = np.full(shape + (len(dimensions),), np.nan)
+        counts = np.zeros(len(scenarios), dtype=np.int64)
+        for s, sid in enumerate(scenarios):
+            n = counts[s] = len(self._passed[sid])
+            passed[s, :n] = np.frombuffer(self._passed[sid], dtype=np.int8).astype(bool)
+            total[s, :n] = np.frombuffer(self._total[sid], dtype=np.float64)
+            for d, dim in enumerate(dimensions):
+                if dim in self._dims[sid]:
+                    scores[s, :n, d] = np.frombuffer(self._dims[sid][dim], dtype=np.float64)
+        return ScoreArrays(scenarios, dimensions, counts, passed, total, scores)
+
+
+class ScoreArrays:
+    """
+    scenarios x trials (x dimensions) arrays; trial slots past a scenario's
+    count are padding (passed False, scores NaN) and masked out everywhere.
+    """
+    def __init__(self, scenarios: List[str], dimensions: List[str], counts, passed, total, scores):
+        self.scenarios = scenarios
+        self.dimensions = dimensions
+        self.counts = counts
+        self.passed = passed
+        self.total = total
+        self.scores = scores
+
+    @property
+    def mask(self):
+        return np.arange(self.passed.shape[1])[None, :] < self.counts[:, None]
+
+
+def pass_curves(n, c, k_max: int):
+    """
+    Unbiased pass@k and pass^k for k = 1..k_max from n trials with c passes.
+    `n` and `c` broadcast together (e.g. scenarios, or bootstrap draws x
+    scenarios); the result has a trailing k axis. Entries with k > n are NaN.
+    Uses the running products C(n-c, k)/C(n, k) = prod_i (n-c-i)/(n-i) and
+    C(c, k)/C(n, k) = prod_i (c-i)/(n-i), so all k come from one cumprod.
+    """
+    n = np.asarray(n, dtype=float)[..., None]
+    c = np.asarray(c, dtype=float)[..., None]
+    i = np.arange(k_max, dtype=float)
+    denom = n - i
+    valid = denom > 0
+    safe = np.where(valid, denom, 1.0)
+    fail_ratio = np.where(valid, np.clip(n - c - i, 0, None) / safe, 0.0)
+    pass_ratio = np.where(valid, np.clip(c - i, 0, None) / safe, 0.0)
+    pass_at_k = np.where(valid, 1.0 - np.cumprod(fail_ratio, axis=-1), np.nan)
+    pass_caret_k = np.where(valid, np.cumprod(pass_ratio, axis=-1), np.nan)
+    return pass_at_k, pass_caret_k
+
+
+# Upper bound on resampled elements held at once by the mean-score bootstrap
+_CHUNK_ELEMENTS = 1_000_000
+
+
+def analyze(arrays: ScoreArrays, n_boot: int = 1000, confidence: float = 0.95, seed: int = 0) -> Dict[str, Any]:
+    """
+    Per-scenario reliability statistics as plain JSON-ready data:
+    n, passes, pass rate and mean score with bootstrap CIs, the pass@k and
+    pass^k curves (k = 1..n) with CIs, and per-dimension mean / variance.
+    """
+    counts, mask = arrays.counts, arrays.mask
+    n_scen, n_max = arrays.passed.shape
+    alpha = (1 - confidence) / 2 * 100
+    passes = (arrays.passed & mask).sum(axis=1)
+    pass_at_k, pass_caret_k = pass_curves(counts, passes, n_max)
+
+    # Bootstrap: resample each scenario's own trials with replacement
+    rng = np.random.default_rng(seed)
+    safe_counts = np.maximum(counts, 1)
+    boot_c = rng.binomial(counts, passes / safe_counts, size=(n_boot, n_scen))
+    c_lo = np.percentile(boot_c, alpha, axis=0, method="lower")
+    c_hi = np.percentile(boot_c, 100 - alpha, axis=0, method="higher")
+    rate_lo, rate_hi = c_lo / safe_counts, c_hi / safe_counts
+    at_lo, caret_lo = pass_curves(counts, c_lo, n_max)
+    at_hi, caret_hi = pass_curves(counts, c_hi, n_max)
+
+    # Flat gather: trial t of scenario s is element s * n_max + t
+    flat_total = np.nan_to_num(arrays.total).ravel()
+    offsets = (np.arange(n_scen) * n_max)[None, :, None]
+    last = (safe_counts - 1)[None, :, None]
+    chunk = max(1, _CHUNK_ELEMENTS // max(1, n_scen * n_max))
+    boot_mean = np.empty((n_boot, n_scen))
+    for start in range(0, n_boot, chunk):
+        shape = (min(chunk, n_boot - start), n_scen, n_max)
+        idx = (rng.random(shape, dtype=np.float32) * safe_counts[None, :, None]).astype(np.int64)
+        draws = flat_total[np.minimum(idx, last) + offsets]
+        draws[~np.broadcast_to(mask, shape)] = 0.0
+        boot_mean[start:start + shape[0]] = draws.sum(axis=2) / safe_counts
+    mean_lo, mean_hi = np.percentile(boot_mean, [alpha, 100 - alpha], axis=0)
+
+    total = np.where(mask, arrays.total, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_score = np.nansum(total, axis=1) / safe_counts
+        dim_n = (~np.isnan(arrays.scores)).sum(axis=1)
+        dim_mean = np.nansum(arrays.scores, axis=1) / np.maximum(dim_n, 1)
+        dim_sq = np.nansum((arrays.scores - dim_mean[:, None, :]) ** 2, axis=1)
+        dim_var = np.where(dim_n > 1, dim_sq / np.maximum(dim_n - 1, 1), np.nan)
+
+    def clean(values):
+        values = np.round(np.asarray(values, dtype=float), 4)
+        return np.where(np.isnan(values), None, values).tolist()
+
+    result = {"confidence": confidence, "bootstrap": n_boot, "dimensions": arrays.dimensions, "scenarios": {}}
+    for s, sid in enumerate(arrays.scenarios):
+        n = int(counts[s])
+        result["scenarios"][sid] = {
+            "n": n,
+            "passes": int(passes[s]),
+            "pass_rate": round(float(passes[s] / n), 4),
+            "pass_rate_ci": clean([rate_lo[s], rate_hi[s]]),
+            "mean_score": round(float(mean_score[s]), 4),
+            "mean_score_ci": clean([mean_lo[s], mean_hi[s]]),
+            "pass_at_k": clean(pass_at_k[s, :n]),
+            "pass_at_k_ci": clean(np.stack([at_lo[s, :n], at_hi[s, :n]], axis=-1)),
+            "pass_caret_k": clean(pass_caret_k[s, :n]),
+            "pass_caret_k_ci": clean(np.stack([caret_lo[s, :n], caret_hi[s, :n]], axis=-1)),
+            "dimensions": {
+                dim: {"n": int(dim_n[s, d]), "mean": clean([dim_mean[s, d]])[0], "var": clean([dim_var[s, d]])[0]}
+                for d, dim in enumerate(arrays.dimensions) if dim_n[s, d]
+            },
+        }
+    return result
+
+
+def report_ks(n_max: int, candidates: Sequence[int] = (1, 3, 5, 10)) -> List[int]:
+    """The k values shown in report tables: the candidates that fit, plus n_max itself."""
+    ks = [k for k in candidates if k < n_max]
+    return ks + [n_max] if n_max else ks
+
+
+def analyze_store(runs_dir: str, **kwargs) -> Optional[Dict[str, Any]]:
+    """Analysis of every run in a store; None without NumPy or without runs."""
+    if not available():
+        return None
+    from evals.store import open_store, run_verdict
+    collector = ScoreCollector()
+    for _, record in open_store(runs_dir).iter_records():
+        is_pass, score = run_verdict(record)
+        collector.add(record.get('scenario', 'Unknown'), is_pass, score, dimension_scores(record))
+    if not len(collector):
+        return None
+    return analyze(collector.arrays(), **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Reliability statistics (unbiased pass@k / pass^k with bootstrap CIs)")
+    parser.add_argument("runs_dir", nargs="?", default="evals/outputs/runs", help="Run store: directory of run JSONs or a .db file")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the intervals")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the bootstrap")
+    args = parser.parse_args()
+    if not available():
+        raise SystemExit("NumPy is required: pip install numpy")
+    print(json.dumps(analyze_store(args.runs_dir, n_boot=args.bootstrap, confidence=args.confidence, seed=args.seed),
+                     ensure_ascii=False, indent=2))
@@ -1,139 +1,388 @@
-import json
 import os
-import glob
-from typing import List, Dict
+import re
+import shutil
+import tempfile
+from array import array
+from typing import Dict, Any, Optional, TextIO
+from evals.store import open_store, select_grade_set, summarize_record
+from evals.metrics import percentile, summarize_calls
 
 class ReportGenerator:
-    def __init__(self, runs_dir: str):
+    def __init__(self, runs_dir: str, split_details: bool = False, bootstrap: int = 1000, confidence: float = 0.95,
+                 grade_set: Optional[str] = None):
+        # Any run store location: a directory of run JSONs or a .db file
         self.runs_dir = runs_dir
+        # Write each scenario's detailed results to details/<scenario>.md instead of the main report
+        self.split_details = split_details
+        # Bootstrap resamples and confidence level of the reliability intervals
+        self.bootstrap = bootstrap
+        self.confidence = confidence
+        # Report a regraded grade set (evals/regrade.py) instead of the grades saved with each run
+        self.grade_set = grade_set
 
     def generate_markdown(self, output_file: str = "report.md"):
-        files = glob.glob(os.path.join(self.runs_dir, "*.json"))
-        records = []
-        for f in files:
-            with open(f, 'r') as fd:
-                records.append(json.load(fd))
-        
-        # Sort by timestamp desc
-        records.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # Group by scenario
-        scenario_stats = {}
-        for r in records:
-            sid = r.get('scenario', 'Unknown')
-            if sid not in scenario_stats:
-                scenario_stats[sid] = {"runs": [], "passes": 0, "total_score": 0}
-            
-            # Determine Pass/Fail for this run
-            grades = r.get('grades', [])
-            is_pass = True
-            run_score = 0
-            
-            for g in grades:
-                # Rule grader check
-                if g.get('result') == 'FAIL':
-                    is_pass = False
-                
-                # Rubric check
-                if g.get('metric') == 'rubric_eval':
-                    if g.get('result') == 'FAIL':
-                        is_pass = False
-                    # Try to get score
-                    s = g.get('total_score', 0)
-                    if s == '-': s = 0
-                    run_score = float(s)
-
-            scenario_stats[sid]["runs"].append(r)
-            if is_pass:
-                scenario_stats[sid]["passes"] += 1
-            scenario_stats[sid]["total_score"] += run_score
-            
-            # Annotate record for detailed view
-            r["_is_pass"] = is_pass
-            r["_score"] = run_score
-
-        md = "# AI NPC Evaluation Report\n\n"
-        md += f"**Total Runs**: {len(records)}\n\n"
-        
-        md += "## Reliability Analysis (Pass@k / Pass^k)\n"
-        md += "Concepts:\n"
-        md += "- **pass@k**: At least 1 success in k trials. Suitable for products allowing retry.\n"
-        md += "- **pass^k**: All k trials successful. Suitable for NPCs requiring high stability.\n\n"
-        
-        md += "| Scenario | Trials (k) | Pass Count | pass@k | pass^k | Avg Score |\n"
-        md += "|----------|------------|------------|--------|--------|-----------|\n"
-        
-        for sid, data in scenario_stats.items():
-            k = len(data["runs"])
+        """
+        Stream the report in a single pass over the run store.
+        Only per-scenario aggregates are kept in memory; summary rows and
+        detailed sections are spooled to temporary files and appended after
+        the aggregate tables are written.
+        """
+        # NumPy comes in with the analysis, so only when a report is actually built
+        from evals.report import analysis
+        store = open_store(self.runs_dir)
+        details_dir = os.path.join(os.path.dirname(os.path.abspath(output_file)), "details")
+
+        total_runs = 0
+        regraded = 0
+        scenario_stats: Dict[str, Dict[str, Any]] = {}
+        context_stats: Dict[Any, Dict[str, Any]] = {}
+        call_stats: Dict[str, Dict[str, Any]] = {}
+        role_stats: Dict[str, Dict[str, Any]] = {}
+        detail_files: Dict[str, TextIO] = {}
+        # Pass / score / dimension scores per run, for the vectorized reliability analysis
+        collector = analysis.ScoreCollector() if analysis.available() else None
+        # Which tier of the grading cascade settled each run, and local-vs-judge agreement
+        cascade_stats = {"tiers": {}, "audit": [0, 0], "escalated": [0, 0], "abs_err": 0.0, "dims": 0}
+
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as summary_tmp, \
+                tempfile.TemporaryFile('w+', encoding='utf-8') as details_tmp:
+            try:
+                # Records come back newest first
+                for _, r in store.iter_records():
+                    if self.grade_set:
+                        r = select_grade_set(r, self.grade_set)
+                        regraded += 'grade_set' in r
+                    s = summarize_record(r)
+                    sid = s['scenario']
+                    total_runs += 1
+
+                    # Group by scenario
+                    stats = scenario_stats.setdefault(sid, {"runs": 0, "passes": 0, "total_score": 0})
+                    stats["runs"] += 1
+                    if s['is_pass']:
+                        stats["passes"] += 1
+                    stats["total_score"] += s['score']
+                    run_config = r.get('run_config') or {}
+                    if run_config.get('stop_policy'):
+                        # Trial consumption is per sweep; runs from before sweeps were tagged share ''
+                        sweep = stats.setdefault("sweeps", {}).setdefault(run_config.get('sweep', ''), {
+                            "stop_policy": run_config['stop_policy'], "used": 0, "planned": 0})
+                        sweep["used"] += 1
+                        sweep["planned"] = max(sweep["planned"], run_config.get('planned_trials', 0))
+
+                    # Group by context strategy to measure the effect of truncation
+                    ctx = context_stats.setdefault((sid, s['context']), {"runs": 0, "total_score": 0, "prompt_tokens": 0})
+                    ctx["runs"] += 1
+                    ctx["total_score"] += s['score']
+                    ctx["prompt_tokens"] += s['prompt_tokens']
+
+                    self._add_call_metrics(call_stats, role_stats, sid, r.get('metrics'))
+                    self._add_cascade(cascade_stats, r)
+                    if collector is not None:
+                        collector.add(sid, s['is_pass'], s['score'], analysis.dimension_scores(r))
+
+                    result = "PASS" if s['is_pass'] else "FAIL"
+                    summary_tmp.write(f"| {s['timestamp']} | {sid} | {s['run_id']} | {result} | {s['score']} |\n")
+
+                    if self.split_details:
+                        if sid not in detail_files:
+                            os.makedirs(details_dir, exist_ok=True)
+                            detail_files[sid] = open(os.path.join(details_dir, f"{self._safe_name(sid)}.md"), 'w', encoding='utf-8')
+                            detail_files[sid].write(f"# Detailed Results: {sid}\n\n")
+                        self._write_run_details(detail_files[sid], r, s['is_pass'])
+                    else:
+                        self._write_run_details(details_tmp, r, s['is_pass'])
+            finally:
+                for fd in detail_files.values():
+                    fd.close()
+
+            with open(output_file, 'w', encoding='utf-8') as f:
+                grade_note = f"{self.grade_set} ({regraded} of {total_runs} runs regraded; the rest use their " \
+                             "original grades)" if self.grade_set else None
+                self._write_overview(f, total_runs, scenario_stats, context_stats, grade_note)
+                stats = analysis.analyze(collector.arrays(), n_boot=self.bootstrap, confidence=self.confidence) \
+                    if collector is not None and len(collector) else None
+                self._write_reliability(f, stats)
+                self._write_cascade(f, cascade_stats)
+                self._write_call_metrics(f, call_stats, role_stats)
+
+                f.write("\n## Run Summary\n\n")
+                f.write("| Timestamp | Scenario | Run ID | Result | Score |\n")
+                f.write("|-----------|----------|--------|--------|-------|\n")
+                summary_tmp.seek(0)
+                shutil.copyfileobj(summary_tmp, f)
+
+                f.write("\n## Detailed Results\n\n")
+                if self.split_details:
+                    for sid in sorted(detail_files):
+                        f.write(f"- [{sid}](details/{self._safe_name(sid)}.md)\n")
+                else:
+                    details_tmp.seek(0)
+                    shutil.copyfileobj(details_tmp, f)
+
+        print(f"Report generated at {output_file}")
+
+    @staticmethod
+    def _add_call_metrics(call_stats: Dict[str, Dict[str, Any]], role_stats: Dict[str, Dict[str, Any]],
+                          sid: str, metrics: Dict[str, Any]):
+        """Accumulate one run's LLM call metrics; latencies are kept as compact float arrays."""
+        calls = (metrics or {}).get('calls') or []
+        if not calls:
+            return
+        summary = metrics.get('summary') or summarize_calls(calls)
+        st = call_stats.setdefault(sid, {"trials": 0, "calls": 0, "wall_ms": array('d'), "ttft_ms": array('d'),
+                                         "tokens": array('d'), "cost": 0.0, "retries": 0})
+        st["trials"] += 1
+        st["calls"] += len(calls)
+        st["tokens"].append(summary["prompt_tokens"] + summary["completion_tokens"])
+        st["cost"] += summary["cost_usd"]
+        st["retries"] += summary["retries"]
+        for c in calls:
+            share = 1 / c.get("shared_by", 1)
+            role = role_stats.setdefault(c["role"], {"calls": 0, "wall_ms": array('d'), "prompt_tokens": 0.0,
+                                                     "completion_tokens": 0.0, "cost": 0.0})
+            role["calls"] += share
+            role["prompt_tokens"] += c["prompt_tokens"] * share
+            role["completion_tokens"] += c["completion_tokens"] * share
+            role["cost"] += c["cost_usd"] * share
+            if c["source"] == "api":
+                st["wall_ms"].append(c["wall_ms"])
+                role["wall_ms"].append(c["wall_ms"])
+            if c.get("ttft_ms") is not None:
+                st["ttft_ms"].append(c["ttft_ms"])
+
+    @staticmethod
+    def _add_cascade(cascade_stats: Dict[str, Any], r: Dict[str, Any]):
+        for g in r.get('grades', []):
+            if g.get('metric') != 'rubric_eval' or 'tier' not in g:
+                continue
+            cascade_stats["tiers"][g['tier']] = cascade_stats["tiers"].get(g['tier'], 0) + 1
+            local = g.get('local')
+            if g['tier'] != 'judge' or not local or g.get('result') not in ('PASS', 'FAIL'):
+                continue
+            # Audited runs were confidently settled locally: an unbiased sample of the local tier's accuracy
+            bucket = cascade_stats["audit" if g.get('escalation') == 'audit' else "escalated"]
+            bucket[0] += 1
+            bucket[1] += local['result'] == g['result']
+            for dim, value in (local.get('scores') or {}).items():
+                try:
+                    cascade_stats["abs_err"] += abs(float(g['scores'][dim]) - value)
+                    cascade_stats["dims"] += 1
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    @staticmethod
+    def _write_cascade(f: TextIO, cascade_stats: Dict[str, Any]):
+        tiers = cascade_stats["tiers"]
+        graded = sum(tiers.values())
+        if not graded:
+            return
+        cheap = tiers.get("rules", 0) + tiers.get("local", 0)
+        f.write("\n## Grading Cascade\n\n")
+        f.write(f"{cheap} of {graded} rubric grades ({cheap / graded:.0%}) were settled without the LLM judge.\n\n")
+        f.write("| Tier | Runs | Share |\n")
+        f.write("|------|------|-------|\n")
+        for tier in ("rules", "local", "judge"):
+            f.write(f"| {tier} | {tiers.get(tier, 0)} | {tiers.get(tier, 0) / graded:.0%} |\n")
+
+        f.write("\n| Local vs Judge | Runs | Verdict Agreement |\n")
+        f.write("|----------------|------|-------------------|\n")
+        for label, key in (("Audited (confident, judged anyway)", "audit"), ("Escalated (uncertain)", "escalated")):
+            n, agree = cascade_stats[key]
+            f.write(f"| {label} | {n} | {agree / n:.0%} |\n" if n else f"| {label} | 0 | - |\n")
+        if cascade_stats["dims"]:
+            f.write(f"\nMean absolute error of local dimension scores vs the judge: "
+                    f"{cascade_stats['abs_err'] / cascade_stats['dims']:.2f}\n")
+
+    @staticmethod
+    def _write_call_metrics(f: TextIO, call_stats: Dict[str, Dict[str, Any]], role_stats: Dict[str, Dict[str, Any]]):
+        if not call_stats:
+            return
+
+        def ms(values, q):
+            v = percentile(values, q)
+            return f"{v:.0f}" if v is not None else "-"
+
+        f.write("\n## LLM Call Metrics\n\n")
+        f.write("Latency covers API calls only (cache hits and mock replies are excluded); TTFT is recorded when streaming (LLM_STREAM=1).\n\n")
+        f.write("| Scenario | Trials | Calls / Trial | Latency p50 (ms) | Latency p95 (ms) | TTFT p50 (ms) | Tokens / Trial p50 | Tokens / Trial p95 | Retries | Cost / Trial (USD) |\n")
+        f.write("|----------|--------|---------------|------------------|------------------|---------------|--------------------|--------------------|---------|--------------------|\n")
+        for sid, st in sorted(call_stats.items()):
+            n = st["trials"]
+            f.write(f"| {sid} | {n} | {st['calls'] / n:.1f} | {ms(st['wall_ms'], 50)} | {ms(st['wall_ms'], 95)} | "
+                    f"{ms(st['ttft_ms'], 50)} | {ms(st['tokens'], 50)} | {ms(st['tokens'], 95)} | {st['retries']} | "
+                    f"{st['cost'] / n:.5f} |\n")
+
+        f.write("\n| Role | Calls | Latency p50 (ms) | Latency p95 (ms) | Prompt Tokens | Completion Tokens | Cost (USD) |\n")
+        f.write("|------|-------|------------------|------------------|---------------|-------------------|------------|\n")
+        for role, st in sorted(role_stats.items()):
+            f.write(f"| {role} | {st['calls']:.0f} | {ms(st['wall_ms'], 50)} | {ms(st['wall_ms'], 95)} | "
+                    f"{st['prompt_tokens']:.0f} | {st['completion_tokens']:.0f} | {st['cost']:.4f} |\n")
+
+    @staticmethod
+    def _write_reliability(f: TextIO, stats: Dict[str, Any]):
+        from evals.report import analysis
+        if stats is None:
+            if not analysis.available():
+                f.write("\n_Install numpy for unbiased pass@k / pass^k curves with confidence intervals._\n")
+            return
+
+        def est(values, cis, k):
+            if k > len(values):
+                return "-"
+            lo, hi = cis[k - 1]
+            return f"{values[k - 1]:.2f} [{lo:.2f}, {hi:.2f}]"
+
+        scenarios = stats["scenarios"]
+        ks = analysis.report_ks(max(s["n"] for s in scenarios.values()))
+        pct = f"{stats['confidence']:.0%}"
+        f.write(f"\n## Statistical Reliability (unbiased estimates, {pct} bootstrap CI)\n")
+        f.write("With n trials and c passes, pass@k = 1 - C(n-c, k) / C(n, k) and pass^k = C(c, k) / C(n, k) "
+                "estimate the chance that k fresh trials contain at least one pass / only passes, for every k <= n. "
+                f"Intervals come from {stats['bootstrap']} bootstrap resamples of each scenario's trials.\n\n")
+        f.write("| Scenario | n | Pass Rate | Avg Score | " + " | ".join(f"pass@{k}" for k in ks) + " | "
+                + " | ".join(f"pass^{k}" for k in ks) + " |\n")
+        f.write("|----------|---|-----------|-----------|" + "--------|" * (2 * len(ks)) + "\n")
+        for sid, st in sorted(scenarios.items()):
+            rate_lo, rate_hi = st["pass_rate_ci"]
+            mean_lo, mean_hi = st["mean_score_ci"]
+            cells = [est(st["pass_at_k"], st["pass_at_k_ci"], k) for k in ks]
+            cells += [est(st["pass_caret_k"], st["pass_caret_k_ci"], k) for k in ks]
+            f.write(f"| {sid} | {st['n']} | {st['pass_rate']:.2f} [{rate_lo:.2f}, {rate_hi:.2f}] | "
+                    f"{st['mean_score']:.2f} [{mean_lo:.2f}, {mean_hi:.2f}] | " + " | ".join(cells) + " |\n")
+
+        if stats["dimensions"]:
+            f.write("\n### Rubric Dimensions\n\n")
+            f.write("| Scenario | Dimension | n | Mean | Variance |\n")
+            f.write("|----------|-----------|---|------|----------|\n")
+            for sid, st in sorted(scenarios.items()):
+                for dim, d in st["dimensions"].items():
+                    var = f"{d['var']:.2f}" if d["var"] is not None else "-"
+                    f.write(f"| {sid} | {dim} | {d['n']} | {d['mean']:.2f} | {var} |\n")
+
+    @staticmethod
+    def _safe_name(sid: str) -> str:
+        return re.sub(r"[^\w.-]", "_", sid)
+
+    @staticmethod
+    def _write_overview(f: TextIO, total_runs: int, scenario_stats: Dict[str, Dict[str, Any]],
+                        context_stats: Dict[Any, Dict[str, Any]], grade_note: Optional[str] = None):
+        f.write("# AI NPC Evaluation Report\n\n")
+        f.write(f"**Total Runs**: {total_runs}\n\n")
+        if grade_note:
+            f.write(f"**Grade Set**: {grade_note}\n\n")
+
+        f.write("## Reliability Analysis (Pass@k / Pass^k)\n")
+        f.write("Concepts:\n")
+        f.write("- **pass@k**: At least 1 success in k trials. Suitable for products allowing retry.\n")
+        f.write("- **pass^k**: All k trials successful. Suitable for NPCs requiring high stability.\n\n")
+
+        f.write("| Scenario | Trials (k) | Pass Count | pass@k | pass^k | Avg Score |\n")
+        f.write("|----------|------------|------------|--------|--------|-----------|\n")
+
+        for sid, data in sorted(scenario_stats.items()):
+            k = data["runs"]
             passes = data["passes"]
             avg_score = data["total_score"] / k if k > 0 else 0
-            
+
             pass_at_k = "YES" if passes >= 1 else "NO"
             pass_caret_k = "YES" if passes == k else "NO"
-            
-            md += f"| {sid} | {k} | {passes} | {pass_at_k} | {pass_caret_k} | {avg_score:.2f} |\n"
-            
-        md += "\n## Run Summary\n\n"
-        md += "| Timestamp | Scenario | Run ID | Result | Score |\n"
-        md += "|-----------|----------|--------|--------|-------|\n"
-        
-        for r in records:
-            scenario = r.get('scenario', 'Unknown')
-            timestamp = r.get('timestamp', '')
-            run_id = r.get('run_config', {}).get('run_id', '-')
-            result = "PASS" if r.get("_is_pass") else "FAIL"
-            score = r.get("_score")
-            
-            md += f"| {timestamp} | {scenario} | {run_id} | {result} | {score} |\n"
-            
-        md += "\n## Detailed Results\n\n"
-        
-        for r in records:
-            scenario = r.get('scenario')
-            run_id = r.get('run_config', {}).get('run_id', '-')
-            timestamp = r.get('timestamp')
-            
-            md += f"### Run: {scenario} (Run {run_id}, time: {timestamp})\n"
-            md += f"**Result**: {'PASS' if r.get('_is_pass') else 'FAIL'}\n"
-            
-            # Grades
-            md += "#### Rubric Evaluation\n"
-            for g in r.get('grades', []):
-                if g.get('metric') == 'rubric_eval':
-                    
-                    if 'scores' in g and isinstance(g['scores'], dict):
-                        # Detailed table for dimensions
-                        md += "| Dimension | Score | Evidence/Reasoning |\n"
-                        md += "|-----------|-------|--------------------|\n"
-                        scores = g.get('scores', {})
-                        reasoning = g.get('reasoning', {})
-                        
-                        for dim, score in scores.items():
-                            reason = reasoning.get(dim, "-")
-                            md += f"| {dim} | {score} | {reason} |\n"
-                        
-                        md += f"\n**Total Score**: {g.get('total_score', '-')}\n"
-                    else:
-                        # Fallback for old simple score
-                        md += f"- **Score**: {g.get('score', '-')} ({g.get('result', '-')})\n"
-                        if 'reason' in g:
-                            md += f"  - Reason: {g['reason']}\n"
-            
-            # Transcript
-            md += "\n#### Transcript\n"
-            md += "```\n"
-            for line in r.get('transcript', []):
-                md += f"{line['speaker']}: {line['content']}\n"
-            md += "```\n\n"
-            md += "---\n"
-            
-        with open(output_file, 'w') as f:
-            f.write(md)
-            
-        print(f"Report generated at {output_file}")
+
+            f.write(f"| {sid} | {k} | {passes} | {pass_at_k} | {pass_caret_k} | {avg_score:.2f} |\n")
+
+        # Only the latest early-stopping sweep: earlier sweeps' runs would inflate the trials used
+        current = max((sw for data in scenario_stats.values() for sw in data.get("sweeps", {})), default=None)
+        early_stopped = {sid: data["sweeps"][current] for sid, data in scenario_stats.items()
+                         if current in data.get("sweeps", {})}
+        if early_stopped:
+            f.write("\n## Trial Consumption (Early Stopping)\n\n")
+            if current:
+                f.write(f"Sweep started {current}.\n\n")
+            f.write("| Scenario | Stop Policy | Trials Used | Trials Planned | Saved |\n")
+            f.write("|----------|-------------|-------------|----------------|-------|\n")
+            used_total, planned_total = 0, 0
+            for sid, data in sorted(early_stopped.items()):
+                used, planned = data["used"], max(data["planned"], data["used"])
+                used_total += used
+                planned_total += planned
+                f.write(f"| {sid} | {data['stop_policy']} | {used} | {planned} | {planned - used} |\n")
+            f.write(f"\n**Total**: {used_total} of {planned_total} planned trials run.\n")
+
+        if len({label for _, label in context_stats}) > 1:
+            f.write("\n## Context Strategy Comparison\n\n")
+            f.write("| Scenario | Context | Runs | Avg Score | Avg Prompt Tokens / Trial |\n")
+            f.write("|----------|---------|------|-----------|---------------------------|\n")
+            for (sid, label), ctx in sorted(context_stats.items()):
+                n = ctx["runs"]
+                f.write(f"| {sid} | {label} | {n} | {ctx['total_score'] / n:.2f} | {ctx['prompt_tokens'] / n:.0f} |\n")
+
+    @staticmethod
+    def _write_run_details(f: TextIO, r: Dict[str, Any], is_pass: bool):
+        scenario = r.get('scenario')
+        run_id = r.get('run_config', {}).get('run_id', '-')
+        timestamp = r.get('timestamp')
+
+        f.write(f"### Run: {scenario} (Run {run_id}, time: {timestamp})\n")
+        f.write(f"**Result**: {'PASS' if is_pass else 'FAIL'}\n")
+        tree = r.get('run_config', {}).get('tree')
+        if tree:
+            f.write(f"**Tree**: root {tree['root']}, branch {tree['path']} of {tree.get('leaves', '-')} leaves "
+                    "(turns before each fork are shared with sibling branches)\n")
+        early_stop = r.get('early_stop')
+        if early_stop:
+            judge = " (LLM judge skipped)" if early_stop.get('judge_skipped') else ""
+            f.write(f"**Stopped early**: turn {early_stop['turn'] + 1}, {early_stop['rule']} ('{early_stop['match']}'){judge}\n")
+
+        # Grades
+        f.write("#### Rubric Evaluation\n")
+        for g in r.get('grades', []):
+            if g.get('metric') == 'rubric_eval':
+
+                if 'scores' in g and isinstance(g['scores'], dict):
+                    # Detailed table for dimensions
+                    f.write("| Dimension | Score | Evidence/Reasoning |\n")
+                    f.write("|-----------|-------|--------------------|\n")
+                    scores = g.get('scores', {})
+                    reasoning = g.get('reasoning', {})
+
+                    for dim, score in scores.items():
+                        reason = reasoning.get(dim, "-")
+                        f.write(f"| {dim} | {score} | {reason} |\n")
+
+                    f.write(f"\n**Total Score**: {g.get('total_score', '-')}\n")
+                    if g.get('result') in ('PASS', 'FAIL'):
+                        failed = ", ".join(g.get('failed_dimensions') or []) or "none"
+                        f.write(f"**Rubric Result**: {g['result']} (below threshold: {failed})\n")
+                    if 'tier' in g:
+                        f.write(f"**Graded by**: {g['tier']}" + (f" ({g['escalation']})" if g.get('escalation') else "")
+                                + (f", {g['reason']}" if g.get('reason') else "") + "\n")
+                else:
+                    # Fallback for old simple score
+                    f.write(f"- **Score**: {g.get('score', '-')} ({g.get('result', '-')})\n")
+                    if 'reason' in g:
+                        f.write(f"  - Reason: {g['reason']}\n")
+
+        # Transcript
+        f.write("\n#### Transcript\n")
+        f.write("```\n")
+        for line in r.get('transcript', []):
+            f.write(f"{line['speaker']}: {line['content']}\n")
+            if line.get('violation'):
+                f.write(f"  ^ HARD FAIL: {line['violation']['rule']}\n")
+        f.write("```\n\n")
+        f.write("---\n")
 
 if __name__ == "__main__":
-    import sys
-    runs_dir = sys.argv[1] if len(sys.argv) > 1 else "evals/outputs/runs"
-    gen = ReportGenerator(runs_dir)
-    gen.generate_markdown("evals/report/report.md")
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate the Markdown eval report")
+    parser.add_argument("runs_dir", nargs="?", default="evals/outputs/runs", help="Run store: directory of run JSONs or a .db file")
+    parser.add_argument("--output", type=str, default="evals/report/report.md", help="Report file to write")
+    parser.add_argument("--split-details", action="store_true", help="Write detailed transcripts to per-scenario files")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples for the reliability intervals")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the reliability intervals")
+    parser.add_argument("--grade-set", type=str, default=None,
+                        help="Report a grade set written by evals.regrade ('latest' for each run's newest)")
+    args = parser.parse_args()
+    gen = ReportGenerator(args.runs_dir, split_details=args.split_details, bootstrap=args.bootstrap,
+                          confidence=args.confidence, grade_set=args.grade_set)
+    gen.generate_markdown(args.output)
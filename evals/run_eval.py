@@ -1,56 +1,523 @@
 import os
-import glob
 import sys
 import argparse
-from evals.runner import GameRunner
+import random
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+from evals.runner import GameRunner, TrialLog, trial_log_dir, HARD_FAIL_ACTIONS
+from evals.llm_cache import CACHE_MODES, configure_cache
+from evals.metrics import configure_span_export
+from evals.budget import BUDGET_UNITS, BudgetAllocator, format_confidence_table, load_history, rubric_range, \
+    stratified_temperatures
+from evals.events import configure_events, emit, events_path
+from evals.registry import ScenarioError, discover, load_scenario, load_scenarios
+from evals.graders.batch import BatchGradingStage
+from evals.graders.cascade import DEFAULT_AUDIT_RATE, DEFAULT_CONFIDENCE, configure_cascade, get_cascade
+from evals.graders.local_scorer import DEFAULT_MODEL_PATH
+from evals.pipeline import build_trial_pipeline
 from evals.report.make_report import ReportGenerator
+from evals.scheduler import STOP_POLICIES, AdaptiveScheduler, SequentialTest
+from evals.store import run_verdict, trial_key
+from evals.tree import leaf_count, make_runner, parse_branching
+from evals.work_queue import LeaseKeeper, WorkQueue, queue_path, worker_name
+
+
+DEFAULT_TRIALS = 5
+
+
+def parse_context(spec: str) -> Dict[str, Any]:
+    """Parse a --context override such as 'full', 'window:4' or 'summary:3'."""
+    strategy, _, turns = spec.partition(":")
+    context = {"strategy": strategy}
+    if turns:
+        context["window_turns"] = int(turns)
+    return context
+
+
+def build_plan(scenario_files: List[str], k: int, rng: random.Random,
+               context: Optional[Dict[str, Any]] = None, stop_policy: str = "none",
+               on_hard_fail: str = "continue", branching: Optional[Dict[str, int]] = None,
+               trials: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Draw every trial's run_config up front so the plan does not depend on execution order.
+    `trials` (scenario file -> count, from a budget allocation) replaces the fixed k and
+    spreads each scenario's temperatures evenly over the range.
+    """
+    plan = []
+    # Tells this sweep's early-stopped runs apart from earlier sweeps in the same store
+    sweep = time.strftime("%Y%m%d_%H%M%S")
+    for s_file in scenario_files:
+        k = trials.get(s_file, 0) if trials is not None else k
+        temperatures = stratified_temperatures(k, rng) if trials is not None else None
+        for i in range(k):
+            # Randomize temperature between 0.7 and 1.0 (or whatever range)
+            temperature = temperatures[i] if temperatures else 0.7 + (rng.random() * 0.3)
+            # Random seed
+            seed = rng.randint(0, 10000)
+
+            plan.append({
+                "scenario_file": s_file,
+                "run_config": {
+                    "run_id": i + 1,
+                    "temperature": temperature,
+                    "seed": seed
+                }
+            })
+            if context:
+                plan[-1]["run_config"]["context"] = context
+            if on_hard_fail != "continue":
+                plan[-1]["run_config"]["on_hard_fail"] = on_hard_fail
+            if branching:
+                # Each planned trial is the root of a conversation tree (see evals/tree.py)
+                plan[-1]["run_config"]["branching"] = branching
+            if stop_policy != "none":
+                # Lets the report show how many of the planned trials were actually used
+                plan[-1]["run_config"]["planned_trials"] = k
+                plan[-1]["run_config"]["stop_policy"] = stop_policy
+                plan[-1]["run_config"]["sweep"] = sweep
+    return plan
+
+
+def run_concurrent(plan: List[Dict[str, Any]], output_dir: str, concurrency: int, defer_llm_grading: bool = False):
+    log_dir = trial_log_dir(output_dir)
+    print_lock = threading.Lock()
+
+    def run_trial(trial):
+        name = os.path.splitext(os.path.basename(trial["scenario_file"]))[0]
+        run_id = trial["run_config"]["run_id"]
+        log = TrialLog(os.path.join(log_dir, f"{name}_run{run_id}.log"))
+        try:
+            runner = GameRunner(trial["scenario_file"], output_dir, run_config=trial["run_config"], log=log,
+                                defer_llm_grading=defer_llm_grading)
+            return runner.run(), log.path
+        finally:
+            log.close()
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(run_trial, t): t for t in plan}
+        for done, fut in enumerate(as_completed(futures), 1):
+            trial = futures[fut]
+            label = f"{os.path.basename(trial['scenario_file'])} run {trial['run_config']['run_id']}"
+            try:
+                result_path, log_path = fut.result()
+                msg = f"[{done}/{len(plan)}] {label} -> {result_path} (log: {log_path})"
+            except Exception as e:
+                failed += 1
+                msg = f"[{done}/{len(plan)}] {label} FAILED: {e}"
+            with print_lock:
+                print(msg)
+
+    if failed:
+        print(f"{failed} trial(s) failed.")
+
+
+def run_queue(queue: WorkQueue, output_dir: str, concurrency: int = 1, defer_llm_grading: bool = False,
+              worker: Optional[str] = None, quiet: bool = False) -> Dict[str, int]:
+    """
+    Claim trials from the work queue until none are left, running up to
+    `concurrency` at a time. Each finished trial is marked done only after its
+    result is saved; a failed one goes back to the queue for another attempt.
+    On Ctrl-C this worker's unfinished trials are released for the next run.
+    With `quiet`, trial output goes to per-trial logs even when sequential.
+    Under a queue budget, each trial's actual calls or tokens are charged to
+    it, and no new trial is claimed once it is spent.
+    """
+    worker = worker or worker_name()
+    budget = queue.budget()
+    log_dir = trial_log_dir(output_dir)
+    print_lock = threading.Lock()
+    stop = threading.Event()
+    counts = {"done": 0, "failed": 0, "lost": 0}
+
+    def work():
+        while not stop.is_set():
+            trial = queue.claim(worker)
+            if trial is None:
+                return
+            name = os.path.splitext(os.path.basename(trial["scenario_file"]))[0]
+            label = f"{name} run {trial['run_config']['run_id']}"
+            log = TrialLog(os.path.join(log_dir, f"{name}_run{trial['run_config']['run_id']}.log")) \
+                if concurrency > 1 or quiet else None
+            runner = None
+            try:
+                runner = make_runner(trial["scenario_file"], output_dir, trial["run_config"], log=log,
+                                     defer_llm_grading=defer_llm_grading)
+                location = runner.run()
+                if isinstance(location, list):
+                    location = f"{len(location)} leaves in {output_dir}"
+                outcome, msg = "done", f"{label} -> {location}" + (f" (log: {log.path})" if log else "")
+                if not queue.complete(trial["key"], worker, location):
+                    # The lease lapsed and another worker took the trial over; its run decides the trial
+                    outcome, msg = "lost", f"{label} finished after its lease passed to another worker; not marked done"
+            except Exception as e:
+                queue.fail(trial["key"], worker, str(e))
+                emit("trial_failed", trial_key=trial["key"], scenario=name, run_id=trial['run_config']['run_id'],
+                     error=str(e), attempt=trial['attempt'])
+                outcome, msg = "failed", f"{label} FAILED (attempt {trial['attempt']}): {e}"
+            finally:
+                if log:
+                    log.close()
+                if budget and runner is not None:
+                    # A failed trial's calls were spent all the same
+                    summary = runner.metrics.summary()
+                    queue.charge(summary["calls"] if budget["unit"] == "calls"
+                                 else summary["prompt_tokens"] + summary["completion_tokens"])
+            with print_lock:
+                counts[outcome] += 1
+                if log or outcome != "done":
+                    print(msg)
+
+    with LeaseKeeper(queue, worker):
+        try:
+            if concurrency > 1:
+                threads = [threading.Thread(target=work, daemon=True) for _ in range(concurrency)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    # Timed joins keep the main thread responsive to Ctrl-C
+                    while t.is_alive():
+                        t.join(0.5)
+            else:
+                work()
+        except KeyboardInterrupt:
+            stop.set()
+            released = queue.release(worker)
+            print(f"Interrupted; released {released} unfinished trial(s). Resume with --resume.")
+            raise
+    return counts
+
+
+def drain_queue(queue: WorkQueue, output_dir: str, concurrency: int, defer_llm_grading: bool = False,
+                poll_seconds: float = 5.0, quiet: bool = False):
+    """Work the queue, then wait for trials leased by other workers (reclaiming any whose lease expires)."""
+    waiting_reported = False
+    while True:
+        run_queue(queue, output_dir, concurrency, defer_llm_grading=defer_llm_grading, quiet=quiet)
+        if queue.release_orphans():
+            continue
+        counts = queue.counts()
+        if not counts["leased"]:
+            break
+        if not waiting_reported:
+            print(f"Waiting for {counts['leased']} trial(s) running on other workers...")
+            waiting_reported = True
+        time.sleep(poll_seconds)
+    print_queue_status(queue)
+
+
+def print_queue_status(queue: WorkQueue):
+    counts = queue.counts()
+    print(f"Queue {queue.path}: {counts['done']}/{counts['total']} done, {counts['pending']} pending, "
+          f"{counts['leased']} running, {counts['failed']} failed")
+    budget = queue.budget()
+    if budget and budget["spent"] >= budget["limit"] and counts["pending"]:
+        print(f"  Budget of {budget['limit']:,.0f} {budget['unit']} spent ({budget['spent']:,.0f}); "
+              f"{counts['pending']} planned trial(s) not started.")
+    for f in queue.failures():
+        print(f"  FAILED {f['key']} after {f['attempts']} attempt(s): {f['error']}")
+
+
+def worker_command(args, queue_file: str) -> List[str]:
+    """Command line for a worker process that pulls from the same queue with the same settings."""
+    cmd = [sys.executable, "-m", "evals.run_eval", "--worker", "--queue", queue_file,
+           "--output", args.output, "--concurrency", str(args.concurrency), "--grading", args.grading,
+           "--lease-seconds", str(args.lease_seconds), "--max-attempts", str(args.max_attempts),
+           "--cache", args.cache, "--cache-path", args.cache_path, "--judge", args.judge,
+           "--local-model", args.local_model, "--cascade-confidence", str(args.cascade_confidence),
+           "--cascade-audit", str(args.cascade_audit), "--events", args.events or events_path(args.output)]
+    if args.quiet:
+        cmd.append("--quiet")
+    if args.otel_export:
+        cmd += ["--otel-export", args.otel_export]
+    return cmd
+
+
+def run_adaptive(plan: List[Dict[str, Any]], output_dir: str, concurrency: int, policy: str,
+                 test: SequentialTest, defer_llm_grading: bool = False, quiet: bool = False):
+    log_dir = trial_log_dir(output_dir)
+
+    def run_trial(trial):
+        log = None
+        if concurrency > 1 or quiet:
+            name = os.path.splitext(os.path.basename(trial["scenario_file"]))[0]
+            log = TrialLog(os.path.join(log_dir, f"{name}_run{trial['run_config']['run_id']}.log"))
+        try:
+            runner = GameRunner(trial["scenario_file"], output_dir, run_config=trial["run_config"], log=log,
+                                defer_llm_grading=defer_llm_grading)
+            runner.run()
+            return run_verdict(runner.result)[0]
+        finally:
+            if log:
+                log.close()
+
+    status = AdaptiveScheduler(plan, run_trial, policy=policy, concurrency=concurrency, test=test).run()
+    used = sum(st["used"] for st in status.values())
+    planned = sum(st["planned"] for st in status.values())
+    print(f"Early stopping ({policy}): ran {used}/{planned} planned trials.")
+
+
+def parse_stage_workers(spec: str) -> Dict[str, int]:
+    """Parse --stage-workers such as 'generate=8,llm-grade=4'."""
+    workers = {}
+    for part in filter(None, spec.split(",")):
+        name, _, count = part.partition("=")
+        workers[name.strip()] = int(count)
+    return workers
+
+
+def print_pipeline_metrics(metrics: Dict[str, Any]):
+    print(f"Pipeline finished in {metrics['wall_seconds']:.1f}s")
+    print(f"{'stage':<14}{'workers':>8}{'done':>7}{'errors':>7}{'items/s':>9}{'util':>7}{'q avg':>7}{'q max':>7}")
+    for name, m in metrics["stages"].items():
+        print(f"{name:<14}{m['workers']:>8}{m['processed']:>7}{m['errors']:>7}{m['throughput_per_s']:>9.2f}"
+              f"{m['utilization']:>7.0%}{m['queue_depth_avg']:>7.1f}{m['queue_depth_max']:>7}")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Run AI NPC Evals")
     parser.add_argument("--scenarios", type=str, default="evals/scenarios", help="Directory containing scenario YAMLs")
     parser.add_argument("--output", type=str, default="evals/outputs/runs", help="Directory to save run outputs")
     parser.add_argument("--report-dir", type=str, default="evals/reports", help="Directory to save final report")
-    
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of trials to run in parallel (1 = sequential)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the trial plan (temperatures and seeds)")
+    parser.add_argument("--trials", type=int, default=None,
+                        help=f"Number of trials (k) planned per scenario (default {DEFAULT_TRIALS}; with "
+                             "--stop-policy confidence, at least enough to reach a 'reliable' verdict)")
+    parser.add_argument("--stop-policy", choices=STOP_POLICIES, default="none",
+                        help="Stop a scenario's trials once its verdict is decided: pass_caret_k stops at the first "
+                             "failure, pass_at_k at the first pass, confidence uses a sequential test on the pass rate")
+    parser.add_argument("--target-pass-rate", type=float, default=0.8, help="Pass rate the confidence policy tests against")
+    parser.add_argument("--confidence", type=float, default=0.9,
+                        help="Confidence level of the sequential test and of the --budget confidence report")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Spend this many LLM calls (or tokens, see --budget-unit) instead of --trials per scenario, "
+                             "giving more trials to scenarios whose stored runs leave the pass rate and score least certain")
+    parser.add_argument("--budget-unit", choices=BUDGET_UNITS, default="calls", help="Unit of --budget")
+    parser.add_argument("--min-trials", type=int, default=2, help="Trials every scenario gets under --budget")
+    parser.add_argument("--max-trials", type=int, default=None, help="Cap on one scenario's trials under --budget")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run trials through a staged generate/rule-check/llm-grade/persist/report pipeline")
+    parser.add_argument("--stage-workers", type=str, default="generate=4,llm-grade=2",
+                        help="Workers per pipeline stage, e.g. 'generate=8,rule-check=1,llm-grade=4,persist=1'")
+    parser.add_argument("--queue-size", type=int, default=8, help="Capacity of each bounded queue between pipeline stages")
+    parser.add_argument("--grading", choices=["inline", "deferred"], default="inline",
+                        help="inline: judge each trial as it finishes; deferred: batch-grade after the conversations")
+    parser.add_argument("--grade-workers", type=int, default=2, help="Concurrent judge requests in deferred grading")
+    parser.add_argument("--grade-batch-size", type=int, default=4, help="Max transcripts per judge request in deferred grading")
+    parser.add_argument("--judge", choices=["cascade", "always"], default="cascade",
+                        help="cascade: call the LLM judge only for runs the rule checks and the local scorer cannot "
+                             "settle; always: judge every run")
+    parser.add_argument("--local-model", type=str, default=DEFAULT_MODEL_PATH,
+                        help="Trained local scorer for the cascade (python -m evals.graders.local_scorer)")
+    parser.add_argument("--cascade-confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help="Local predictions below this confidence go to the judge")
+    parser.add_argument("--cascade-audit", type=float, default=DEFAULT_AUDIT_RATE,
+                        help="Fraction of confidently scored runs sent to the judge anyway to measure agreement")
+    parser.add_argument("--on-hard-fail", choices=HARD_FAIL_ACTIONS, default="continue",
+                        help="When an NPC reply breaks a constraints.hard_fail rule: play all turns (continue, "
+                             "default), stop the conversation (stop), or also skip the LLM judge (stop-skip-judge)")
+    parser.add_argument("--tree", type=str, default=None,
+                        help="Run each trial as a conversation tree forking the NPC reply at given turns, "
+                             "e.g. '1:4,3:2' (4 branches at turn 1, each forking 2 ways at turn 3)")
+    parser.add_argument("--context", type=str, default=None,
+                        help="Override every scenario's context strategy: full, window:N or summary:N")
+    parser.add_argument("--cache", choices=CACHE_MODES, default="off",
+                        help="LLM response cache mode; 'replay' fails on any cache miss")
+    parser.add_argument("--cache-path", type=str, default="evals/outputs/llm_cache.sqlite", help="SQLite file for the LLM cache")
+    parser.add_argument("--cache-max-entries", type=int, default=0, help="Evict least-recently-used entries beyond this count (0 = no limit)")
+    parser.add_argument("--cache-max-mb", type=float, default=0, help="Evict least-recently-used entries beyond this size (0 = no limit)")
+    parser.add_argument("--cache-max-age-days", type=float, default=0, help="Evict entries older than this (0 = never)")
+    parser.add_argument("--otel-export", type=str, default=None,
+                        help="Append each trial's LLM calls as OpenTelemetry (OTLP/JSON) spans to this JSONL file")
+    parser.add_argument("--events", type=str, default=None,
+                        help="JSONL file for the live event stream (default: events.jsonl in/next to --output; "
+                             "'off' to disable); watch it with python -m evals.live_server")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Write each trial's turn-by-turn output to its log file and print one line per trial")
+    parser.add_argument("--dry-run", action="store_true", help="Validate the scenarios and print the trial plan without running it")
+    parser.add_argument("--queue", type=str, default=None,
+                        help="Work queue file holding the trial plan (default: queue.sqlite in/next to --output)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the sweep already in the queue, skipping finished trials, instead of planning a new one")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes pulling from the queue, each running --concurrency trials")
+    parser.add_argument("--worker", action="store_true",
+                        help="Only work an existing queue (e.g. on another machine sharing the filesystem); no grading or report")
+    parser.add_argument("--lease-seconds", type=float, default=600,
+                        help="A claimed trial is handed to another worker if its worker stops renewing for this long")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per trial before it is marked failed")
+    parser.add_argument("--report-only", action="store_true", help="Only regenerate the report from the runs in --output")
+
     args = parser.parse_args()
-    
-    # Discovery
-    # Discovery
-    if os.path.isfile(args.scenarios):
-        scenario_files = [args.scenarios]
-    else:
-        scenario_files = glob.glob(os.path.join(args.scenarios, "*.yaml"))
-    
-    if not scenario_files:
-        print(f"No scenarios found in {args.scenarios}")
+
+    report_file = os.path.join(args.report_dir, "latest_report.md")
+    if args.report_only:
+        os.makedirs(args.report_dir, exist_ok=True)
+        ReportGenerator(args.output).generate_markdown(report_file)
         return
 
-    print(f"Found {len(scenario_files)} scenarios.")
-    
-    # Execution
-    # Execution
-    K = 5  # Number of trials
-    import random
-    
-    for s_file in scenario_files:
-        for i in range(K):
-            # Randomize temperature between 0.7 and 1.0 (or whatever range)
-            temperature = 0.7 + (random.random() * 0.3)
-            # Random seed
-            seed = random.randint(0, 10000)
-            
-            run_config = {
-                "run_id": i + 1,
-                "temperature": temperature,
-                "seed": seed
-            }
-            
-            runner = GameRunner(s_file, args.output, run_config=run_config)
-            runner.run()
-        
+    if args.stop_policy != "none" and args.pipeline:
+        parser.error("--stop-policy schedules trials one at a time per scenario and cannot be combined with --pipeline")
+    use_queue = args.stop_policy == "none" and not args.pipeline
+    if (args.resume or args.worker) and not use_queue:
+        parser.error("--resume/--worker work on the trial queue and cannot be combined with --stop-policy or --pipeline")
+    try:
+        branching = parse_branching(args.tree) if args.tree else None
+    except ValueError as e:
+        parser.error(f"--tree: {e}")
+    if branching and not use_queue:
+        parser.error("--tree cannot be combined with --stop-policy or --pipeline")
+    if args.budget is not None and (branching or args.resume or args.worker or not use_queue):
+        parser.error("--budget plans and meters a new queued sweep of single trials; it cannot be combined with "
+                     "--tree, --resume, --worker, --stop-policy or --pipeline")
+    queue_file = args.queue or queue_path(args.output)
+
+    plan = []
+    if not (args.resume or args.worker):
+        # Discovery: every scenario is parsed and validated before any trial starts
+        scenario_files = discover(args.scenarios)
+        if not scenario_files:
+            print(f"No scenarios found in {args.scenarios}")
+            return
+        try:
+            scenarios = load_scenarios(scenario_files)
+        except ScenarioError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+        print(f"Found {len(scenario_files)} scenarios.")
+
+        # Execution
+        K = args.trials or DEFAULT_TRIALS  # Number of trials
+        if args.stop_policy == "confidence":
+            needed = SequentialTest(target=args.target_pass_rate, confidence=args.confidence).trials_to_decide()
+            if args.trials is None:
+                K = max(K, needed)
+            elif K < needed:
+                print(f"Warning: the sequential test needs at least {needed} trials to call a scenario reliable; "
+                      f"with --trials {K} it can only stop on unreliable ones.")
+        context = parse_context(args.context) if args.context else None
+        allocation = None
+        if args.budget is not None:
+            # Stored runs tell how uncertain each scenario still is and what its trials cost
+            history = load_history(args.output, {s.scenario_id: rubric_range(s.config) for s in scenarios})
+            allocator = BudgetAllocator(history, args.budget, unit=args.budget_unit,
+                                        min_trials=args.min_trials, max_trials=args.max_trials)
+            by_id, _, estimate = allocator.allocate({s.scenario_id: s.config.get('max_turns', 8) for s in scenarios})
+            allocation = {f: by_id[s.scenario_id] for f, s in zip(scenario_files, scenarios)}
+            print(f"Budget {args.budget:,.0f} {args.budget_unit}: {sum(by_id.values())} trials, "
+                  f"estimated {estimate:,.0f} {args.budget_unit}. Projected confidence:")
+            print("\n".join(format_confidence_table(history, list(by_id), args.confidence, args.target_pass_rate,
+                                                    new_trials=by_id)))
+        plan = build_plan(scenario_files, K, random.Random(args.seed), context=context, stop_policy=args.stop_policy,
+                          on_hard_fail=args.on_hard_fail, branching=branching, trials=allocation)
+        if not plan:
+            print("The budget does not cover a single trial.")
+            return
+
+        if args.dry_run:
+            leaves = 0
+            for s_file, s in zip(scenario_files, scenarios):
+                k = allocation[s_file] if allocation is not None else K
+                max_turns = s.config.get('max_turns', 8)
+                per_trial = leaf_count(branching, max_turns) if branching else 1
+                leaves += k * per_trial
+                shape = f"{k} trees x {per_trial} leaves" if branching else f"{k} trials"
+                print(f"  {s.scenario_id:<28} {shape} x {max_turns} turns  ({os.path.basename(s.path)})")
+            print(f"Dry run: {len(plan)} trials planned" + (f" ({leaves} tree leaves)" if branching else "")
+                  + ", nothing executed.")
+            return
+
+    cache = configure_cache(args.cache, args.cache_path,
+                            max_entries=args.cache_max_entries,
+                            max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                            max_age_days=args.cache_max_age_days)
+
+    configure_span_export(args.otel_export)
+    if args.events != "off":
+        configure_events(args.events or events_path(args.output))
+    if args.judge == "cascade":
+        configure_cascade(args.local_model, confidence=args.cascade_confidence, audit_rate=args.cascade_audit)
+
+    defer = args.grading == "deferred"
+    if use_queue:
+        queue = WorkQueue(queue_file, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+        if args.worker:
+            try:
+                counts = run_queue(queue, args.output, args.concurrency, defer_llm_grading=defer, quiet=args.quiet)
+            except KeyboardInterrupt:
+                sys.exit(130)
+            print(f"Worker {worker_name()} finished: {counts['done']} done, {counts['failed']} failed.")
+            return
+        if args.resume:
+            before = queue.counts()
+            if not before["total"]:
+                print(f"Nothing to resume: {queue_file} holds no trials.")
+                return
+            print(f"Resuming {queue_file}: {before['done']}/{before['total']} trials already done.")
+            orphans = queue.release_orphans()
+            if orphans:
+                print(f"Released {orphans} trial(s) left leased by processes that are no longer running.")
+        else:
+            for trial in plan:
+                trial["key"] = trial_key(load_scenario(trial["scenario_file"]).scenario_id, trial["run_config"])
+            # A new sweep replaces the previous one; its finished results stay in the store
+            queue.enqueue(plan, reset=True)
+            if args.budget is not None:
+                queue.set_budget(args.budget, args.budget_unit)
+            print(f"Queued {len(plan)} trials in {queue_file}.")
+
+    os.makedirs(args.report_dir, exist_ok=True)
+    emit("sweep_started", trials=queue.counts()["total"] if use_queue else len(plan), output=args.output,
+         concurrency=args.concurrency, workers=args.workers)
+    if args.stop_policy != "none":
+        test = SequentialTest(target=args.target_pass_rate, confidence=args.confidence)
+        run_adaptive(plan, args.output, args.concurrency, args.stop_policy, test, defer_llm_grading=defer,
+                     quiet=args.quiet)
+    elif args.pipeline:
+        pipeline = build_trial_pipeline(args.output, parse_stage_workers(args.stage_workers),
+                                        queue_size=args.queue_size, report_file=report_file,
+                                        defer_llm_grading=defer)
+        print_pipeline_metrics(pipeline.run(plan))
+    else:
+        workers = []
+        if args.workers > 1:
+            print(f"Starting {args.workers - 1} extra worker process(es), {args.concurrency} trial(s) each.")
+            workers = [subprocess.Popen(worker_command(args, queue_file)) for _ in range(args.workers - 1)]
+        elif args.concurrency > 1:
+            print(f"Running trials with concurrency {args.concurrency}.")
+        try:
+            drain_queue(queue, args.output, args.concurrency, defer_llm_grading=defer, quiet=args.quiet)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        finally:
+            for w in workers:
+                w.wait()
+
+    if defer:
+        stage = BatchGradingStage(args.output, workers=args.grade_workers, max_batch=args.grade_batch_size,
+                                  cascade=get_cascade())
+        stats = stage.run()
+        print(f"Graded {stats['runs']} runs with {stats['judge_requests']} judge requests.")
+
+    if cache:
+        print(f"LLM cache ({cache.mode}): {cache.stats()}")
+    emit("sweep_finished", **(queue.counts() if use_queue else {}))
+
+    if args.budget is not None:
+        after = load_history(args.output, {sid: h.score_range for sid, h in history.items()})
+        spent = sum(getattr(after[sid], args.budget_unit) - getattr(history[sid], args.budget_unit) for sid in by_id)
+        print(f"Spent {spent:,} of {args.budget:,.0f} {args.budget_unit} budget. Achieved confidence:")
+        new_runs = {sid: after[sid].n - history[sid].n for sid in by_id}
+        print("\n".join(format_confidence_table(after, list(by_id), args.confidence, args.target_pass_rate,
+                                                new_trials=new_runs, project=False)))
+
     # Reporting
     print("Generating report...")
-    os.makedirs(args.report_dir, exist_ok=True)
-    report_file = os.path.join(args.report_dir, "latest_report.md")
     gen = ReportGenerator(args.output)
     gen.generate_markdown(report_file)
     print("Done!")
@@ -1,144 +1,266 @@
-import json
-import yaml
 import os
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional, Union
 from evals.agents.npc import NPCAgent
 from evals.agents.player_sim import PlayerSimulator
+from evals.store import open_store, run_verdict, sidecar_path, trial_key
+from evals.metrics import CallMetrics, get_span_exporter
+from evals.graders.rules import compile_rules
+from evals.registry import Scenario, load_scenario
+from evals.journal import TrialJournal, journal_dir, restore_agent
+from evals import events
+
+# What to do when an NPC reply hits a hard-fail rule mid-conversation
+HARD_FAIL_ACTIONS = ("continue", "stop", "stop-skip-judge")
+
+def trial_log_dir(output_dir: str) -> str:
+    """Where per-trial logs go for a run store location."""
+    return sidecar_path(output_dir, "logs")
+
+
+class TrialLog:
+    """Per-trial logger used in concurrent mode.
+
+    Lines are written to the trial's own log file so that output from
+    parallel trials never interleaves on the console.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._fd = open(path, 'w', encoding='utf-8')
+
+    def __call__(self, msg: str):
+        self._fd.write(f"{msg}\n")
+        self._fd.flush()
+
+    def close(self):
+        self._fd.close()
+
 
 class GameRunner:
-    def __init__(self, scenario_path: str, output_dir: str, run_config: Dict[str, Any] = None):
-        with open(scenario_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, scenario_path: Union[str, Scenario], output_dir: str, run_config: Dict[str, Any] = None,
+                 log: Optional[Callable[[str], None]] = None, defer_llm_grading: bool = False,
+                 journal: bool = True):
+        # Parsed, validated and prompt-compiled once per file content (see evals/registry.py)
+        self.scenario = scenario_path if isinstance(scenario_path, Scenario) else load_scenario(scenario_path)
+        self.config = self.scenario.config
         self.output_dir = output_dir
         self.run_config = run_config or {}
         self.transcript = []
+        self.context_stats = None
+        self.result: Optional[Dict[str, Any]] = None
+        # All console output goes through self.log so concurrent trials can be
+        # redirected to their own log instead of interleaving on stdout.
+        self.log = log or print
+        # When deferred, the LLM judge is left to the batched grading stage (evals/grade_runs.py)
+        self.defer_llm_grading = defer_llm_grading
+        # Latency / tokens / cost of every LLM call made for this trial
+        self.metrics = CallMetrics(self.config.get('scenario_id', 'unknown'), self.run_config.get('run_id'))
+        # Set when the conversation was cut short by a hard-fail rule: turn, rule, match, judge_skipped
+        self.early_stop: Optional[Dict[str, Any]] = None
+        self.trial_key = trial_key(self.config.get('scenario_id', 'unknown'), self.run_config)
+        # Identity in the live event stream; the branches of a conversation tree report as their tree
+        self.event_key = self.trial_key
+        # Per-turn journal: an interrupted trial resumes from its last completed turn
+        self.journal = TrialJournal(os.path.join(journal_dir(output_dir), f"{self.trial_key}.jsonl")) if journal else None
         
+    def emit(self, event_type: str, **fields):
+        """Add an event for this trial to the live event stream (evals/events.py)."""
+        events.emit(event_type, trial_key=self.event_key, scenario=self.config.get('scenario_id', 'unknown'),
+                    run_id=self.run_config.get('run_id'), **fields)
+
     def run(self):
+        self.play()
+        grades = self.grade_rules()
+        llm_grade = self.grade_llm(grades)
+        if llm_grade is not None:
+            grades.append(llm_grade)
+        return self._save_results(grades)
+
+    def play(self):
+        """Play the conversation; fills self.transcript."""
+        try:
+            return self._play()
+        finally:
+            if self.journal:
+                self.journal.close()
+
+    def _play(self):
         scenario_id = self.config.get('scenario_id', 'unknown_scenario')
         run_id = self.run_config.get('run_id', '0')
-        print(f"Starting scenario: {scenario_id} (Run {run_id})")
-        temperature = self.run_config.get('temperature', 0.7)
+        self.log(f"Starting scenario: {scenario_id} (Run {run_id})")
         seed = self.run_config.get('seed', None)
-        
-        # Construct NPC System Prompt
+        npc, player = self.make_agents()
+        max_turns = self.config.get('max_turns', 8)
+        rules = self.hard_fail_rules()
+
+        last_response = None
+        start_turn = 0
+        finished = False
+        if self.journal:
+            header = {"trial_key": self.trial_key, "content_hash": self.scenario.content_hash, "run_config": self.run_config}
+            state = self.journal.resume(header)
+            if state:
+                self.transcript = state["transcript"]
+                restore_agent(npc, state["npc"])
+                restore_agent(player, state["player"])
+                self.metrics.extend(state["calls"])
+                self.early_stop = state["early_stop"]
+                start_turn = state["next_turn"]
+                finished = state["finished"] or bool(self.early_stop)
+                last_response = self.transcript[-1]["content"] if self.transcript else None
+                self.log(f"Resuming from journal after turn {start_turn} ({len(state['calls'])} LLM calls reused)")
+            self.journal.open(header, state, npc, player, self.metrics)
+        self.emit("trial_started", temperature=self.run_config.get('temperature', 0.7), max_turns=max_turns,
+                  resumed_turns=start_turn, lines=self.transcript)
+
+        for turn in range(start_turn, max_turns):
+            if finished:
+                break
+            self.log(f"--- Turn {turn+1} ---")
+            self.metrics.turn = turn
+            player_msg = self.player_move(turn, player, last_response, seed)
+            npc_response = self.npc_move(turn, npc, player_msg, seed, rules)
+            if self.journal:
+                self.journal.turn(turn, self.transcript[-2:], npc, player, self.metrics, self.early_stop)
+            if self.early_stop:
+                break
+            last_response = npc_response
+
+        self.metrics.turn = None
+        if self.journal and not finished:
+            self.journal.finish()
+        self.context_stats = {"npc": npc.context.stats(), "player": player.context.stats()}
+        return self.transcript
+
+    def make_agents(self):
+        """NPC and player agents for this trial, reporting their calls to self.metrics."""
         npc_profile = self.config.get('npc_profile', {})
-        style_rules = npc_profile.get('style_rules', {})
-        must_have = style_rules.get('must_have', [])
-        must_not = style_rules.get('must_not', [])
-        constraints = self.config.get('constraints', {}).get('hard_fail', [])
-        
-        npc_system_prompt = (
-            f"You are {npc_profile.get('name', 'NPC')}, a {npc_profile.get('archetype', 'character')}.\n"
-            f"Style Rules:\n"
-            f"- Must have: {', '.join(must_have)}\n"
-            f"- Must not: {', '.join(must_not)}\n"
-            f"Constraints: {', '.join(constraints)}\n"
-            f"You are interacting with a Hunter (Player)."
-        )
-        
+        # Context strategy: scenario YAML `context:` block, optionally overridden per run
+        context_config = self.run_config.get('context') or self.config.get('context')
+
         npc = NPCAgent(
             name=npc_profile.get('name', 'NPC'),
-            system_prompt=npc_system_prompt
-        )
-        
-        # Construct Player Simulator System Prompt
-        player_persona = self.config.get('player_persona', {})
-        goal = self.config.get('goal', '')
-        seed_dialogue = self.config.get('seed_dialogue', '')
-        
-        traits = player_persona.get('traits', [])
-        traits_str = f"Traits: {', '.join(traits)}\n" if traits else ""
-        
-        player_system_prompt = (
-            f"You are a Monster Hunter player.\n"
-            f"Tone: {player_persona.get('tone', 'neutral')}\n"
-            f"{traits_str}"
-            f"Goal: {goal}\n"
-            f"Your first line was: \"{seed_dialogue}\"\n"
-            f"IMPORTANT: You must think before you speak. Use the following format for every response:\n"
-            f"[THOUGHTS]\n"
-            f"Your internal monologue, strategy, and reaction to the NPC.\n"
-            f"[/THOUGHTS]\n"
-            f"[ACTION]\n"
-            f"Your actual spoken dialogue to the NPC."
+            system_prompt=self.scenario.npc_prompt,
+            context=context_config,
+            metrics=self.metrics
         )
         
         player = PlayerSimulator(
-            system_prompt=player_system_prompt
+            system_prompt=self.scenario.player_prompt,
+            log=self.log,
+            context=context_config,
+            metrics=self.metrics
         )
+        return npc, player
+
+    def hard_fail_rules(self):
+        """Compiled rules checked on every NPC reply, or None when hard fails do not stop the conversation."""
+        on_hard_fail = self.run_config.get('on_hard_fail', 'continue')
+        return compile_rules(self.config) if on_hard_fail != "continue" else None
+
+    def player_move(self, turn: int, player: PlayerSimulator, last_response: Optional[str], seed: Optional[int]) -> str:
+        seed_dialogue = self.config.get('seed_dialogue', '')
+        if turn == 0 and seed_dialogue:
+            player_msg = seed_dialogue
+            # Manually inject into player history so it knows it said this
+            player.history.append({"role": "assistant", "content": player_msg})
+        else:
+            player_msg = player.next_action(last_response, temperature=self.run_config.get('temperature', 0.7), seed=seed)
         
-        max_turns = self.config.get('max_turns', 8)
-        
-        last_response = None
-        
-        for turn in range(max_turns):
-            print(f"--- Turn {turn+1} ---")
-            
-            # Handle Player Turn
-            if turn == 0 and seed_dialogue:
-                player_msg = seed_dialogue
-                # Manually inject into player history so it knows it said this
-                player.history.append({"role": "assistant", "content": player_msg})
-            else:
-                player_msg = player.next_action(last_response, temperature=temperature, seed=seed)
-            
-            self.transcript.append({
-                "turn": turn,
-                "speaker": "Player",
-                "content": player_msg
-            })
-            print(f"Player: {player_msg}")
-            
-            # NPC Turn
-            npc_response = npc.reply(player_msg, temperature=temperature, seed=seed)
-            self.transcript.append({
-                "turn": turn,
-                "speaker": "NPC",
-                "content": npc_response
-            })
-            print(f"NPC: {npc_response}")
-            
-            last_response = npc_response
-            
-        # Grading
-        print("Running graders...")
-        grades = []
-        
-        # Rule-based
+        self.transcript.append({
+            "turn": turn,
+            "speaker": "Player",
+            "content": player_msg
+        })
+        self.log(f"Player: {player_msg}")
+        return player_msg
+
+    def npc_move(self, turn: int, npc: NPCAgent, player_msg: str, seed: Optional[int], rules) -> str:
+        """The NPC's reply; sets self.early_stop when it breaks a constraints.hard_fail rule."""
+        npc_response = npc.reply(player_msg, temperature=self.run_config.get('temperature', 0.7), seed=seed)
+        self.transcript.append({
+            "turn": turn,
+            "speaker": "NPC",
+            "content": npc_response
+        })
+        self.log(f"NPC: {npc_response}")
+
+        violation = rules.check_hard_fail(npc_response) if rules else None
+        if violation:
+            self.transcript[-1]["violation"] = {"rule": violation["rule"], "match": violation["match"]}
+            self.early_stop = {"turn": turn, "rule": violation["rule"], "match": violation["match"],
+                               "judge_skipped": self.run_config.get('on_hard_fail') == "stop-skip-judge"}
+            self.log(f"Hard fail at turn {turn + 1}: {violation['rule']} ('{violation['match']}'), stopping.")
+        self.emit("turn", turn=turn, lines=self.transcript[-2:], early_stop=self.early_stop)
+        return npc_response
+
+    def grade_rules(self) -> List[Dict]:
+        self.log("Running graders...")
         from evals.graders.rules import RuleGrader
-        grades.append(RuleGrader.check_max_length(self.transcript))
-        
-        # LLM-based
+        return RuleGrader.grade(self.transcript, self.config)
+
+    def grade_llm(self, rule_grades: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        The rubric grade. With a grading cascade configured (evals/graders/cascade.py)
+        the judge is only called for runs the rules and the local scorer cannot settle;
+        when deferred, those are left to the batched grading stage.
+        """
         # New schema has 'rubric' at top level
-        if 'rubric' in self.config:
-            from evals.graders.rubric_llm import LLMGrader
-            llm_grader = LLMGrader()
-            grades.append(llm_grader.grade(self.transcript, self.config['rubric']))
-            
-        self._save_results(grades)
-        
+        if 'rubric' not in self.config:
+            return None
+        if self.early_stop and self.early_stop["judge_skipped"]:
+            return None
+        from evals.graders.rubric_llm import LLMGrader
+        from evals.graders.cascade import get_cascade
+        cascade = get_cascade()
+        if cascade is None:
+            if self.defer_llm_grading:
+                return None
+            return LLMGrader(metrics=self.metrics, log=self.log).grade(self.transcript, self.config['rubric'],
+                                                                      dimensions_text=self.scenario.rubric_text)
+        grade, info = cascade.triage(self.transcript, self.config, rule_grades or [], self.trial_key)
+        if grade is not None or self.defer_llm_grading:
+            return grade
+        judge_grade = LLMGrader(metrics=self.metrics, log=self.log).grade(self.transcript, self.config['rubric'],
+                                                                          dimensions_text=self.scenario.rubric_text)
+        return cascade.annotate(judge_grade, info)
+
     def _save_results(self, grades: List[Dict]):
-        os.makedirs(self.output_dir, exist_ok=True)
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         scenario_id = self.config.get('scenario_id', 'unknown')
-        run_id = self.run_config.get('run_id', '0')
-        filename = f"{scenario_id}_run{run_id}_{timestamp}.json"
-        filepath = os.path.join(self.output_dir, filename)
-        
+
+        # timestamp and trial_key come first so stores can order runs without parsing them
         result = {
             "scenario": scenario_id,
+            "timestamp": timestamp,
+            "trial_key": self.trial_key,
             "config": self.config,
             "run_config": self.run_config,
             "transcript": self.transcript,
             "grades": grades,
-            "timestamp": timestamp
+            "context": self.context_stats,
+            "metrics": self.metrics.to_dict(),
+            "early_stop": self.early_stop
         }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-            
-        print(f"Run finished. Results saved to {filepath}")
+
+        self.result = result
+        is_pass, score = run_verdict(result)
+        self.emit("graded", record_key=self.trial_key, is_pass=is_pass, score=score,
+                  grades=[{"metric": g.get('metric'), "result": g.get('result'), "tier": g.get('tier')} for g in grades])
+        # output_dir is a run store location: a JSON directory or a .db file
+        location = open_store(self.output_dir).save(result)
+        if self.journal:
+            # The result is stored; the trial no longer needs resuming
+            self.journal.remove()
+        exporter = get_span_exporter()
+        if exporter:
+            exporter.export(self.metrics)
+        summary = self.metrics.summary()
+        self.emit("saved", record_key=self.trial_key, location=location, timestamp=timestamp, is_pass=is_pass,
+                  score=score, calls=summary["calls"], cost_usd=summary["cost_usd"], early_stop=self.early_stop)
+        self.log(f"Run finished. Results saved to {location}")
+        return location
 
 # For testing
 if __name__ == "__main__":
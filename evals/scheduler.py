@@ -0,0 +1,110 @@
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Callable, Optional
+
+STOP_POLICIES = ("none", "pass_caret_k", "pass_at_k", "confidence")
+
+
+class SequentialTest:
+    """
+    Wald's sequential probability ratio test on a scenario's pass rate.
+    H0: p <= target - delta (unreliable) vs H1: p >= target + delta (reliable),
+    with error rates alpha = beta = 1 - confidence.
+    """
+    def __init__(self, target: float = 0.8, delta: float = 0.15, confidence: float = 0.9):
+        self.p0 = max(target - delta, 0.01)
+        self.p1 = min(target + delta, 0.99)
+        error = 1 - confidence
+        self.upper = math.log((1 - error) / error)
+        self.lower = math.log(error / (1 - error))
+
+    def decide(self, passes: int, fails: int) -> Optional[str]:
+        llr = passes * math.log(self.p1 / self.p0) + fails * math.log((1 - self.p1) / (1 - self.p0))
+        if llr >= self.upper:
+            return "reliable"
+        if llr <= self.lower:
+            return "unreliable"
+        return None
+
+    def trials_to_decide(self) -> int:
+        """Fewest trials that can reach 'reliable' (all of them passing)."""
+        return math.ceil(self.upper / math.log(self.p1 / self.p0))
+
+
+def stop_reason(policy: str, passes: int, fails: int, test: Optional[SequentialTest] = None) -> Optional[str]:
+    """Why a scenario needs no more trials under `policy`, or None to keep going."""
+    if policy == "pass_caret_k" and fails > 0:
+        return "pass^k decided (a trial failed)"
+    if policy == "pass_at_k" and passes > 0:
+        return "pass@k decided (a trial passed)"
+    if policy == "confidence" and test is not None:
+        verdict = test.decide(passes, fails)
+        if verdict:
+            return f"sequential test: {verdict}"
+    return None
+
+
+class AdaptiveScheduler:
+    """
+    Runs each scenario's planned trials one after another (scenarios in
+    parallel, up to `concurrency` trials in flight) and stops a scenario as
+    soon as `policy` says its reported verdicts are decided.
+    `run_trial(trial)` runs one trial and returns its pass/fail.
+    """
+    def __init__(self, plan: List[Dict[str, Any]], run_trial: Callable[[Dict[str, Any]], bool],
+                 policy: str = "none", concurrency: int = 1, test: Optional[SequentialTest] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        if policy not in STOP_POLICIES:
+            raise ValueError(f"Unknown stop policy: {policy}")
+        self.run_trial = run_trial
+        self.policy = policy
+        self.concurrency = max(1, concurrency)
+        self.test = test or SequentialTest()
+        self.log = log or print
+        self.queues: Dict[str, List[Dict[str, Any]]] = {}
+        for trial in plan:
+            self.queues.setdefault(trial["scenario_file"], []).append(trial)
+        self.status = {
+            s: {"planned": len(trials), "used": 0, "passes": 0, "fails": 0, "errors": 0, "stop_reason": None}
+            for s, trials in self.queues.items()
+        }
+
+    def _next_trial(self, scenario: str) -> Optional[Dict[str, Any]]:
+        st = self.status[scenario]
+        if st["stop_reason"] or not self.queues[scenario]:
+            return None
+        return self.queues[scenario].pop(0)
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        ready = list(self.queues)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            running = {}
+            while ready or running:
+                # One trial in flight per scenario: the next one depends on this result
+                while ready and len(running) < self.concurrency:
+                    scenario = ready.pop(0)
+                    trial = self._next_trial(scenario)
+                    if trial is not None:
+                        running[pool.submit(self.run_trial, trial)] = scenario
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    scenario = running.pop(fut)
+                    st = self.status[scenario]
+                    st["used"] += 1
+                    try:
+                        if fut.result():
+                            st["passes"] += 1
+                        else:
+                            st["fails"] += 1
+                    except Exception as e:
+                        st["errors"] += 1
+                        self.log(f"{scenario}: trial failed: {e}")
+                    st["stop_reason"] = stop_reason(self.policy, st["passes"], st["fails"], self.test)
+                    if st["stop_reason"]:
+                        skipped = len(self.queues[scenario])
+                        self.log(f"{scenario}: stopping after {st['used']}/{st['planned']} trials ({st['stop_reason']}), skipping {skipped}")
+                    elif self.queues[scenario]:
+                        ready.append(scenario)
+        return self.status
@@ -0,0 +1,690 @@
+import os
+import re
+import json
+import glob
+import lzma
+import mmap
+import zlib
+import struct
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking of packed stores on Windows
+    fcntl = None
+
+
+def trial_key(scenario_id: str, run_config: Dict[str, Any]) -> str:
+    """
+    Stable identity of a planned trial: the same scenario and run_config
+    (run id, temperature, seed, overrides) always give the same key, so a
+    re-run trial replaces its earlier result instead of adding a duplicate.
+    """
+    digest = hashlib.sha256(json.dumps(run_config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+    return f"{scenario_id}_run{run_config.get('run_id', '0')}_{digest}"
+
+
+def run_verdict(record: Dict[str, Any]) -> Tuple[bool, float]:
+    """
+    Pass/fail and rubric total score of a run, as used by the report, the
+    viewer, the sequential test and the budget. A grade that errored (e.g. an
+    unparseable judge reply) is not a pass.
+    """
+    is_pass = True
+    run_score = 0.0
+    for g in record.get('grades', []):
+        # Rule grader check; a judge ERROR counts against the run too
+        if g.get('result') in ('FAIL', 'ERROR'):
+            is_pass = False
+
+        # Rubric check
+        if g.get('metric') == 'rubric_eval':
+            s = g.get('total_score', 0)
+            if s == '-': s = 0
+            try:
+                run_score = float(s)
+            except (ValueError, TypeError):
+                run_score = 0.0
+    return is_pass, run_score
+
+
+def select_grade_set(record: Dict[str, Any], name: str) -> Dict[str, Any]:
+    """
+    The record as graded by its grade set `name` (see evals/regrade.py), or by
+    its most recently graded set for 'latest'. Runs without that set keep
+    their original grades.
+    """
+    sets = record.get('grade_sets') or {}
+    if name == "latest":
+        chosen = max(sets.values(), key=lambda s: s.get('graded_at', ''), default=None)
+    else:
+        chosen = sets.get(name)
+    if chosen is None:
+        return record
+    label = chosen.get('label', name)
+    # A set regraded identically under another label only names the set it matches
+    if 'same_as' in chosen:
+        chosen = sets.get(chosen['same_as'])
+        if chosen is None:
+            return record
+    return dict(record, grades=chosen['grades'], grade_set=label)
+
+
+def summarize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The small set of columns reporting needs, without transcript or grades."""
+    is_pass, score = run_verdict(record)
+    context = record.get('context') or {}
+    npc_ctx = context.get('npc') or {}
+    label = npc_ctx.get('strategy', 'full')
+    if npc_ctx.get('window_turns'):
+        label += f":{npc_ctx['window_turns']}"
+    return {
+        "scenario": record.get('scenario', 'Unknown'),
+        "run_id": str(record.get('run_config', {}).get('run_id', '-')),
+        "timestamp": record.get('timestamp', ''),
+        "is_pass": is_pass,
+        "score": score,
+        "context": label,
+        "prompt_tokens": sum((context.get(agent) or {}).get('total_prompt_tokens', 0) for agent in ('npc', 'player')),
+    }
+
+
+def sort_key(summary: Dict[str, Any]):
+    # Timestamp desc; scenario and run id break ties so the order does not
+    # depend on file listing order or on how trials were scheduled.
+    return (summary['timestamp'], summary['scenario'], summary['run_id'])
+
+
+# {trial_key}.json, i.e. {scenario}_run{id}_{12 hex}.json, or the older {scenario}_run{id}_{timestamp}.json
+_FILENAME_RE = re.compile(r"^(.*)_run(.+)_([0-9a-f]{12}|\d{8}_\d{6})\.json$")
+_TIMESTAMP_RE = re.compile(rb'"timestamp": "(\d{8}_\d{6})"')
+_TIMESTAMP_NAME_RE = re.compile(r"^\d{8}_\d{6}$")
+
+
+def _file_timestamp(path: str, name_part: str, peek: int = 1024) -> Optional[str]:
+    """
+    A run file's timestamp without parsing it: from the name in the older
+    layout, otherwise from the "timestamp" key near the start of the file
+    (where records are written) or its end (records saved before that).
+    """
+    if _TIMESTAMP_NAME_RE.match(name_part):
+        return name_part
+    try:
+        with open(path, 'rb') as f:
+            m = _TIMESTAMP_RE.search(f.read(peek))
+            if m:
+                return m.group(1).decode()
+            f.seek(max(os.fstat(f.fileno()).st_size - peek, 0))
+            found = _TIMESTAMP_RE.findall(f.read())
+    except OSError:
+        return None
+    return found[-1].decode() if found else None
+
+
+class JsonDirStore:
+    """One pretty-printed JSON file per run (the original layout)."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, record: Dict[str, Any]) -> str:
+        os.makedirs(self.path, exist_ok=True)
+        if record.get('trial_key'):
+            filename = f"{record['trial_key']}.json"
+        else:
+            run_id = record.get('run_config', {}).get('run_id', '0')
+            filename = f"{record.get('scenario', 'unknown')}_run{run_id}_{record.get('timestamp', '')}.json"
+        filepath = os.path.join(self.path, filename)
+        self.update(filepath, record)
+        return filepath
+
+    def update(self, key: str, record: Dict[str, Any]):
+        # Write then rename so readers never see a half-written file
+        tmp_path = key + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, key)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(key, 'r', encoding='utf-8') as fd:
+                return json.load(fd)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading {key}: {e}")
+            return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Summaries sorted newest first; each carries its `key`."""
+        rows = []
+        for f in glob.glob(os.path.join(self.path, "*.json")):
+            record = self._load(f)
+            if record is not None:
+                rows.append(dict(summarize_record(record), key=f))
+        rows.sort(key=sort_key, reverse=True)
+        return rows
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(key, record) pairs, newest first, loaded one at a time."""
+        order = []
+        for f in glob.glob(os.path.join(self.path, "*.json")):
+            m = _FILENAME_RE.match(os.path.basename(f))
+            timestamp = _file_timestamp(f, m.group(3)) if m else None
+            if timestamp is None:
+                order = None
+                break
+            order.append(((timestamp, m.group(1), m.group(2)), f))
+        if order is not None:
+            # Order from the file names and timestamps alone, so each record is parsed once
+            keys = [f for _, f in sorted(order, reverse=True)]
+        else:
+            keys = [row['key'] for row in self.summaries()]
+        for key in keys:
+            record = self._load(key)
+            if record is not None:
+                yield key, record
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The record saved under `key`, or None if it is missing or outside this store."""
+        if os.path.dirname(os.path.abspath(key)) != os.path.abspath(self.path) or not os.path.exists(key):
+            return None
+        return self._load(key)
+
+    def count(self) -> int:
+        return len(glob.glob(os.path.join(self.path, "*.json")))
+
+
+class SQLiteRunStore:
+    """
+    Runs in one SQLite file. Scenario, run id, timestamp, verdict and score are
+    indexed columns; transcript, grades, config and everything else are JSON blobs
+    that are only read when a caller asks for full records.
+    """
+    SUMMARY_COLUMNS = "id, scenario, run_id, timestamp, is_pass, score, context, prompt_tokens"
+    BLOB_FIELDS = ("config", "run_config", "transcript", "grades")
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scenario TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                is_pass INTEGER NOT NULL,
+                score REAL NOT NULL,
+                context TEXT,
+                prompt_tokens INTEGER,
+                source TEXT UNIQUE,
+                config BLOB,
+                run_config BLOB,
+                transcript BLOB,
+                grades BLOB,
+                extra BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs(scenario, run_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs(timestamp);
+            CREATE INDEX IF NOT EXISTS idx_runs_pass ON runs(is_pass, score);
+        """)
+
+    def _row_values(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        summary = summarize_record(record)
+        values = {
+            "scenario": summary["scenario"],
+            "run_id": summary["run_id"],
+            "timestamp": summary["timestamp"],
+            "is_pass": int(summary["is_pass"]),
+            "score": summary["score"],
+            "context": summary["context"],
+            "prompt_tokens": summary["prompt_tokens"],
+        }
+        for field in self.BLOB_FIELDS:
+            values[field] = json.dumps(record.get(field), ensure_ascii=False)
+        extra = {k: v for k, v in record.items() if k not in self.BLOB_FIELDS and k not in ("scenario", "timestamp")}
+        values["extra"] = json.dumps(extra, ensure_ascii=False)
+        return values
+
+    def save(self, record: Dict[str, Any], source: Optional[str] = None) -> str:
+        values = self._row_values(record)
+        # A keyed trial replaces its previous result; imports (by source path) are kept as first seen
+        replace = source is None and bool(record.get('trial_key'))
+        values["source"] = f"trial:{record['trial_key']}" if replace else source
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        with self._lock:
+            if replace:
+                assignments = ", ".join(f"{c} = excluded.{c}" for c in values if c != "source")
+                row_id = self._conn.execute(
+                    f"INSERT INTO runs ({columns}) VALUES ({placeholders})"
+                    f" ON CONFLICT(source) DO UPDATE SET {assignments} RETURNING id",
+                    tuple(values.values())).fetchone()[0]
+            else:
+                cur = self._conn.execute(f"INSERT OR IGNORE INTO runs ({columns}) VALUES ({placeholders})",
+                                         tuple(values.values()))
+                row_id = cur.lastrowid if cur.rowcount else None
+        return f"{self.path}#{row_id}"
+
+    def update(self, key: str, record: Dict[str, Any]):
+        row_id = int(key.rsplit("#", 1)[1])
+        values = self._row_values(record)
+        assignments = ", ".join(f"{c} = ?" for c in values)
+        with self._lock:
+            self._conn.execute(f"UPDATE runs SET {assignments} WHERE id = ?", (*values.values(), row_id))
+
+    def _summary_row(self, row) -> Dict[str, Any]:
+        return {
+            "key": f"{self.path}#{row[0]}",
+            "scenario": row[1],
+            "run_id": row[2],
+            "timestamp": row[3],
+            "is_pass": bool(row[4]),
+            "score": row[5],
+            "context": row[6] or "full",
+            "prompt_tokens": row[7] or 0,
+        }
+
+    def summaries(self, scenario: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = f"SELECT {self.SUMMARY_COLUMNS} FROM runs"
+        args: Tuple = ()
+        if scenario is not None:
+            sql += " WHERE scenario = ?"
+            args = (scenario,)
+        sql += " ORDER BY timestamp DESC, scenario DESC, run_id DESC"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [self._summary_row(r) for r in rows]
+
+    RECORD_COLUMNS = "id, scenario, timestamp, config, run_config, transcript, grades, extra"
+
+    def _record(self, row) -> Dict[str, Any]:
+        record = {"scenario": row[1]}
+        for field, blob in zip(self.BLOB_FIELDS, row[3:7]):
+            record[field] = json.loads(blob) if blob else None
+        record.update(json.loads(row[7]) if row[7] else {})
+        record["timestamp"] = row[2]
+        return record
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # A separate read connection streams rows without holding the write lock
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            cur = conn.execute(
+                f"SELECT {self.RECORD_COLUMNS} FROM runs"
+                " ORDER BY timestamp DESC, scenario DESC, run_id DESC"
+            )
+            for row in cur:
+                yield f"{self.path}#{row[0]}", self._record(row)
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The record saved under `key` (`<path>#<row id>`), or None."""
+        path, _, row_id = key.rpartition("#")
+        if os.path.abspath(path) != os.path.abspath(self.path) or not row_id.isdigit():
+            return None
+        with self._lock:
+            row = self._conn.execute(f"SELECT {self.RECORD_COLUMNS} FROM runs WHERE id = ?",
+                                     (int(row_id),)).fetchone()
+        return self._record(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def import_json_dir(self, json_dir: str) -> int:
+        """Import run JSON files; files already imported (by path) are skipped."""
+        imported = 0
+        for f in sorted(glob.glob(os.path.join(json_dir, "*.json"))):
+            try:
+                with open(f, 'r', encoding='utf-8') as fd:
+                    record = json.load(fd)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error reading {f}: {e}")
+                continue
+            if not self.save(record, source=os.path.abspath(f)).endswith("#None"):
+                imported += 1
+        return imported
+
+
+class PackedRunStore:
+    """
+    Compact run store: a directory ending in .pack.
+
+        meta.json          codec and compression dictionary of the store
+        configs/<hash>     scenario configs, stored once and referenced by content hash
+        dicts/<hash>       zlib preset dictionaries (a sample of earlier records)
+        records.frames     framed, individually compressed records (config replaced by its hash)
+        scores.bin         fixed-width score table, one SCORE_ROW per saved record version
+        strings.jsonl      strings the score table refers to by line number
+
+    Per-call metrics, most of a record, are framed column-wise (keys once,
+    then one value list per call), which also halves their JSON decode time.
+    Frames and rows are only appended: saving a record again (same trial key)
+    writes a new version and clears the `live` byte of the old row. The score
+    table is read through mmap, so summaries, counts and ordering never touch
+    the frames. Records come back with their `config` attached; configs are
+    shared between the records of a store and must not be modified.
+    Several processes can write one store; appends are serialized by a lock file.
+    """
+    FRAME_MAGIC = b"EVF1"
+    # magic, codec, dictionary (0 = none, 1 = the store's), payload length, crc32 of the payload
+    FRAME_HEADER = struct.Struct("<4sBBII")
+    # offset, length, key, scenario, run id, context (string ids), timestamp (YYYYmmddHHMMSS), score,
+    # prompt tokens, is_pass, live
+    SCORE_ROW = struct.Struct("<QIIIIIQfIBB2x")
+    CODECS = {"zlib": 1, "lzma": 2}
+    # Records saved before the dictionary is built from them
+    DICT_SAMPLE_RECORDS = 4
+    ZDICT_BYTES = 32 * 1024
+
+    def __init__(self, path: str, codec: str = "zlib"):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(path, "configs"), exist_ok=True)
+        os.makedirs(os.path.join(path, "dicts"), exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            if codec not in self.CODECS:
+                raise ValueError(f"Unknown codec: {codec}")
+            self._write_json(meta_path, {"format": "eval-runs-pack", "version": 1, "codec": codec, "dict": None})
+        self._frames_path = os.path.join(path, "records.frames")
+        self._scores_path = os.path.join(path, "scores.bin")
+        self._strings_path = os.path.join(path, "strings.jsonl")
+        for p in (self._frames_path, self._scores_path, self._strings_path):
+            open(p, 'ab').close()
+        self._lock_fd = os.open(os.path.join(path, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self._frames_fd = os.open(self._frames_path, os.O_RDONLY)
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._strings_size = 0
+        self._rows: List[Tuple] = []
+        self._index: Dict[str, int] = {}  # record id -> row of its live version
+        self._configs: Dict[str, Any] = {}
+        self._zdict: Optional[bytes] = None
+        self._meta: Dict[str, Any] = {}
+        self._refresh()
+
+    @staticmethod
+    def _write_json(path: str, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def _flock(self, exclusive: bool):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Pick up strings and rows appended since the last look (also by other processes). Caller holds _lock."""
+        with open(os.path.join(self.path, "meta.json"), 'r', encoding='utf-8') as f:
+            self._meta = json.load(f)
+        if self._meta.get("dict") and self._zdict is None:
+            with open(os.path.join(self.path, "dicts", self._meta["dict"]), 'rb') as f:
+                self._zdict = f.read()
+        if os.path.getsize(self._strings_path) > self._strings_size:
+            with open(self._strings_path, 'rb') as f:
+                f.seek(self._strings_size)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # another process is still writing it
+                    s = json.loads(line)
+                    self._string_ids.setdefault(s, len(self._strings))
+                    self._strings.append(s)
+                    self._strings_size += len(line)
+        size = os.path.getsize(self._scores_path)
+        start = len(self._rows) * self.SCORE_ROW.size
+        if size - start >= self.SCORE_ROW.size:
+            with open(self._scores_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as table:
+                    end = start + (size - start) // self.SCORE_ROW.size * self.SCORE_ROW.size
+                    for row in self.SCORE_ROW.iter_unpack(table[start:end]):
+                        self._index[self._strings[row[2]]] = len(self._rows)
+                        self._rows.append(row)
+
+    def _string_id(self, s: str, new: List[str]) -> int:
+        if s not in self._string_ids:
+            self._string_ids[s] = len(self._strings)
+            self._strings.append(s)
+            new.append(s)
+        return self._string_ids[s]
+
+    @staticmethod
+    def _record_id(record: Dict[str, Any]) -> str:
+        if record.get('trial_key'):
+            return record['trial_key']
+        run_id = record.get('run_config', {}).get('run_id', '0')
+        return f"{record.get('scenario', 'unknown')}_run{run_id}_{record.get('timestamp', '')}"
+
+    def _config_ref(self, config) -> Optional[str]:
+        if config is None:
+            return None
+        text = json.dumps(config, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        if digest not in self._configs:
+            path = os.path.join(self.path, "configs", f"{digest}.json")
+            if not os.path.exists(path):
+                self._write_json(path, config)
+            self._configs[digest] = config
+        return digest
+
+    def _config(self, ref: str):
+        if ref not in self._configs:
+            with open(os.path.join(self.path, "configs", f"{ref}.json"), 'r', encoding='utf-8') as f:
+                self._configs[ref] = json.load(f)
+        return self._configs[ref]
+
+    def _maybe_build_dict(self):
+        """Once a few records exist, keep a sample of them as the zlib dictionary for every later frame."""
+        if self._meta.get("codec") != "zlib" or self._meta.get("dict") or len(self._rows) < self.DICT_SAMPLE_RECORDS:
+            return
+        sample = b"".join(self._payload(row) for row in self._rows[:self.DICT_SAMPLE_RECORDS])[-self.ZDICT_BYTES:]
+        digest = hashlib.sha256(sample).hexdigest()[:16]
+        with open(os.path.join(self.path, "dicts", digest), 'wb') as f:
+            f.write(sample)
+        self._meta["dict"] = digest
+        self._write_json(os.path.join(self.path, "meta.json"), self._meta)
+        self._zdict = sample
+
+    def _encode(self, body: bytes) -> bytes:
+        codec = self._meta.get("codec", "zlib")
+        if codec == "lzma":
+            payload, dict_no = lzma.compress(body), 0
+        elif self._zdict:
+            c = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, self._zdict)
+            payload, dict_no = c.compress(body) + c.flush(), 1
+        else:
+            payload, dict_no = zlib.compress(body, 9), 0
+        return self.FRAME_HEADER.pack(self.FRAME_MAGIC, self.CODECS[codec], dict_no, len(payload),
+                                      zlib.crc32(payload)) + payload
+
+    def _payload(self, row) -> bytes:
+        """Decompressed JSON body of the frame a score row points to."""
+        frame = os.pread(self._frames_fd, row[1], row[0])
+        magic, codec, dict_no, length, crc = self.FRAME_HEADER.unpack_from(frame)
+        payload = frame[self.FRAME_HEADER.size:self.FRAME_HEADER.size + length]
+        if magic != self.FRAME_MAGIC or zlib.crc32(payload) != crc:
+            raise ValueError(f"corrupt frame at offset {row[0]}")
+        if codec == self.CODECS["lzma"]:
+            return lzma.decompress(payload)
+        if dict_no:
+            d = zlib.decompressobj(zdict=self._zdict)
+            return d.decompress(payload) + d.flush()
+        return zlib.decompress(payload)
+
+    def _load_row(self, row) -> Optional[Dict[str, Any]]:
+        try:
+            record = json.loads(self._payload(row))
+        except (OSError, ValueError, zlib.error, lzma.LZMAError) as e:
+            print(f"Error reading {self.path}#{self._strings[row[2]]}: {e}")
+            return None
+        ref = record.pop('config_ref', None)
+        if ref is not None:
+            record['config'] = self._config(ref)
+        calls = (record.get('metrics') or {}).get('calls')
+        if isinstance(calls, dict):
+            record['metrics']['calls'] = [dict(zip(calls['columns'], row)) for row in calls['rows']]
+        return record
+
+    def save(self, record: Dict[str, Any]) -> str:
+        rid = self._record_id(record)
+        self.update(f"{self.path}#{rid}", record)
+        return f"{self.path}#{rid}"
+
+    def update(self, key: str, record: Dict[str, Any]):
+        rid = key.rpartition("#")[2]
+        body = {k: v for k, v in record.items() if k != 'config'}
+        if 'config' in record:
+            body['config_ref'] = self._config_ref(record['config'])
+        calls = (record.get('metrics') or {}).get('calls')
+        if calls and all(list(c) == list(calls[0]) for c in calls):
+            columns = list(calls[0])
+            body['metrics'] = dict(record['metrics'], calls={"columns": columns,
+                                                             "rows": [list(c.values()) for c in calls]})
+        data = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+        summary = summarize_record(record)
+        ts = summary["timestamp"].replace("_", "")
+        with self._lock:
+            self._flock(True)
+            try:
+                self._refresh()
+                self._maybe_build_dict()
+                new_strings: List[str] = []
+                ids = [self._string_id(str(s), new_strings)
+                       for s in (rid, summary["scenario"], summary["run_id"], summary["context"])]
+                if new_strings:
+                    with open(self._strings_path, 'ab') as f:
+                        f.write(b"".join(json.dumps(s, ensure_ascii=False).encode("utf-8") + b"\n" for s in new_strings))
+                    self._strings_size = os.path.getsize(self._strings_path)
+                frame = self._encode(data)
+                with open(self._frames_path, 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(frame)
+                row = (offset, len(frame), *ids, int(ts) if ts.isdigit() else 0, summary["score"],
+                       summary["prompt_tokens"], int(summary["is_pass"]), 1)
+                with open(self._scores_path, 'r+b') as f:
+                    previous = self._index.get(rid)
+                    if previous is not None:
+                        # Superseded version: clear its live byte in place
+                        f.seek(previous * self.SCORE_ROW.size + self.SCORE_ROW.size - 3)
+                        f.write(b"\0")
+                        self._rows[previous] = self._rows[previous][:-1] + (0,)
+                    f.seek(len(self._rows) * self.SCORE_ROW.size)
+                    f.write(self.SCORE_ROW.pack(*row))
+                self._index[rid] = len(self._rows)
+                self._rows.append(row)
+            finally:
+                self._flock(False)
+
+    def _live_rows(self) -> List[Tuple]:
+        with self._lock:
+            self._refresh()
+            rows = [self._rows[i] for i in self._index.values()]
+        # Newest first, like the other stores
+        rows.sort(key=lambda r: (r[6], self._strings[r[3]], self._strings[r[4]]), reverse=True)
+        return rows
+
+    def _summary_row(self, row) -> Dict[str, Any]:
+        ts = f"{row[6]:014d}" if row[6] else ""
+        return {
+            "key": f"{self.path}#{self._strings[row[2]]}",
+            "scenario": self._strings[row[3]],
+            "run_id": self._strings[row[4]],
+            "timestamp": f"{ts[:8]}_{ts[8:]}" if ts else "",
+            "is_pass": bool(row[9]),
+            "score": round(row[7], 4),
+            "context": self._strings[row[5]],
+            "prompt_tokens": row[8],
+        }
+
+    def summaries(self, scenario: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Summaries sorted newest first, straight from the score table."""
+        return [self._summary_row(r) for r in self._live_rows()
+                if scenario is None or self._strings[r[3]] == scenario]
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in self._live_rows():
+            record = self._load_row(row)
+            if record is not None:
+                yield f"{self.path}#{self._strings[row[2]]}", record
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The record saved under `key` (`<path>#<record id>`), or None."""
+        with self._lock:
+            self._refresh()
+            row = self._index.get(key.rpartition("#")[2])
+            row = self._rows[row] if row is not None else None
+        return self._load_row(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+
+_stores: Dict[str, Any] = {}
+_stores_lock = threading.Lock()
+
+
+def sidecar_path(location: str, name: str) -> str:
+    """
+    Path of a file or directory kept alongside the run store at `location`
+    (logs, journals, events, claims, work queue): next to a .db or .pack store
+    as `<stem>_<name>`, inside a directory of JSON files as `<dir>/<name>`.
+    """
+    location = location.rstrip("/\\") or location
+    stem, ext = os.path.splitext(location)
+    if ext in (".db", ".sqlite", ".sqlite3", ".pack"):
+        return f"{stem}_{name}"
+    return os.path.join(location, name)
+
+
+def open_store(location: str):
+    """
+    Open the run store at `location`: a path ending in .db/.sqlite/.sqlite3 is a
+    SQLite store, one ending in .pack a packed store, anything else a directory
+    of JSON files. Stores are shared per path.
+    """
+    key = os.path.abspath(location)
+    with _stores_lock:
+        if key not in _stores:
+            if location.endswith((".db", ".sqlite", ".sqlite3")):
+                _stores[key] = SQLiteRunStore(location)
+            elif location.rstrip("/\\").endswith(".pack"):
+                _stores[key] = PackedRunStore(location)
+            else:
+                _stores[key] = JsonDirStore(location)
+        return _stores[key]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run store utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import a directory of run JSON files into a SQLite store")
+    imp.add_argument("json_dir", type=str)
+    imp.add_argument("db", type=str)
+    pack = sub.add_parser("pack", help="Copy any run store (JSON directory or .db) into a packed .pack store")
+    pack.add_argument("source", type=str)
+    pack.add_argument("dest", type=str, help="Directory ending in .pack")
+    pack.add_argument("--codec", choices=sorted(PackedRunStore.CODECS), default="zlib")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        store = SQLiteRunStore(args.db)
+        n = store.import_json_dir(args.json_dir)
+        print(f"Imported {n} runs into {args.db} ({store.count()} total).")
+    else:
+        if not args.dest.rstrip("/\\").endswith(".pack"):
+            parser.error("dest must end in .pack")
+        dest = PackedRunStore(args.dest, codec=args.codec)
+        n = 0
+        for _, record in open_store(args.source).iter_records():
+            dest.save(record)
+            n += 1
+        print(f"Packed {n} runs into {args.dest} ({dest.count()} total).")
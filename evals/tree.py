@@ -0,0 +1,177 @@
+import hashlib
+from typing import List, Dict, Any, Callable, Optional, Union
+from evals.journal import restore_agent
+from evals.registry import Scenario, load_scenario
+from evals.runner import GameRunner
+from evals.store import trial_key
+
+
+def parse_branching(spec: str) -> Dict[str, int]:
+    """
+    Parse --tree such as '1:4,3:2': at turn 1 the NPC reply is sampled 4 times,
+    and each of those branches forks 2 ways at turn 3 (8 leaves). Turns are
+    1-based; unlisted turns do not fork.
+    """
+    branching = {}
+    for part in filter(None, spec.split(",")):
+        turn, _, factor = part.partition(":")
+        if int(turn) < 1 or int(factor) < 1:
+            raise ValueError(f"Invalid branching '{part}': turn and factor must be at least 1")
+        branching[str(int(turn))] = int(factor)
+    return branching
+
+
+def leaf_count(branching: Dict[str, int], max_turns: int) -> int:
+    """Leaves of a full tree (fewer if branches stop early on a hard fail)."""
+    count = 1
+    for turn, factor in branching.items():
+        if int(turn) <= max_turns:
+            count *= factor
+    return count
+
+
+def branch_seed(seed: Optional[int], path: List[int]) -> Optional[int]:
+    """Seed for a branch: stable per (root seed, path), distinct between siblings."""
+    if seed is None or not path:
+        return seed
+    digest = hashlib.sha256(f"{seed}:{'.'.join(map(str, path))}".encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % 100000
+
+
+class TreeRunner:
+    """
+    Plays one scenario as a conversation tree instead of independent trials.
+
+    Turns before a fork are played once and shared by every leaf below them;
+    at a fork turn the player's message is shared and the NPC reply is sampled
+    once per branch (each branch with its own seed). Every leaf is then graded
+    and saved as an ordinary trial whose run_config carries its tree path, so
+    the report and viewer treat leaves like any other run. The LLM calls of a
+    shared prefix are charged to the leaves below it in equal parts.
+    """
+    def __init__(self, scenario_path: Union[str, Scenario], output_dir: str, run_config: Dict[str, Any],
+                 log: Optional[Callable[[str], None]] = None, defer_llm_grading: bool = False):
+        self.scenario = scenario_path if isinstance(scenario_path, Scenario) else load_scenario(scenario_path)
+        self.output_dir = output_dir
+        self.run_config = run_config
+        self.branching = {int(t): f for t, f in run_config["branching"].items()}
+        self.log = log or print
+        self.defer_llm_grading = defer_llm_grading
+        self.max_turns = self.scenario.config.get('max_turns', 8)
+        self.leaves: List[GameRunner] = []
+        self.trial_key = trial_key(self.scenario.scenario_id, run_config)
+
+    def _branch(self, path: List[int]) -> GameRunner:
+        run_config = dict(self.run_config, run_id=self._run_id(path), seed=branch_seed(self.run_config.get('seed'), path))
+        run_config["tree"] = {"root": self.run_config.get('run_id'), "path": ".".join(map(str, path)) or "-"}
+        # Leaves are saved as they finish; a tree is resumed as a whole, so no per-leaf journal
+        runner = GameRunner(self.scenario, self.output_dir, run_config=run_config, log=self.log,
+                            defer_llm_grading=self.defer_llm_grading, journal=False)
+        runner.event_key = self.trial_key
+        return runner
+
+    def _run_id(self, path: List[int]) -> str:
+        return f"{self.run_config.get('run_id', 0)}" + "".join(f".{i}" for i in path)
+
+    def run(self) -> List[str]:
+        """Play the whole tree, then grade and save every leaf; returns the saved locations."""
+        branch = self._branch([])
+        npc, player = branch.make_agents()
+        branch.emit("trial_started", temperature=self.run_config.get('temperature', 0.7), max_turns=self.max_turns,
+                    resumed_turns=0, lines=[], branching=self.run_config["branching"])
+        leaves = self._explore(branch, npc, player, [], 0, None)
+
+        locations = []
+        total_calls = sum(len(c) for leaf in leaves for c, _ in leaf["segments"])
+        unique_calls = 0
+        for leaf in leaves:
+            runner = self._branch(leaf["path"])
+            runner.transcript = leaf["transcript"]
+            runner.early_stop = leaf["early_stop"]
+            runner.context_stats = leaf["context_stats"]
+            for calls, shared_by in leaf["segments"]:
+                runner.metrics.extend(calls, shared_by=shared_by)
+                unique_calls += len(calls) / shared_by
+            runner.run_config["tree"]["leaves"] = len(leaves)
+            grades = runner.grade_rules()
+            llm_grade = runner.grade_llm(grades)
+            if llm_grade is not None:
+                grades.append(llm_grade)
+            locations.append(runner._save_results(grades))
+            self.leaves.append(runner)
+        self.log(f"Tree {self.run_config.get('run_id')}: {len(leaves)} leaves from {round(unique_calls)} conversation "
+                 f"LLM calls ({total_calls} if played as independent trials)")
+        return locations
+
+    def _explore(self, branch: GameRunner, npc, player, path: List[int], turn: int,
+                 last_response: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Play `branch` from `turn` until the conversation ends or forks; returns
+        its leaves, each with the (calls, shared_by) segments on its path.
+        """
+        seed = branch.run_config.get('seed')
+        rules = branch.hard_fail_rules()
+        while turn < self.max_turns:
+            branch.log(f"--- Turn {turn+1} ({self._run_id(path)}) ---")
+            branch.metrics.turn = turn
+            player_msg = branch.player_move(turn, player, last_response, seed)
+            factor = self.branching.get(turn + 1, 1)
+            if factor > 1:
+                return self._fork(branch, npc, player, path, turn, player_msg, factor)
+            last_response = branch.npc_move(turn, npc, player_msg, seed, rules)
+            turn += 1
+            if branch.early_stop:
+                break
+
+        branch.metrics.turn = None
+        return [{
+            "path": path,
+            "transcript": branch.transcript,
+            "early_stop": branch.early_stop,
+            "context_stats": {"npc": npc.context.stats(), "player": player.context.stats()},
+            "segments": [(branch.metrics.calls, 1)],
+        }]
+
+    def _fork(self, branch: GameRunner, npc, player, path: List[int], turn: int, player_msg: str,
+              factor: int) -> List[Dict[str, Any]]:
+        snapshot = {name: {"messages": list(agent.history[1:]), "calls": list(agent.context.calls),
+                           "summary": agent.context.summary, "summarized_upto": agent.context.summarized_upto}
+                    for name, agent in (("npc", npc), ("player", player))}
+        leaves = []
+        for i in range(factor):
+            child = self._branch(path + [i])
+            child.transcript = list(branch.transcript)
+            if i == 0:
+                # The first branch carries on with the live agents, now reporting to its own metrics
+                child_npc, child_player = npc, player
+                child_npc.client.metrics = child_player.client.metrics = child.metrics
+            else:
+                child_npc, child_player = child.make_agents()
+                restore_agent(child_npc, snapshot["npc"])
+                restore_agent(child_player, snapshot["player"])
+            child.metrics.turn = turn
+            rules = child.hard_fail_rules()
+            reply = child.npc_move(turn, child_npc, player_msg, child.run_config.get('seed'), rules)
+            if child.early_stop:
+                child.metrics.turn = None
+                leaves.append({
+                    "path": path + [i],
+                    "transcript": child.transcript,
+                    "early_stop": child.early_stop,
+                    "context_stats": {"npc": child_npc.context.stats(), "player": child_player.context.stats()},
+                    "segments": [(child.metrics.calls, 1)],
+                })
+            else:
+                leaves.extend(self._explore(child, child_npc, child_player, path + [i], turn + 1, reply))
+        # This branch's calls so far are shared by every leaf below the fork
+        for leaf in leaves:
+            leaf["segments"].insert(0, (branch.metrics.calls, len(leaves)))
+        return leaves
+
+
+def make_runner(scenario_path: Union[str, Scenario], output_dir: str, run_config: Dict[str, Any],
+                log: Optional[Callable[[str], None]] = None, defer_llm_grading: bool = False):
+    """A TreeRunner for run_configs with `branching`, otherwise a GameRunner."""
+    if run_config.get('branching'):
+        return TreeRunner(scenario_path, output_dir, run_config, log=log, defer_llm_grading=defer_llm_grading)
+    return GameRunner(scenario_path, output_dir, run_config=run_config, log=log, defer_llm_grading=defer_llm_grading)
@@ -1,5 +1,12 @@
 document.addEventListener('DOMContentLoaded', () => {
-  const data = window.EVAL_DATA || [];
+  // Sharded builds provide a small summary index and load each run on demand;
+  // legacy builds embed every full record in window.EVAL_DATA.
+  // Served by evals/live_server.py, runs saved during a sweep arrive over /events.
+  const isLive = location.protocol.startsWith('http') && !!window.EventSource;
+  const isSharded = Array.isArray(window.EVAL_INDEX) || isLive;
+  const data = isSharded ? (window.EVAL_INDEX || []) : (window.EVAL_DATA || []);
+  const PAGE_SIZE = 200;
+  const THROUGHPUT_WINDOW_S = 300;
 
   // State
   let currentFilter = {
@@ -7,6 +14,16 @@ document.addEventListener('DOMContentLoaded', () => {
     result: 'all'
   };
   let selectedRunId = null;
+  let filteredData = [];
+  let renderedCount = 0;
+  const shardCache = {};
+  const shardWaiters = {};
+
+  window.EVAL_SHARD_LOADED = (id, record) => {
+    shardCache[id] = record;
+    (shardWaiters[id] || []).forEach(w => w.resolve(record));
+    delete shardWaiters[id];
+  };
 
   // DOM Elements
   const runListEl = document.getElementById('run-list');
@@ -14,6 +31,13 @@ document.addEventListener('DOMContentLoaded', () => {
   const scenarioFilterEl = document.getElementById('scenario-filter');
   const resultFilterEl = document.getElementById('result-filter');
   const headerStatsEl = document.getElementById('header-stats');
+  const livePanelEl = document.getElementById('live-panel');
+
+  // Live sweep state, rebuilt from the event stream
+  const knownIds = new Set(data.map(r => r.id));
+  let live = newSweep();
+  let selectedTrial = null;
+  let renderTimer = null;
 
   // Initialize
   init();
@@ -22,11 +46,14 @@ document.addEventListener('DOMContentLoaded', () => {
     populateFilters();
     renderStats();
     renderRunList();
+    renderReliability();
+    if (isLive) connectEvents();
 
     // Event Listeners
     scenarioFilterEl.addEventListener('change', (e) => {
       currentFilter.scenario = e.target.value;
       renderRunList();
+      if (!selectedRunId) renderReliability();
     });
 
     resultFilterEl.addEventListener('change', (e) => {
@@ -36,7 +63,8 @@ document.addEventListener('DOMContentLoaded', () => {
   }
 
   function populateFilters() {
-    const scenarios = new Set(data.map(r => r.scenario).filter(Boolean));
+    const existing = new Set([...scenarioFilterEl.options].map(o => o.value));
+    const scenarios = new Set(data.map(r => r.scenario).filter(s => s && !existing.has(s)));
     [...scenarios].sort().forEach(s => {
       const option = document.createElement('option');
       option.value = s;
@@ -45,6 +73,163 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
 
+  function newSweep() {
+    return { started: 0, saved: [], failed: 0, sweepStart: null, inFlight: new Map() };
+  }
+
+  // The browser reconnects on its own and resumes from the last event id (a byte offset)
+  function connectEvents() {
+    const source = new EventSource('events');
+    source.onmessage = (msg) => handleEvent(JSON.parse(msg.data));
+    source.onerror = () => {
+      livePanelEl.classList.add('disconnected');
+    };
+    source.onopen = () => livePanelEl.classList.remove('disconnected');
+    livePanelEl.hidden = false;
+    renderLivePanel();
+    setInterval(renderLivePanel, 5000);
+  }
+
+  function handleEvent(e) {
+    switch (e.type) {
+      case 'sweep_started':
+        live = newSweep();
+        live.sweepStart = e.ts;
+        break;
+      case 'trial_started':
+        live.started += 1;
+        live.inFlight.set(e.trial_key, {
+          key: e.trial_key, scenario: e.scenario, run_id: e.run_id, turn: 0,
+          lines: (e.lines || []).slice(), since: e.ts
+        });
+        break;
+      case 'turn': {
+        const t = live.inFlight.get(e.trial_key);
+        if (!t) break;
+        // The branches of a conversation tree share their tree's key: follow the branch that last reported
+        if (e.run_id !== t.run_id) {
+          t.run_id = e.run_id;
+          t.lines = [];
+        }
+        t.turn = e.turn;
+        t.lines.push(...(e.lines || []));
+        break;
+      }
+      case 'graded': {
+        const t = live.inFlight.get(e.trial_key);
+        if (t) t.grading = e.is_pass;
+        break;
+      }
+      case 'saved':
+        live.saved.push({ ts: e.ts, is_pass: e.is_pass });
+        live.inFlight.delete(e.trial_key);
+        if (e.shard_id && !knownIds.has(e.shard_id)) {
+          knownIds.add(e.shard_id);
+          data.unshift({
+            id: e.shard_id, scenario: e.scenario, run_id: e.run_id, timestamp: e.timestamp,
+            _is_pass: e.is_pass, _total_score: e.score
+          });
+        }
+        break;
+      case 'trial_failed':
+        live.failed += 1;
+        live.inFlight.delete(e.trial_key);
+        break;
+      case 'sweep_finished':
+        live.inFlight.clear();
+        break;
+    }
+    scheduleRender(e.type);
+  }
+
+  // Replaying a long stream delivers many events at once; redraw at most a few times a second
+  function scheduleRender(type) {
+    if (type === 'saved') scheduleRender.listChanged = true;
+    if (renderTimer) return;
+    renderTimer = setTimeout(() => {
+      renderTimer = null;
+      if (scheduleRender.listChanged) {
+        scheduleRender.listChanged = false;
+        populateFilters();
+        renderStats();
+        renderRunList();
+      }
+      renderLivePanel();
+      if (selectedTrial) renderLiveTranscript(selectedTrial);
+    }, 250);
+  }
+
+  function renderLivePanel() {
+    const now = Date.now() / 1000;
+    const recent = live.saved.filter(s => s.ts >= now - THROUGHPUT_WINDOW_S).length;
+    const windowS = Math.min(THROUGHPUT_WINDOW_S, live.sweepStart ? Math.max(now - live.sweepStart, 1) : THROUGHPUT_WINDOW_S);
+    const perMin = (recent / windowS * 60).toFixed(1);
+    const passed = live.saved.filter(s => s.is_pass).length;
+    const passRate = live.saved.length ? `${Math.round(passed / live.saved.length * 100)}%` : '-';
+
+    let content = `
+            <h3>实时进度</h3>
+            <div class="live-stats">
+                <div><strong>${live.started}</strong> started</div>
+                <div><strong>${live.saved.length}</strong> saved</div>
+                <div class="${live.failed ? 'live-failed' : ''}"><strong>${live.failed}</strong> failed</div>
+                <div><strong>${perMin}</strong> /min</div>
+                <div><strong>${passRate}</strong> pass</div>
+            </div>
+            <div class="live-list">`;
+    [...live.inFlight.values()].forEach(t => {
+      const last = t.lines[t.lines.length - 1];
+      content += `
+                <div class="live-item ${selectedTrial === t.key ? 'active' : ''}" data-key="${escapeHtml(t.key)}">
+                    <div class="run-header">
+                        <span class="scenario-name">${escapeHtml(t.scenario || 'Unknown')}</span>
+                        <span class="run-score">T${t.turn}</span>
+                    </div>
+                    <div class="live-last">${last ? escapeHtml(`${last.speaker}: ${last.content}`) : '...'}</div>
+                </div>`;
+    });
+    content += `</div>`;
+    livePanelEl.innerHTML = content;
+    livePanelEl.querySelectorAll('.live-item').forEach(el => {
+      el.onclick = () => {
+        selectedTrial = el.dataset.key;
+        selectedRunId = null;
+        document.querySelectorAll('.run-item').forEach(i => i.classList.remove('active'));
+        renderLivePanel();
+        renderLiveTranscript(selectedTrial);
+      };
+    });
+  }
+
+  function renderLiveTranscript(key) {
+    const t = live.inFlight.get(key);
+    if (!t) {
+      // Finished (or failed) since it was selected; the saved run is in the list
+      selectedTrial = null;
+      return;
+    }
+    let content = `
+            <div class="detail-container">
+                <div class="detail-header">
+                    <div class="detail-title">
+                        <h2>${escapeHtml(t.scenario)}</h2>
+                        <div class="run-id">Run ID: ${escapeHtml(String(t.run_id))} • Turn ${t.turn} • <span class="live-badge">LIVE</span></div>
+                    </div>
+                </div>
+                <div class="section-title">Transcript</div>
+                <div class="transcript-container">`;
+    t.lines.forEach(line => {
+      const isPlayer = line.speaker.toLowerCase() === 'player' || line.speaker.toLowerCase() === 'user';
+      content += `
+                    <div class="chat-bubble ${isPlayer ? 'role-player' : 'role-npc'} ${line.violation ? 'violation' : ''}">
+                        <div class="speaker-label">${escapeHtml(line.speaker)}</div>
+                        <div class="bubble-content">${escapeHtml(line.content)}</div>
+                    </div>`;
+    });
+    content += `</div></div>`;
+    detailViewEl.innerHTML = content;
+  }
+
   function renderStats() {
     const totalRuns = data.length;
     const passCount = data.filter(r => r._is_pass).length;
@@ -61,42 +246,151 @@ document.addEventListener('DOMContentLoaded', () => {
             <div class="stat-item"><strong>${passRate}%</strong> Pass Rate</div>
             <div class="stat-item"><strong>${avgScore}</strong> Avg Score</div>
         `;
+
+    // LLM call metrics, present when the runs recorded them
+    const m = window.EVAL_METRICS;
+    if (m) {
+      const fmt = v => (v === null || v === undefined) ? '-' : Math.round(v);
+      headerStatsEl.innerHTML += `
+            <div class="stat-item" title="LLM call latency p50 / p95"><strong>${fmt(m.latency_p50_ms)} / ${fmt(m.latency_p95_ms)}</strong> ms</div>
+            <div class="stat-item" title="Tokens per trial p50 / p95"><strong>${fmt(m.tokens_per_trial_p50)} / ${fmt(m.tokens_per_trial_p95)}</strong> Tokens/Trial</div>
+            <div class="stat-item"><strong>$${m.cost_usd.toFixed(2)}</strong> Cost</div>
+        `;
+    }
+  }
+
+  // Unbiased pass@k / pass^k curves with bootstrap CIs (window.EVAL_ANALYSIS), shown until a run is selected
+  function renderReliability() {
+    const a = window.EVAL_ANALYSIS;
+    if (!a) return;
+    const rows = Object.entries(a.scenarios)
+      .filter(([sid]) => currentFilter.scenario === 'all' || sid === currentFilter.scenario)
+      .sort(([x], [y]) => x.localeCompare(y));
+    const pct = Math.round(a.confidence * 100);
+    const fmt = (v, ci) => `${v.toFixed(2)} <span class="ci">[${ci[0].toFixed(2)}, ${ci[1].toFixed(2)}]</span>`;
+
+    let content = `
+            <div class="detail-container">
+                <div class="section-title">Reliability (unbiased pass@k / pass^k, ${pct}% bootstrap CI)</div>
+                <div class="curve-legend"><span class="legend-at">pass@k</span><span class="legend-caret">pass^k</span> for k = 1..n</div>
+                <table class="rubric-table reliability-table">
+                    <thead>
+                        <tr><th>Scenario</th><th>n</th><th>Pass Rate</th><th>Avg Score</th><th>Curves</th></tr>
+                    </thead>
+                    <tbody>`;
+    rows.forEach(([sid, st]) => {
+      content += `
+                        <tr>
+                            <td class="dim-name">${escapeHtml(sid)}</td>
+                            <td>${st.n}</td>
+                            <td>${fmt(st.pass_rate, st.pass_rate_ci)}</td>
+                            <td>${fmt(st.mean_score, st.mean_score_ci)}</td>
+                            <td>${curveSvg(st)}</td>
+                        </tr>`;
+    });
+    content += `</tbody></table></div>`;
+    detailViewEl.innerHTML = content;
+  }
+
+  function curveSvg(st) {
+    const w = 160, h = 40, n = st.pass_at_k.length;
+    const x = i => n > 1 ? (i / (n - 1)) * w : w / 2;
+    const y = v => h - v * h;
+    const line = vals => vals.map((v, i) => `${x(i).toFixed(1)},${y(v).toFixed(1)}`).join(' ');
+    const band = cis => line(cis.map(c => c[1])) + ' ' +
+      cis.map((c, i) => [i, c[0]]).reverse().map(([i, v]) => `${x(i).toFixed(1)},${y(v).toFixed(1)}`).join(' ');
+    return `<svg class="curve" width="${w}" height="${h}" viewBox="0 0 ${w} ${h}">
+              <polygon class="band-at" points="${band(st.pass_at_k_ci)}"/>
+              <polygon class="band-caret" points="${band(st.pass_caret_k_ci)}"/>
+              <polyline class="line-at" points="${line(st.pass_at_k)}"/>
+              <polyline class="line-caret" points="${line(st.pass_caret_k)}"/>
+            </svg>`;
   }
 
   function renderRunList() {
     runListEl.innerHTML = '';
 
-    const filteredData = data.filter(r => {
+    filteredData = data.filter(r => {
       const matchScenario = currentFilter.scenario === 'all' || r.scenario === currentFilter.scenario;
       const matchResult = currentFilter.result === 'all' ||
         (currentFilter.result === 'pass' && r._is_pass) ||
         (currentFilter.result === 'fail' && !r._is_pass);
       return matchScenario && matchResult;
     });
+    renderedCount = 0;
+    renderNextPage();
+  }
 
-    filteredData.forEach((run, index) => {
-      // Use index as a temporary ID reference if needed, but better to compare objects
-      const el = document.createElement('div');
-      el.className = `run-item ${selectedRunId === run ? 'active' : ''}`;
-      el.onclick = () => selectRun(run, el);
-
-      const statusClass = run._is_pass ? 'status-pass' : 'status-fail';
-      const statusText = run._is_pass ? 'PASS' : 'FAIL';
-      const score = run._total_score > 0 ? run._total_score : '-';
-      const runId = run.run_config?.run_id || '?';
-      const timestamp = formatTimestamp(run.timestamp);
-
-      el.innerHTML = `
-                <div class="run-header">
-                    <span class="scenario-name">${run.scenario || 'Unknown'}</span>
-                    <span class="run-score">${score}</span>
-                </div>
-                <div class="run-meta">
-                    <span>Run #${runId} • ${timestamp}</span>
-                    <span class="status-badge ${statusClass}">${statusText}</span>
-                </div>
-            `;
-      runListEl.appendChild(el);
+  // Only PAGE_SIZE items are in the DOM at first; more are appended as the list is scrolled
+  function renderNextPage() {
+    const oldMore = runListEl.querySelector('.load-more');
+    if (oldMore) oldMore.remove();
+
+    const fragment = document.createDocumentFragment();
+    filteredData.slice(renderedCount, renderedCount + PAGE_SIZE).forEach(run => {
+      fragment.appendChild(createRunItem(run));
+    });
+    renderedCount = Math.min(renderedCount + PAGE_SIZE, filteredData.length);
+    runListEl.appendChild(fragment);
+
+    if (renderedCount < filteredData.length) {
+      const more = document.createElement('button');
+      more.className = 'load-more';
+      more.textContent = `加载更多 (${filteredData.length - renderedCount})`;
+      more.onclick = renderNextPage;
+      runListEl.appendChild(more);
+    }
+  }
+
+  const scrollEl = runListEl.parentElement;
+  scrollEl.addEventListener('scroll', () => {
+    const nearBottom = scrollEl.scrollTop + scrollEl.clientHeight >= scrollEl.scrollHeight - 200;
+    if (nearBottom && renderedCount < filteredData.length) {
+      renderNextPage();
+    }
+  });
+
+  function createRunItem(run) {
+    const el = document.createElement('div');
+    el.className = `run-item ${selectedRunId === run ? 'active' : ''}`;
+    el.onclick = () => selectRun(run, el);
+
+    const statusClass = run._is_pass ? 'status-pass' : 'status-fail';
+    const statusText = run._is_pass ? 'PASS' : 'FAIL';
+    const score = run._total_score > 0 ? run._total_score : '-';
+    const runId = (isSharded ? run.run_id : run.run_config?.run_id) || '?';
+    const timestamp = formatTimestamp(run.timestamp);
+
+    el.innerHTML = `
+              <div class="run-header">
+                  <span class="scenario-name">${run.scenario || 'Unknown'}</span>
+                  <span class="run-score">${score}</span>
+              </div>
+              <div class="run-meta">
+                  <span>Run #${runId} • ${timestamp}</span>
+                  <span class="status-badge ${statusClass}">${statusText}</span>
+              </div>
+          `;
+    return el;
+  }
+
+  function loadRun(run) {
+    if (!isSharded) return Promise.resolve(run);
+    if (shardCache[run.id]) return Promise.resolve({ ...run, ...shardCache[run.id] });
+
+    return new Promise((resolve, reject) => {
+      const first = !shardWaiters[run.id];
+      shardWaiters[run.id] = shardWaiters[run.id] || [];
+      shardWaiters[run.id].push({ resolve: record => resolve({ ...run, ...record }) });
+      if (!first) return;
+
+      const script = document.createElement('script');
+      script.src = `data/runs/${run.id}.js`;
+      script.onerror = () => {
+        delete shardWaiters[run.id];
+        reject(new Error(`Failed to load run data for ${run.id}`));
+      };
+      document.head.appendChild(script);
     });
   }
 
@@ -105,8 +399,18 @@ document.addEventListener('DOMContentLoaded', () => {
     document.querySelectorAll('.run-item').forEach(i => i.classList.remove('active'));
     el.classList.add('active');
     selectedRunId = run;
+    if (selectedTrial) {
+      selectedTrial = null;
+      renderLivePanel();
+    }
 
-    renderDetailView(run);
+    detailViewEl.innerHTML = `<div class="empty-state"><p>加载中...</p></div>`;
+    loadRun(run).then(full => {
+      // Ignore shards that arrive after the user picked another run
+      if (selectedRunId === run) renderDetailView(full);
+    }).catch(err => {
+      detailViewEl.innerHTML = `<div class="empty-state"><p>${escapeHtml(err.message)}</p></div>`;
+    });
   }
 
   function renderDetailView(run) {
@@ -168,9 +472,12 @@ document.addEventListener('DOMContentLoaded', () => {
       run.transcript.forEach(line => {
         const isPlayer = line.speaker.toLowerCase() === 'player' || line.speaker.toLowerCase() === 'user';
         const roleClass = isPlayer ? 'role-player' : 'role-npc';
+        const violation = line.violation
+          ? `<div class="violation-label">Hard fail: ${escapeHtml(line.violation.rule)}</div>` : '';
 
         content += `
-                    <div class="chat-bubble ${roleClass}">
+                    <div class="chat-bubble ${roleClass} ${line.violation ? 'violation' : ''}">
+                        ${violation}
                         <div class="speaker-label">${line.speaker}</div>
                         <div class="bubble-content">${escapeHtml(line.content)}</div>
                     </div>
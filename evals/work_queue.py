@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from evals.store import sidecar_path
+
+# pending -> leased -> done | failed; an expired lease is claimable again
+STATES = ("pending", "leased", "done", "failed")
+
+
+def queue_path(output_dir: str) -> str:
+    """Default queue file for a run store location."""
+    return sidecar_path(output_dir, "queue.sqlite")
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class WorkQueue:
+    """
+    Durable trial queue in a SQLite file, safe to share between processes and
+    (on a filesystem with working POSIX locks) machines.
+
+    Each trial is a row keyed by its trial key. Workers claim a pending trial
+    under a time-limited lease, renew the lease while it runs and mark it done
+    when its result is saved. A worker that dies simply stops renewing; once
+    the lease expires the trial goes to the next worker. Only the worker
+    holding a trial's lease can complete it, so a worker whose lease lapsed
+    and was taken over cannot mark the new holder's trial done.
+
+    The file uses a rollback journal rather than WAL (WAL's shared-memory
+    index does not work over network filesystems), and every write is a
+    short BEGIN IMMEDIATE transaction.
+    """
+    def __init__(self, path: str, lease_seconds: float = 600, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trials (
+                key TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                scenario_file TEXT NOT NULL,
+                run_config TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_trials_state ON trials(state, seq);
+            -- Sweep-wide spending limit shared by every worker: budget (limit), unit, spent
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction holding the database's reserved lock from its first statement."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _write(self, sql: str, args: tuple = ()) -> int:
+        with self._transaction() as conn:
+            return conn.execute(sql, args).rowcount
+
+    def enqueue(self, plan: List[Dict[str, Any]], reset: bool = False) -> int:
+        """
+        Add planned trials (each needs `key`, `scenario_file`, `run_config`);
+        keys already in the queue are left as they are. With `reset`, the
+        previous sweep is dropped first. Returns the number of new trials.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if reset:
+                conn.execute("DELETE FROM trials")
+                conn.execute("DELETE FROM meta")
+            start = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM trials").fetchone()[0]
+            added = 0
+            for i, trial in enumerate(plan, start + 1):
+                added += conn.execute(
+                    "INSERT OR IGNORE INTO trials (key, seq, scenario_file, run_config, updated)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (trial["key"], i, trial["scenario_file"],
+                     json.dumps(trial["run_config"], ensure_ascii=False), now)).rowcount
+        return added
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable trial to `worker`, or None when nothing is left to claim or the budget is spent."""
+        now = time.time()
+        with self._transaction() as conn:
+            if self._budget_spent(conn):
+                return None
+            # A trial whose worker keeps dying (e.g. OOM) is not handed out forever
+            conn.execute(
+                "UPDATE trials SET state = 'failed', error = 'lease expired', updated = ?"
+                " WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            row = conn.execute(
+                "SELECT key, scenario_file, run_config, attempts FROM trials"
+                " WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)"
+                " ORDER BY seq LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE trials SET state = 'leased', worker = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated = ? WHERE key = ?",
+                    (worker, now + self.lease_seconds, now, row[0]))
+        if row is None:
+            return None
+        return {"key": row[0], "scenario_file": row[1], "run_config": json.loads(row[2]), "attempt": row[3] + 1}
+
+    def set_budget(self, limit: float, unit: str):
+        """Stop handing out trials once `limit` (in `unit`, see charge()) has been spent."""
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                             [("budget", json.dumps(limit)), ("unit", unit), ("spent", "0")])
+
+    def budget(self) -> Optional[Dict[str, Any]]:
+        """{'limit', 'unit', 'spent'} of the sweep's budget, or None without one."""
+        with self._lock:
+            meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        if "budget" not in meta:
+            return None
+        return {"limit": json.loads(meta["budget"]), "unit": meta["unit"], "spent": json.loads(meta["spent"])}
+
+    @staticmethod
+    def _budget_spent(conn) -> bool:
+        meta = dict(conn.execute("SELECT name, value FROM meta WHERE name IN ('budget', 'spent')").fetchall())
+        return "budget" in meta and json.loads(meta["spent"]) >= json.loads(meta["budget"])
+
+    def charge(self, amount: float):
+        """Add what a finished (or failed) trial actually cost to the budget's spend."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE name = 'spent'").fetchone()
+            if row is not None:
+                conn.execute("UPDATE meta SET value = ? WHERE name = 'spent'", (json.dumps(json.loads(row[0]) + amount),))
+
+    def renew(self, worker: str) -> int:
+        """Extend every lease held by `worker`; called periodically while its trials run."""
+        now = time.time()
+        return self._write("UPDATE trials SET lease_expires = ?, updated = ? WHERE state = 'leased' AND worker = ?",
+                           (now + self.lease_seconds, now, worker))
+
+    def complete(self, key: str, worker: str, result: str) -> bool:
+        """
+        Mark a trial done with the location of its saved result. False (and no
+        change) unless `worker` still holds the trial's lease, e.g. when the
+        lease expired and another worker claimed the trial meanwhile.
+        """
+        return self._write("UPDATE trials SET state = 'done', result = ?, error = NULL, lease_expires = NULL,"
+                           " updated = ? WHERE key = ? AND state = 'leased' AND worker = ?",
+                           (result, time.time(), key, worker)) > 0
+
+    def fail(self, key: str, worker: str, error: str):
+        """Give a failed trial back to the queue, or mark it failed once it has used max_attempts."""
+        self._write("UPDATE trials SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                    " error = ?, worker = NULL, lease_expires = NULL, updated = ?"
+                    " WHERE key = ? AND state = 'leased' AND worker = ?",
+                    (self.max_attempts, error, time.time(), key, worker))
+
+    def release(self, worker: str, refund_attempt: bool = True) -> int:
+        """Return `worker`'s unfinished trials to the queue, by default without counting an attempt (e.g. on Ctrl-C)."""
+        attempts = "MAX(attempts - 1, 0)" if refund_attempt else "attempts"
+        return self._write("UPDATE trials SET state = 'pending', worker = NULL, lease_expires = NULL,"
+                           f" attempts = {attempts}, updated = ? WHERE state = 'leased' AND worker = ?",
+                           (time.time(), worker))
+
+    def release_orphans(self) -> int:
+        """
+        Release leases held by workers on this host whose process is gone (killed,
+        OOM), so a resume does not wait for their leases to expire. The attempt counts.
+        """
+        host = socket.gethostname()
+        with self._lock:
+            workers = [r[0] for r in self._conn.execute("SELECT DISTINCT worker FROM trials WHERE state = 'leased'")]
+        released = 0
+        for worker in workers:
+            worker_host, _, pid = (worker or "").rpartition(":")
+            if worker_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+                released += self.release(worker, refund_attempt=False)
+        return released
+
+    def retry_failed(self) -> int:
+        """Put trials that ran out of attempts back in the queue with a fresh attempt count."""
+        return self._write("UPDATE trials SET state = 'pending', attempts = 0, updated = ? WHERE state = 'failed'",
+                           (time.time(),))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM trials GROUP BY state").fetchall()
+        counts = {state: 0 for state in STATES}
+        counts.update(dict(rows))
+        counts["total"] = sum(counts[state] for state in STATES)
+        return counts
+
+    def failures(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key, attempts, error FROM trials WHERE state = 'failed' ORDER BY seq").fetchall()
+        return [{"key": r[0], "attempts": r[1], "error": r[2]} for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseKeeper:
+    """Background thread renewing a worker's leases every third of the lease period."""
+    def __init__(self, queue: WorkQueue, worker: str):
+        self.queue = queue
+        self.worker = worker
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            self.queue.renew(self.worker)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or reset a trial work queue")
+    parser.add_argument("queue", type=str, help="Queue file, e.g. evals/outputs/runs/queue.sqlite")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue trials that used up their attempts")
+    args = parser.parse_args()
+
+    q = WorkQueue(args.queue)
+    if args.retry_failed:
+        print(f"Requeued {q.retry_failed()} failed trial(s).")
+    c = q.counts()
+    print(f"{c['total']} trials: {c['done']} done, {c['pending']} pending, {c['leased']} leased, {c['failed']} failed")
+    for f in q.failures():
+        print(f"  FAILED {f['key']} after {f['attempts']} attempt(s): {f['error']}")
@@ -0,0 +1,39 @@
+from math import comb
+
+import pytest
+
+from evals.report import analysis
+
+np = pytest.importorskip("numpy")
+
+
+def test_pass_curves_match_the_closed_form():
+    n = np.array([[10, 10, 10, 7], [5, 5, 1, 3]])
+    c = np.array([[0, 4, 10, 3], [2, 5, 1, 0]])
+    pass_at_k, pass_caret_k = analysis.pass_curves(n, c, 10)
+    for (s, t), trials in np.ndenumerate(n):
+        passes = int(c[s, t])
+        for k in range(1, 11):
+            if k > trials:
+                assert np.isnan(pass_at_k[s, t, k - 1]) and np.isnan(pass_caret_k[s, t, k - 1])
+                continue
+            expected_at = 1 - comb(trials - passes, k) / comb(trials, k)
+            expected_caret = comb(passes, k) / comb(trials, k)
+            assert pass_at_k[s, t, k - 1] == pytest.approx(expected_at)
+            assert pass_caret_k[s, t, k - 1] == pytest.approx(expected_caret)
+
+
+def test_analyze_pads_scenarios_with_fewer_trials():
+    collector = analysis.ScoreCollector()
+    for i in range(4):
+        collector.add("a", i < 3, 10.0 + i, {"empathy": float(i)})
+    collector.add("b", False, 2.0)
+    result = analysis.analyze(collector.arrays(), n_boot=200)
+
+    a, b = result["scenarios"]["a"], result["scenarios"]["b"]
+    assert (a["n"], a["passes"], a["pass_rate"], a["mean_score"]) == (4, 3, 0.75, 11.5)
+    assert a["pass_at_k"] == [0.75, 1.0, 1.0, 1.0]
+    assert a["pass_caret_k"] == [0.75, 0.5, 0.25, 0.0]
+    assert a["dimensions"]["empathy"] == {"n": 4, "mean": 1.5, "var": round(5 / 3, 4)}
+    assert (b["n"], b["pass_at_k"], b["pass_caret_k"], b["dimensions"]) == (1, [0.0], [0.0], {})
+    assert a["pass_rate_ci"][0] <= a["pass_rate"] <= a["pass_rate_ci"][1]
@@ -0,0 +1,21 @@
+import json
+
+from evals.graders.batch import BatchGradingStage
+from evals.llm_client import LLMClient
+from evals.store import JsonDirStore, trial_key
+
+
+def test_judge_requests_count_per_run_fallbacks(tmp_path, monkeypatch):
+    store = JsonDirStore(str(tmp_path))
+    for run_id in (1, 2, 3):
+        run_config = {"run_id": run_id}
+        store.save({"scenario": "a", "timestamp": f"20260101_00000{run_id}", "trial_key": trial_key("a", run_config),
+                    "run_config": run_config, "config": {"rubric": {"dimensions": {}}},
+                    "transcript": [{"speaker": "NPC", "turn": 1, "content": f"run {run_id}"}], "grades": []})
+    # The batched answer only covers transcript 1; the other two are graded one by one
+    replies = iter([json.dumps({"evaluations": [{"transcript": 1, "scores": {}, "total_score": 0}]}),
+                    json.dumps({"scores": {}, "total_score": 0}), json.dumps({"scores": {}, "total_score": 0})])
+    monkeypatch.setattr(LLMClient, "chat_completion", lambda self, messages, **kwargs: next(replies))
+
+    stats = BatchGradingStage(str(tmp_path), workers=1, max_batch=3, log=lambda line: None).run()
+    assert stats == {"runs": 3, "judge_requests": 3, "failed_batches": 0}
@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from evals.budget import BudgetAllocator, ScenarioHistory, wilson_interval
+
+
+def history(n, passes, score, calls=10):
+    h = ScenarioHistory(score_range=10)
+    for i in range(n):
+        h.add(i < passes, score if i % 2 else 10 - score, calls, 0)
+    return h
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0, 0.95) == (0.0, 1.0)
+    lo, hi = wilson_interval(8, 10, 0.95)
+    assert (lo, hi) == (pytest.approx(0.4902, abs=1e-4), pytest.approx(0.9433, abs=1e-4))
+    z, p, n = 1.959964, 0.8, 10
+    assert (lo + hi) / 2 == pytest.approx((p + z * z / (2 * n)) / (1 + z * z / n), abs=1e-6)
+    assert wilson_interval(10, 10, 0.95)[1] == 1.0
+    assert wilson_interval(0, 10, 0.95)[0] == pytest.approx(0.0)
+
+
+def test_allocator_buys_trials_for_the_uncertain_scenario():
+    hist = {"stable": history(20, 20, 10), "flaky": history(2, 1, 2)}
+    trials, costs, spent = BudgetAllocator(hist, budget=100, min_trials=2).allocate({"stable": 5, "flaky": 5})
+    assert costs == {"stable": 10, "flaky": 10}
+    assert spent == 100 and sum(trials.values()) == 10
+    assert trials["stable"] == 2 and trials["flaky"] == 8
+
+
+def test_allocator_respects_the_cap_and_a_tight_budget():
+    hist = {"stable": history(20, 20, 10), "flaky": history(2, 1, 2)}
+    trials, _, spent = BudgetAllocator(hist, budget=100, max_trials=3).allocate({"stable": 5, "flaky": 5})
+    assert trials == {"stable": 3, "flaky": 3} and spent == 60
+    # The floor is handed out round-robin, so a budget for one trial goes to the first scenario
+    trials, _, spent = BudgetAllocator(hist, budget=15).allocate({"stable": 5, "flaky": 5})
+    assert trials == {"stable": 1, "flaky": 0} and spent == 10
+
+
+def test_scenarios_without_history_cost_the_known_average():
+    hist = {"a": history(2, 2, 10, calls=10), "b": history(2, 2, 10, calls=30)}
+    allocator = BudgetAllocator(hist, budget=math.inf, max_trials=1)
+    assert allocator.trial_cost("new", 5) == 20
+    assert BudgetAllocator({}, budget=10).trial_cost("new", 5) == 11
+    assert BudgetAllocator({}, budget=10, unit="tokens").trial_cost("new", 5) == 11 * 1500
+    with pytest.raises(ValueError):
+        BudgetAllocator({}, budget=10, unit="dollars")
@@ -0,0 +1,72 @@
+from evals.graders.rules import compile_rules
+
+CONFIG = {"constraints": {"hard_fail": ["explicit_affection", "accepting_cheat"]}}
+
+
+def npc(*lines):
+    return [{"speaker": "NPC", "turn": i, "content": text} for i, text in enumerate(lines, 1)]
+
+
+def test_outright_lines_fail():
+    rules = compile_rules(CONFIG)
+    assert rules.check_line("我很关心你。")["rule"] == "explicit_affection"
+    assert rules.check_line("放心吧，没人会知道的。")["rule"] == "accepting_cheat"
+    assert rules.check_forbidden(npc("其实我在乎你"))["result"] == "FAIL"
+
+
+def test_denied_or_questioned_lines_go_to_the_judge():
+    rules = compile_rules(CONFIG)
+    for line in ("哼，谁说我关心你了？", "别以为我在乎你啊", "你说没人会知道的？"):
+        assert rules.check_line(line) is None, line
+        assert rules.check_forbidden(npc(line))["result"] == "PASS", line
+        assert rules.ambiguous(npc(line)), line
+
+
+def test_quoted_player_text_is_not_a_violation():
+    rules = compile_rules(CONFIG)
+    assert rules.check_line("你刚才那句“我关心你”是什么意思") is None
+
+
+def test_guard_stays_within_the_clause():
+    rules = compile_rules(CONFIG)
+    assert rules.check_line("谁说不是呢，我真的关心你。") is not None
+    assert rules.check_line("我很关心你。你呢？") is not None
+
+
+def test_explicit_forbidden_phrases_are_not_guarded():
+    rules = compile_rules({"rules": {"forbidden": ["亲爱的"]}})
+    assert rules.check_line("谁说亲爱的？") is not None
+
+
+def test_only_hard_fail_labels_end_the_conversation():
+    rules = compile_rules({
+        "npc_profile": {"style_rules": {"must_not": ["直白表达关心: '别担心'"]}},
+        "constraints": {"hard_fail": ["harsh_insult"]},
+        "rules": {"forbidden": ["呵呵"]},
+    })
+    assert rules.check_line("呵呵，别担心") is not None
+    assert rules.check_hard_fail("呵呵，别担心") is None
+    assert rules.check_hard_fail("别担心，你这个废物")["rule"] == "harsh_insult"
+
+
+MUST_NOT = {
+    "npc_profile": {"style_rules": {"must_not": ["直白表达关心: '我很关心你' '我理解你很难受'"]}},
+    "constraints": {"hard_fail": ["explicit_affection"]},
+}
+
+
+def test_must_not_phrases_are_guarded_like_the_lexicon():
+    rules = compile_rules(MUST_NOT)
+    assert rules.check_line("我很关心你。")["rule"] == "must_not: 我很关心你"
+    for line in ("谁说我很关心你了？", "哼，我理解你很难受又怎样", "你说我很关心你？"):
+        assert rules.check_line(line) is None, line
+        assert rules.check_forbidden(npc(line))["result"] == "PASS", line
+        assert any(a["rule"].startswith("must_not") for a in rules.ambiguous(npc(line))), line
+
+
+def test_prohibitions_are_guarded():
+    rules = compile_rules(MUST_NOT)
+    for line in ("不要叫我亲爱的", "别说什么我很关心你"):
+        assert rules.check_line(line) is None, line
+    assert rules.check_line("特别是我很关心你") is not None
+    assert rules.check_line("别担心，我很关心你") is not None
@@ -0,0 +1,28 @@
+from evals.scheduler import AdaptiveScheduler, SequentialTest, stop_reason
+
+
+def test_sequential_test_decides_at_the_wald_boundaries():
+    test = SequentialTest(target=0.8, delta=0.15, confidence=0.9)
+    assert test.trials_to_decide() == 6
+    assert test.decide(5, 0) is None
+    assert test.decide(6, 0) == "reliable"
+    assert test.decide(0, 1) is None
+    assert test.decide(0, 2) == "unreliable"
+    # One failure cancels most of six passes
+    assert test.decide(6, 1) is None
+
+
+def test_stop_reasons_per_policy():
+    assert stop_reason("pass_caret_k", 3, 1) == "pass^k decided (a trial failed)"
+    assert stop_reason("pass_caret_k", 3, 0) is None
+    assert stop_reason("pass_at_k", 1, 2) == "pass@k decided (a trial passed)"
+    assert stop_reason("none", 0, 10) is None
+    assert stop_reason("confidence", 6, 0, SequentialTest()) == "sequential test: reliable"
+
+
+def test_scheduler_skips_trials_once_decided():
+    plan = [{"scenario_file": s, "run_id": i} for s in ("good.yaml", "bad.yaml") for i in range(10)]
+    status = AdaptiveScheduler(plan, lambda trial: trial["scenario_file"] == "good.yaml",
+                               policy="confidence", concurrency=2, log=lambda line: None).run()
+    assert status["good.yaml"]["used"] == 6 and status["good.yaml"]["stop_reason"] == "sequential test: reliable"
+    assert status["bad.yaml"]["used"] == 2 and status["bad.yaml"]["stop_reason"] == "sequential test: unreliable"
@@ -0,0 +1,105 @@
+import os
+import json
+
+from evals.store import JsonDirStore, PackedRunStore, SQLiteRunStore, run_verdict, sidecar_path, trial_key
+
+
+def record(scenario, run_id, timestamp, **extra):
+    run_config = {"run_id": run_id, "seed": run_id}
+    return dict({"scenario": scenario, "timestamp": timestamp, "trial_key": trial_key(scenario, run_config),
+                 "run_config": run_config, "transcript": [], "grades": []}, **extra)
+
+
+def test_iter_records_orders_trial_key_files_without_parsing_twice(tmp_path):
+    store = JsonDirStore(str(tmp_path))
+    store.save(record("a", 1, "20260101_000002"))
+    store.save(record("b", 1, "20260101_000003"))
+    # Saved before timestamps moved to the top of the file
+    old = record("a", 2, "20260101_000001")
+    old = {k: old[k] for k in ("scenario", "run_config", "transcript", "grades", "timestamp", "trial_key")}
+    store.save(old)
+    legacy = record("c", 1, "20260101_000004")
+    del legacy["trial_key"]
+    store.save(legacy)
+
+    loads = []
+    load = store._load
+    store._load = lambda key: loads.append(key) or load(key)
+    keys = [key for key, _ in store.iter_records()]
+
+    assert len(loads) == len(keys) == 4
+    assert [json.load(open(k))["timestamp"] for k in keys] == \
+        ["20260101_000004", "20260101_000003", "20260101_000002", "20260101_000001"]
+
+
+def test_judge_error_is_not_a_pass():
+    assert run_verdict({"grades": [{"metric": "rubric_eval", "result": "PASS", "total_score": 12}]}) == (True, 12.0)
+    assert run_verdict({"grades": [{"metric": "rubric_eval", "result": "ERROR", "score": 0}]})[0] is False
+
+
+def test_sidecar_files_sit_next_to_file_stores_and_inside_directories():
+    assert sidecar_path(os.path.join("out", "runs.db"), "logs") == os.path.join("out", "runs_logs")
+    assert sidecar_path(os.path.join("out", "runs.pack") + os.sep, "queue.sqlite") == os.path.join("out", "runs_queue.sqlite")
+    assert sidecar_path(os.path.join("out", "runs"), "events.jsonl") == os.path.join("out", "runs", "events.jsonl")
+
+
+def test_sqlite_store_replaces_a_trial_saved_again(tmp_path):
+    store = SQLiteRunStore(str(tmp_path / "runs.db"))
+    failed = [{"metric": "rubric_eval", "result": "FAIL", "total_score": 3}]
+    passed = [{"metric": "rubric_eval", "result": "PASS", "total_score": 9}]
+    first = store.save(record("a", 1, "20260101_000001", grades=failed))
+    other = store.save(record("b", 1, "20260101_000002", grades=failed))
+    again = store.save(record("a", 1, "20260101_000003", grades=passed))
+
+    assert again == first != other
+    assert store.count() == 2
+    assert store.get(first)["grades"] == passed
+    assert [(s["key"], s["is_pass"]) for s in store.summaries()] == [(first, True), (other, False)]
+
+
+def packed_record(scenario, run_id, timestamp, **extra):
+    calls = [{"role": "npc", "latency": 0.5 * i, "prompt_tokens": 100 + i} for i in range(3)]
+    return record(scenario, run_id, timestamp, config={"rubric": {"dimensions": {"warmth": {"max": 5}}}},
+                  transcript=[{"speaker": "NPC", "turn": 1, "content": f"第{run_id}轮"}],
+                  metrics={"calls": calls}, **extra)
+
+
+def test_packed_store_round_trip(tmp_path):
+    path = str(tmp_path / "runs.pack")
+    store = PackedRunStore(path)
+    # More records than the dictionary sample, so later frames use the preset dictionary
+    saved = {store.save(packed_record("a", i, f"20260101_00000{i}")): packed_record("a", i, f"20260101_00000{i}")
+             for i in range(1, 7)}
+    reopened = PackedRunStore(path)
+    assert reopened.count() == 6
+    assert json.load(open(tmp_path / "runs.pack" / "meta.json"))["dict"]
+    assert len(list((tmp_path / "runs.pack" / "configs").iterdir())) == 1
+    for key, original in saved.items():
+        assert reopened.get(key) == original
+    assert [s["timestamp"] for s in reopened.summaries()] == [f"20260101_00000{i}" for i in range(6, 0, -1)]
+
+
+def test_packed_store_keeps_only_the_latest_version(tmp_path):
+    store = PackedRunStore(str(tmp_path / "runs.pack"), codec="lzma")
+    key = store.save(packed_record("a", 1, "20260101_000001"))
+    passed = [{"metric": "rubric_eval", "result": "PASS", "total_score": 9}]
+    store.update(key, packed_record("a", 1, "20260101_000001", grades=passed))
+    assert store.count() == 1
+    assert store.get(key)["grades"] == passed
+    assert [s["is_pass"] for s in PackedRunStore(store.path).summaries()] == [True]
+
+
+def test_packed_store_detects_corrupt_frames(tmp_path):
+    store = PackedRunStore(str(tmp_path / "runs.pack"))
+    first = store.save(packed_record("a", 1, "20260101_000001"))
+    second = store.save(packed_record("a", 2, "20260101_000002"))
+    frames = tmp_path / "runs.pack" / "records.frames"
+    data = bytearray(frames.read_bytes())
+    data[PackedRunStore.FRAME_HEADER.size + 5] ^= 0xFF  # inside the first frame's payload
+    frames.write_bytes(bytes(data))
+
+    reopened = PackedRunStore(store.path)
+    assert reopened.get(first) is None
+    assert reopened.get(second) is not None
+    assert [key for key, _ in reopened.iter_records()] == [second]
+    assert reopened.count() == 2  # the score table is still intact
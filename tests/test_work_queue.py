@@ -0,0 +1,86 @@
+import time
+
+from evals.work_queue import WorkQueue
+
+
+def make_queue(tmp_path, n=1, **kwargs):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), **kwargs)
+    queue.enqueue([{"key": f"t{i}", "scenario_file": "s.yaml", "run_config": {"run_id": i}} for i in range(1, n + 1)])
+    return queue
+
+
+def expire(queue, key):
+    queue._write("UPDATE trials SET lease_expires = ? WHERE key = ?", (time.time() - 1, key))
+
+
+def test_rollback_journal(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+
+def test_live_lease_is_not_claimable(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.claim("a")["key"] == "t1"
+    assert queue.claim("b") is None
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.claim("a")
+    expire(queue, "t1")
+    trial = queue.claim("b")
+    assert trial["key"] == "t1" and trial["attempt"] == 2
+    # The first worker's late renewal and completion no longer touch the trial
+    assert queue.renew("a") == 0
+    assert not queue.complete("t1", "a", "a.json")
+    assert queue.counts()["leased"] == 1
+    assert queue.complete("t1", "b", "b.json")
+    assert queue.counts()["done"] == 1
+    assert not queue.complete("t1", "b", "b.json")
+
+
+def test_renewal_keeps_the_lease(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60)
+    queue.claim("a")
+    expire(queue, "t1")
+    assert queue.renew("a") == 1
+    assert queue.claim("b") is None
+
+
+def test_expired_lease_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    for worker in ("a", "b"):
+        assert queue.claim(worker)["key"] == "t1"
+        expire(queue, "t1")
+    assert queue.claim("c") is None
+    assert queue.failures() == [{"key": "t1", "attempts": 2, "error": "lease expired"}]
+
+
+def test_queue_shared_between_connections(tmp_path):
+    first = make_queue(tmp_path, n=2)
+    second = WorkQueue(first.path)
+    a, b = first.claim("a")["key"], second.claim("b")["key"]
+    assert {a, b} == {"t1", "t2"}
+    assert not first.complete(b, "a", "x.json")
+    assert second.complete(b, "b", "x.json")
+
+
+def test_budget_stops_new_claims(tmp_path):
+    queue = make_queue(tmp_path, n=3)
+    queue.set_budget(20, "calls")
+    queue.claim("a")
+    queue.charge(12)
+    assert queue.claim("a")["key"] == "t2"
+    queue.charge(12)
+    assert queue.claim("a") is None
+    assert queue.budget() == {"limit": 20, "unit": "calls", "spent": 24}
+    assert queue.counts()["pending"] == 1
+
+
+def test_new_sweep_drops_the_budget(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.set_budget(0, "calls")
+    assert queue.claim("a") is None
+    queue.enqueue([{"key": "t1", "scenario_file": "s.yaml", "run_config": {}}], reset=True)
+    assert queue.budget() is None
+    assert queue.claim("a")["key"] == "t1"